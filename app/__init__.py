@@ -4,23 +4,42 @@ This module creates and configures the Flask application with all necessary exte
 and blueprints for the MOH MNCAH Dashboard System.
 """
 
+import importlib.util
 import os
 import logging
 from logging.handlers import RotatingFileHandler
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, flash, redirect, url_for
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
 from flask_cors import CORS
 from werkzeug.middleware.proxy_fix import ProxyFix
-from sqlalchemy import Table
+from sqlalchemy import select, text
+from sqlalchemy.schema import CreateIndex
+
+# Rate limiting (optional - Flask-Limiter is not in the minimal requirements)
+try:
+    from flask_limiter import Limiter
+    from flask_limiter.util import get_remote_address
+    LIMITER_AVAILABLE = True
+except ImportError:
+    LIMITER_AVAILABLE = False
+
+# Response/data caching (optional - Flask-Caching is not in the minimal requirements)
+try:
+    from flask_caching import Cache
+    CACHING_AVAILABLE = True
+except ImportError:
+    CACHING_AVAILABLE = False
 
 # Initialize extensions
 db = SQLAlchemy()
 migrate = Migrate()
 login_manager = LoginManager()
 csrf = CSRFProtect()
+limiter = Limiter(key_func=get_remote_address) if LIMITER_AVAILABLE else None
+cache = Cache() if CACHING_AVAILABLE else None
 
 
 def create_app(config_name='development'):
@@ -50,6 +69,9 @@ def create_app(config_name='development'):
     db.init_app(app)
     migrate.init_app(app, db)
     csrf.init_app(app)
+    configure_rate_limits(app)
+    configure_cache(app)
+    configure_sessions(app)
     
     # Configure CORS for API endpoints
     CORS(app, resources={
@@ -86,6 +108,11 @@ def create_app(config_name='development'):
     with app.app_context():
         create_database_tables()
         create_default_users()
+        backfill_facility_stats()
+    
+    if not app.testing:
+        from .views.upload import resume_uploads_on_first_request
+        resume_uploads_on_first_request(app)
     
     # Register CLI commands
     register_cli_commands(app)
@@ -93,6 +120,51 @@ def create_app(config_name='development'):
     return app
 
 
+def configure_rate_limits(app):
+    """Initialise Flask-Limiter, keeping counters in memory if redis storage is unavailable"""
+    if limiter is None:
+        return
+    
+    if app.config.get('RATELIMIT_STORAGE_URI', '').startswith('redis'):
+        if importlib.util.find_spec('redis') is None:
+            app.logger.warning("RATELIMIT_STORAGE_URI uses redis but redis is not installed; "
+                               "keeping rate limit counters in memory")
+            app.config['RATELIMIT_STORAGE_URI'] = 'memory://'
+    limiter.init_app(app)
+
+
+def configure_cache(app):
+    """Initialise Flask-Caching, falling back to a no-op cache if the backend is unavailable"""
+    if cache is None:
+        return
+    
+    try:
+        cache.init_app(app)
+    except Exception as e:
+        app.logger.warning(f"Cache backend {app.config.get('CACHE_TYPE')} unavailable ({str(e)}); caching disabled")
+        app.config['CACHE_TYPE'] = 'NullCache'
+        cache.init_app(app)
+
+
+def configure_sessions(app):
+    """Move sessions to redis when SESSION_TYPE is 'redis' and Flask-Session is installed"""
+    if app.config.get('SESSION_TYPE') != 'redis':
+        return
+    
+    try:
+        import redis
+        from flask_session import Session
+    except ImportError:
+        app.logger.warning("SESSION_TYPE is 'redis' but Flask-Session/redis are not installed; "
+                           "falling back to cookie sessions")
+        app.config['SESSION_TYPE'] = None
+        return
+    
+    if not app.config.get('SESSION_REDIS'):
+        app.config['SESSION_REDIS'] = redis.Redis.from_url(app.config['SESSION_REDIS_URL'])
+    Session(app)
+
+
 def register_blueprints(app):
     """Register application blueprints"""
     from .views.auth import auth_bp
@@ -159,6 +231,15 @@ def register_error_handlers(app):
         if request.path.startswith('/api/'):
             return jsonify({'error': 'File too large', 'message': 'Maximum file size is 15MB'}), 413
         return render_template('errors/413.html'), 413
+    
+    @app.errorhandler(429)
+    def too_many_requests(error):
+        message = 'Too many requests. Please wait a moment and try again.'
+        if request.path.startswith('/api/') or request.is_json:
+            return jsonify({'error': 'Too many requests', 'message': message}), 429
+        flash(message, 'error')
+        # Not request.referrer: a cross-site POST would redirect to the attacker's page
+        return redirect(url_for('auth.login'))
 
 
 def configure_logging(app):
@@ -192,13 +273,10 @@ def create_database_tables():
         from .models.upload import DataUpload
         # Import Base metadata objects from models that use declarative_base
         from .models.user import Base as UserBase
-        from .models.upload import Base as UploadBase
 
-        # Attach query_property so Model.query works on these Bases
-        # Attach query_property so Model.query works on these Bases across the app
+        # Attach query_property so Model.query works on these models across the app
         try:
             UserBase.query = db.session.query_property()
-            UploadBase.query = db.session.query_property()
         except Exception:
             pass
 
@@ -208,13 +286,21 @@ def create_database_tables():
         # Also create tables defined on standalone SQLAlchemy Base models
         # Bind to the same engine used by Flask-SQLAlchemy
         engine = db.engine
+        # DataUpload shares the users Base, so this creates both sets of tables
         UserBase.metadata.create_all(bind=engine)
-        # Reflect users table into UploadBase metadata so FK can resolve
-        try:
-            Table('users', UploadBase.metadata, autoload_with=engine)
-        except Exception:
-            pass
-        UploadBase.metadata.create_all(bind=engine)
+        
+        # create_all() skips existing tables, so add any indexes introduced later.
+        # IF NOT EXISTS rather than checkfirst: SQLite can't reflect expression
+        # indexes such as ix_du_facility_name_lower, so checkfirst misses them
+        with engine.begin() as connection:
+            for index in DataUpload.__table__.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+            # ...and drop the ones later composites made redundant
+            for name in DataUpload.OBSOLETE_INDEXES:
+                connection.execute(text(f'DROP INDEX IF EXISTS {name}'))
+        
+        if engine.dialect.name == 'postgresql':
+            create_trigram_indexes(engine)
         
         logging.info("Database tables created successfully")
         
@@ -223,6 +309,23 @@ def create_database_tables():
         raise
 
 
+def create_trigram_indexes(engine):
+    """Create pg_trgm indexes so substring searches on uploads can avoid full scans"""
+    try:
+        with engine.begin() as connection:
+            connection.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+            for name, column in (('facility', 'facility_name'),
+                                 ('district', 'district'),
+                                 ('period', 'reporting_period')):
+                connection.execute(text(
+                    f'CREATE INDEX IF NOT EXISTS ix_du_{name}_trgm ON data_uploads '
+                    f'USING gin (lower({column}) gin_trgm_ops)'
+                ))
+    except Exception as e:
+        # The extension needs elevated privileges; substring search still works without it
+        logging.warning(f"Could not create trigram indexes: {str(e)}")
+
+
 def create_default_users():
     """Create default users if they don't exist"""
     try:
@@ -246,6 +349,22 @@ def create_default_users():
         db.session.rollback()
 
 
+def backfill_facility_stats():
+    """Populate the facility_stats summary table if it has never been built"""
+    try:
+        from .models.upload import DataUpload, FacilityStats, UploadStatus
+        
+        if db.session.query(FacilityStats).first() is None and \
+                db.session.query(DataUpload.id).filter_by(status=UploadStatus.COMPLETED).first() is not None:
+            FacilityStats.refresh(db.session)
+            db.session.commit()
+            logging.info("Facility stats backfilled successfully")
+    
+    except Exception as e:
+        logging.error(f"Error backfilling facility stats: {str(e)}")
+        db.session.rollback()
+
+
 def register_cli_commands(app):
     """Register CLI commands for database management"""
     
@@ -314,32 +433,54 @@ def register_cli_commands(app):
             print(f"{user.id:<5} {user.username:<15} {user.user_type.value:<12} "
                   f"{user.full_name or 'N/A':<25} {user.status.value:<10}")
     
+    @app.cli.command()
+    def check_password_cost():
+        """Time one password hash and warn if the configured cost looks too low."""
+        import time
+        from .models.user import hash_password, password_hash_method
+        
+        start = time.perf_counter()
+        hash_password('benchmark-password')
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        minimum_ms = app.config.get('PASSWORD_HASH_MIN_MS', 100)
+        print(f"Password hashing with {password_hash_method()} takes {elapsed_ms:.0f} ms")
+        if elapsed_ms < minimum_ms:
+            print(f"Below {minimum_ms} ms; consider raising the PASSWORD_HASH_METHOD cost")
+    
+    @app.cli.command()
+    def refresh_facility_stats():
+        """Rebuild the facility_stats summary table."""
+        from .models.upload import FacilityStats
+        
+        FacilityStats.refresh(db.session)
+        db.session.commit()
+        print("Facility stats refreshed successfully!")
+    
     @app.cli.command()
     def process_pending_uploads():
         """Process any pending data uploads."""
         from .models.upload import DataUpload, UploadStatus
+        from .views.upload import process_upload_job, reset_stale_uploads
         
-        pending_uploads = db.session.query(DataUpload).filter_by(status=UploadStatus.PENDING).all()
+        reset_stale_uploads()
+        pending_ids = db.session.scalars(
+            select(DataUpload.id).where(DataUpload.status == UploadStatus.PENDING)
+        ).all()
         
-        if not pending_uploads:
+        if not pending_ids:
             print("No pending uploads found.")
             return
         
-        print(f"Processing {len(pending_uploads)} pending uploads...")
+        print(f"Processing {len(pending_ids)} pending uploads...")
         
-        for upload in pending_uploads:
-            try:
-                success, message = upload.process_upload()
-                if success:
-                    print(f"✓ Processed upload {upload.id} - {upload.facility_name}")
-                else:
-                    print(f"✗ Failed to process upload {upload.id}: {message}")
-                
-                db.session.commit()
-                
-            except Exception as e:
-                print(f"✗ Error processing upload {upload.id}: {str(e)}")
-                db.session.rollback()
+        # Same claim as the background pool, so an upload a worker is already
+        # processing is skipped rather than processed twice
+        for upload_id in pending_ids:
+            if process_upload_job(app, upload_id):
+                print(f"✓ Processed upload {upload_id}")
+            else:
+                print(f"✗ Upload {upload_id} was not processed (failed or claimed elsewhere)")
         
         print("Upload processing completed.")
     
@@ -431,4 +572,4 @@ def generate_sample_raw_data():
 
 
 # Import routes and models at the end to avoid circular imports
-from flask import render_template, redirect, url_for
+from flask import render_template
@@ -5,7 +5,7 @@ Imports all models to ensure they are registered with SQLAlchemy
 
 from .base import MaternalNeonatalChildAdolescentHealth
 from .user import User, UserType, UserStatus
-from .upload import DataUpload, UploadStatus
+from .upload import DataUpload, UploadStatus, FacilityStats
 from .anc import AntenatalCare
 from .intrapartum import IntrapartumCare
 from .pnc import PostnatalCare
@@ -17,6 +17,7 @@ __all__ = [
     'UserStatus',
     'DataUpload',
     'UploadStatus',
+    'FacilityStats',
     'AntenatalCare',
     'IntrapartumCare',
     'PostnatalCare'
@@ -9,17 +9,20 @@ import pandas as pd
 from datetime import datetime
 from enum import Enum
 from typing import Dict, List, Optional, Any, Tuple
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, ForeignKey, JSON
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, validates
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, ForeignKey, JSON, Index, func
+from sqlalchemy.orm import relationship, validates, load_only
 from sqlalchemy import Enum as SQLEnum
+from sqlalchemy import case, cast, literal_column, select
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
 
 from .base import PopulationData, PeriodType
 from .anc import AntenatalCare
 from .intrapartum import IntrapartumCare
 from .pnc import PostnatalCare
-
-Base = declarative_base()
+# Share the users Base so the uploaded_by_user relationship can resolve "User"
+from .user import Base
 
 
 class UploadStatus(Enum):
@@ -39,6 +42,34 @@ class ValidationLevel(Enum):
     CRITICAL = "critical"
 
 
+class year_month(FunctionElement):
+    """
+    'YYYY-MM' month bucket of a datetime column
+    
+    Compiles to strftime() on SQLite and to_char(date_trunc()) on PostgreSQL.
+    The format strings are rendered inline rather than bound, so the same
+    expression in SELECT and GROUP BY compiles to identical SQL.
+    """
+    type = String()
+    name = 'year_month'
+    inherit_cache = True
+
+
+@compiles(year_month)
+def compile_year_month(element, compiler, **kw):
+    column = list(element.clauses)[0]
+    return compiler.process(func.strftime(literal_column("'%Y-%m'"), column), **kw)
+
+
+@compiles(year_month, 'postgresql')
+def compile_year_month_postgresql(element, compiler, **kw):
+    column = list(element.clauses)[0]
+    return compiler.process(
+        func.to_char(func.date_trunc(literal_column("'month'"), column), literal_column("'YYYY-MM'")),
+        **kw
+    )
+
+
 class DataUpload(Base):
     """
     Model to track data uploads and their processing status
@@ -55,8 +86,8 @@ class DataUpload(Base):
     content_type = Column(String(100), nullable=True)
     
     # Facility information
-    facility_name = Column(String(200), nullable=False, index=True)
-    district = Column(String(100), nullable=True, index=True)
+    facility_name = Column(String(200), nullable=False)
+    district = Column(String(100), nullable=True)
     region = Column(String(100), nullable=True)
     facility_type = Column(String(100), nullable=True)
     
@@ -87,19 +118,61 @@ class DataUpload(Base):
     # Relationships
     uploaded_by_user = relationship("User", backref="uploads")
     
+    # One composite index per access path; each also serves lookups on its
+    # leading columns (e.g. status + facility_name, or facility_name alone)
+    __table_args__ = (
+        Index('ix_du_status_fac_upl', status, facility_name, uploaded_at.desc()),
+        Index('ix_du_status_upl', status, uploaded_at.desc()),
+        Index('ix_du_facility_upl', facility_name, uploaded_at.desc()),
+        Index('ix_du_status_district', status, district),
+        # Partial index: district statistics only look at uploads that have one
+        Index(
+            'ix_du_district', district,
+            postgresql_where=district.isnot(None),
+            sqlite_where=district.isnot(None)
+        ),
+        # Prefix search on lower(facility_name); text_pattern_ops lets LIKE 'x%' use it on PostgreSQL
+        Index(
+            'ix_du_facility_name_lower',
+            func.lower(facility_name).label('facility_name_lower'),
+            postgresql_ops={'facility_name_lower': 'text_pattern_ops'}
+        ),
+    )
+    
+    # Indexes made redundant by the composites above; dropped from existing databases
+    OBSOLETE_INDEXES = ('ix_data_uploads_facility_name', 'ix_du_status_fac_period', 'ix_du_status_period')
+    
+    # Scalar columns read by to_dict() when include_data is False
+    SUMMARY_COLUMNS = (
+        'id', 'original_filename', 'facility_name', 'district', 'region',
+        'total_population', 'period_type', 'reporting_period', 'uploaded_at',
+        'processed_at', 'status', 'file_size', 'total_indicators',
+        'valid_indicators', 'warning_indicators', 'error_indicators'
+    )
+    
+    @classmethod
+    def summary_load_option(cls):
+        """Loader option that skips the JSON blobs not needed by to_dict()"""
+        return load_only(*(getattr(cls, name) for name in cls.SUMMARY_COLUMNS))
+    
     def __init__(self, **kwargs):
         """Initialize data upload record"""
         super().__init__(**kwargs)
         self.uploaded_at = datetime.utcnow()
     
+    @staticmethod
+    def period_adjusted_population(total_population: int, period_type: PeriodType) -> int:
+        """Scale an annual population to the reporting period"""
+        if period_type == PeriodType.QUARTERLY:
+            return total_population // 4
+        elif period_type == PeriodType.MONTHLY:
+            return total_population // 12
+        return total_population
+    
     @property
     def adjusted_population(self) -> int:
         """Get population adjusted for reporting period"""
-        if self.period_type == PeriodType.QUARTERLY:
-            return self.total_population // 4
-        elif self.period_type == PeriodType.MONTHLY:
-            return self.total_population // 12
-        return self.total_population
+        return self.period_adjusted_population(self.total_population, self.period_type)
     
     @property
     def expected_pregnancies(self) -> float:
@@ -206,28 +279,54 @@ class DataUpload(Base):
         self.warning_indicators = warning_count
         self.error_indicators = error_count
     
-    def get_validation_summary(self) -> Dict[str, Any]:
-        """Get summary of validation results"""
+    @staticmethod
+    def summarize_validation(total_indicators: int, valid_indicators: int,
+                             warning_indicators: int, error_indicators: int) -> Dict[str, Any]:
+        """Build a validation summary from indicator counts"""
+        if total_indicators == 0:
+            overall_status = "no_data"
+        elif error_indicators > 0:
+            overall_status = "has_errors"
+        elif warning_indicators > 0:
+            overall_status = "has_warnings"
+        else:
+            overall_status = "all_valid"
+        
         return {
-            'total_indicators': self.total_indicators,
-            'valid_indicators': self.valid_indicators,
-            'warning_indicators': self.warning_indicators,
-            'error_indicators': self.error_indicators,
-            'validation_rate': (self.valid_indicators / self.total_indicators * 100) if self.total_indicators > 0 else 0,
-            'has_critical_issues': self.error_indicators > 0,
-            'overall_status': self._get_overall_validation_status()
+            'total_indicators': total_indicators,
+            'valid_indicators': valid_indicators,
+            'warning_indicators': warning_indicators,
+            'error_indicators': error_indicators,
+            'validation_rate': (valid_indicators / total_indicators * 100) if total_indicators > 0 else 0,
+            'has_critical_issues': error_indicators > 0,
+            'overall_status': overall_status
         }
     
+    @hybrid_property
+    def validation_rate(self) -> float:
+        """Percentage of indicators that validated green"""
+        total_indicators = self.total_indicators or 0
+        return (self.valid_indicators or 0) / total_indicators * 100 if total_indicators > 0 else 0
+    
+    @validation_rate.expression
+    def validation_rate(cls):
+        """SQL form of validation_rate, so filters and aggregates need not load rows"""
+        return case(
+            (cls.total_indicators > 0,
+             cast(cls.valid_indicators, Float) / cls.total_indicators * 100),
+            else_=0.0
+        )
+    
+    def get_validation_summary(self) -> Dict[str, Any]:
+        """Get summary of validation results"""
+        return self.summarize_validation(
+            self.total_indicators, self.valid_indicators,
+            self.warning_indicators, self.error_indicators
+        )
+    
     def _get_overall_validation_status(self) -> str:
         """Determine overall validation status"""
-        if self.total_indicators == 0:
-            return "no_data"
-        elif self.error_indicators > 0:
-            return "has_errors"
-        elif self.warning_indicators > 0:
-            return "has_warnings"
-        else:
-            return "all_valid"
+        return self.get_validation_summary()['overall_status']
     
     def get_indicator_value(self, category: str, indicator: str) -> Optional[float]:
         """Get calculated value for specific indicator"""
@@ -279,6 +378,60 @@ class DataUpload(Base):
         
         return result
     
+    @classmethod
+    def bulk_to_dicts(cls, session, *criteria, order_by=None, limit: Optional[int] = None,
+                      include_processed_data: bool = False) -> List[Dict[str, Any]]:
+        """
+        Build to_dict()-style dictionaries for many uploads in one query
+        
+        Selects the summary columns (plus processed_data when asked) as plain
+        rows, so no ORM instances are created and the other JSON blobs are
+        never loaded.
+        
+        Args:
+            session: Database session
+            criteria: Filter expressions for the uploads to include
+            order_by: Optional ORDER BY expression
+            limit: Optional maximum number of uploads to return
+            include_processed_data: Whether to add the calculated indicators
+        """
+        columns = [getattr(cls, name) for name in cls.SUMMARY_COLUMNS]
+        if include_processed_data:
+            columns.append(cls.processed_data)
+        
+        statement = select(*columns).where(*criteria)
+        if order_by is not None:
+            statement = statement.order_by(order_by)
+        if limit is not None:
+            statement = statement.limit(limit)
+        
+        results = []
+        for row in session.execute(statement):
+            result = {
+                'id': row.id,
+                'filename': row.original_filename,
+                'facility_name': row.facility_name,
+                'district': row.district,
+                'region': row.region,
+                'total_population': row.total_population,
+                'adjusted_population': cls.period_adjusted_population(row.total_population, row.period_type),
+                'period_type': row.period_type.value,
+                'reporting_period': row.reporting_period,
+                'uploaded_at': row.uploaded_at.isoformat(),
+                'processed_at': row.processed_at.isoformat() if row.processed_at else None,
+                'status': row.status.value,
+                'validation_summary': cls.summarize_validation(
+                    row.total_indicators, row.valid_indicators,
+                    row.warning_indicators, row.error_indicators
+                ),
+                'file_size': row.file_size
+            }
+            if include_processed_data:
+                result['processed_data'] = row.processed_data
+            results.append(result)
+        
+        return results
+    
     @validates('facility_name')
     def validate_facility_name(self, key, facility_name):
         """Validate facility name"""
@@ -299,6 +452,88 @@ class DataUpload(Base):
         return f'<DataUpload {self.facility_name} - {self.reporting_period}>'
 
 
+class FacilityStats(Base):
+    """
+    Per-facility aggregates over completed uploads
+    
+    Acts as a materialized view of data_uploads: rows are rebuilt with
+    refresh() after uploads are processed, reprocessed or deleted, so read
+    endpoints can select them directly instead of aggregating per request.
+    """
+    __tablename__ = 'facility_stats'
+    
+    facility_name = Column(String(200), primary_key=True)
+    district = Column(String(100), nullable=True)
+    latest_upload = Column(DateTime, nullable=False, index=True)
+    total_uploads = Column(Integer, nullable=False, default=0)
+    avg_validation_rate = Column(Float, nullable=False, default=0)
+    
+    # Snapshot of the latest completed upload
+    latest_upload_id = Column(Integer, nullable=True)
+    latest_period = Column(String(50), nullable=True)
+    latest_total_indicators = Column(Integer, default=0)
+    latest_valid_indicators = Column(Integer, default=0)
+    latest_error_indicators = Column(Integer, default=0)
+    
+    @property
+    def latest_validation_rate(self) -> float:
+        """Validation rate of the latest completed upload"""
+        if not self.latest_total_indicators:
+            return 0
+        return self.latest_valid_indicators / self.latest_total_indicators * 100
+    
+    @classmethod
+    def refresh(cls, session, facility_names: Optional[List[str]] = None) -> None:
+        """
+        Rebuild aggregate rows from data_uploads (caller commits)
+        
+        Args:
+            session: Database session
+            facility_names: Facilities to refresh; all facilities when None
+        """
+        stale_rows = session.query(cls)
+        
+        # One window-function scan: the latest completed upload per facility,
+        # carrying that facility's upload count and average validation rate
+        per_facility = {'partition_by': DataUpload.facility_name}
+        ranked = select(
+            DataUpload.id, DataUpload.facility_name, DataUpload.district,
+            DataUpload.uploaded_at, DataUpload.reporting_period,
+            DataUpload.total_indicators, DataUpload.valid_indicators, DataUpload.error_indicators,
+            func.row_number().over(
+                order_by=(DataUpload.uploaded_at.desc(), DataUpload.id.desc()), **per_facility
+            ).label('rn'),
+            func.count(DataUpload.id).over(**per_facility).label('total_uploads'),
+            # Same expression as the validation_rate hybrid, so uploads without
+            # indicators count as 0% here just as they do in the reports
+            func.avg(DataUpload.validation_rate).over(**per_facility).label('avg_validation_rate')
+        ).where(DataUpload.status == UploadStatus.COMPLETED)
+        
+        if facility_names is not None:
+            stale_rows = stale_rows.filter(cls.facility_name.in_(facility_names))
+            ranked = ranked.where(DataUpload.facility_name.in_(facility_names))
+        
+        stale_rows.delete()
+        
+        ranked = ranked.subquery()
+        for latest in session.execute(select(ranked).where(ranked.c.rn == 1)).all():
+            session.add(cls(
+                facility_name=latest.facility_name,
+                district=latest.district,
+                latest_upload=latest.uploaded_at,
+                total_uploads=latest.total_uploads,
+                avg_validation_rate=latest.avg_validation_rate or 0,
+                latest_upload_id=latest.id,
+                latest_period=latest.reporting_period,
+                latest_total_indicators=latest.total_indicators,
+                latest_valid_indicators=latest.valid_indicators,
+                latest_error_indicators=latest.error_indicators
+            ))
+    
+    def __repr__(self):
+        return f'<FacilityStats {self.facility_name} ({self.total_uploads} uploads)>'
+
+
 class DataProcessor:
     """
     Helper class for processing uploaded data files
@@ -3,16 +3,118 @@ User Model for Authentication and Authorization
 This module handles user management for the MOH MNCAH Dashboard System.
 """
 
+import hashlib
+import hmac
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
 from datetime import datetime
 from enum import Enum
-from typing import Optional, List
+from functools import lru_cache
+from typing import Optional, List, Tuple
 from werkzeug.security import generate_password_hash, check_password_hash
+from flask import current_app, has_app_context
 from flask_login import UserMixin
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Enum as SQLEnum, or_
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import validates
+from sqlalchemy.orm import validates, load_only
 
 Base = declarative_base()
+logger = logging.getLogger(__name__)
+
+
+# Marks hashes of the SHA-256 pre-hashed password (see prehash_password)
+PREHASH_PREFIX = 'sha256$'
+
+# werkzeug's scrypt defaults, spelled out so stored hashes can be compared
+DEFAULT_PASSWORD_HASH_METHOD = 'scrypt:32768:8:1'
+
+
+def prehash_password(password: str) -> str:
+    """
+    Reduce a password to a fixed-length hex SHA-256 digest before key stretching
+    
+    Keeps the slow hash input bounded and free of NUL bytes whatever the
+    passphrase length.
+    """
+    return hashlib.sha256(password.encode('utf-8')).hexdigest()
+
+
+def password_hash_method() -> str:
+    """Configured werkzeug hashing method (cost parameters included)"""
+    if has_app_context():
+        return current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_PASSWORD_HASH_METHOD)
+    return DEFAULT_PASSWORD_HASH_METHOD
+
+
+def hash_password(password: str) -> str:
+    """Hash a password in the current storage format"""
+    return PREHASH_PREFIX + generate_password_hash(
+        prehash_password(password), method=password_hash_method()
+    )
+
+
+# Optional process pool for password verification (PASSWORD_HASH_WORKERS > 0)
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+_hash_pool_pending = 0
+
+
+def _password_hash_pool() -> Tuple[Optional[ProcessPoolExecutor], int]:
+    """Lazily create the verification pool sized from config; (None, 0) when disabled"""
+    global _hash_pool
+    
+    workers = current_app.config.get('PASSWORD_HASH_WORKERS', 0) if has_app_context() else 0
+    if not workers:
+        return None, 0
+    
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(max_workers=workers)
+    return _hash_pool, workers
+
+
+def verify_password_hash(pwhash: str, password: str) -> bool:
+    """
+    Verify a password against a werkzeug hash, off the request thread when possible
+    
+    Runs inline when the pool is disabled, saturated (two queued checks per
+    worker) or broken. A check that is slow to start is cancelled and run
+    inline; one already running is waited for, so no password is hashed twice.
+    """
+    global _hash_pool_pending
+    
+    pool, workers = _password_hash_pool()
+    if pool is None:
+        return check_password_hash(pwhash, password)
+    
+    # Check and reserve a slot together so concurrent logins cannot overfill the queue
+    with _hash_pool_lock:
+        saturated = _hash_pool_pending >= workers * 2
+        if not saturated:
+            _hash_pool_pending += 1
+    if saturated:
+        return check_password_hash(pwhash, password)
+    
+    try:
+        future = pool.submit(check_password_hash, pwhash, password)
+        try:
+            return future.result(timeout=2.0)
+        except FuturesTimeoutError:
+            if not future.cancel():
+                return future.result()
+            logger.warning("Password hash pool busy, verifying inline")
+    except Exception as e:
+        # Submitting to or waiting on a broken pool; the check never completed
+        logger.warning("Password hash pool unavailable, verifying inline: %s", e)
+    finally:
+        with _hash_pool_lock:
+            _hash_pool_pending -= 1
+    
+    return check_password_hash(pwhash, password)
 
 
 class UserType(Enum):
@@ -68,6 +170,18 @@ class User(Base, UserMixin):
     account_locked_until = Column(DateTime, nullable=True)
     password_changed_at = Column(DateTime, default=datetime.utcnow)
     
+    # Columns read by to_dict() (and the permission checks it calls)
+    LIST_COLUMNS = (
+        'id', 'username', 'email', 'full_name', 'organization', 'position',
+        'user_type', 'status', 'created_at', 'last_login', 'login_count',
+        'account_locked_until'
+    )
+    
+    @classmethod
+    def list_load_option(cls):
+        """Loader option that skips credentials and fields not needed by to_dict()"""
+        return load_only(*(getattr(cls, name) for name in cls.LIST_COLUMNS))
+    
     def __init__(self, username: str, password: str, user_type: UserType = UserType.STAKEHOLDER, **kwargs):
         """
         Initialize user with required fields
@@ -94,9 +208,33 @@ class User(Base, UserMixin):
         Args:
             password: Plain text password
         """
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
         self.password_changed_at = datetime.utcnow()
     
+    def password_needs_rehash(self) -> bool:
+        """Check if the stored hash uses a legacy format or another hashing method"""
+        if not self.password_hash.startswith(PREHASH_PREFIX):
+            return True
+        
+        method = self.password_hash[len(PREHASH_PREFIX):].split('$', 1)[0]
+        return method != password_hash_method()
+    
+    def upgrade_password_hash(self, password: str) -> bool:
+        """
+        Re-hash a verified password if its stored hash is out of date
+        
+        Args:
+            password: Plain text password that has just been verified
+            
+        Returns:
+            True if the stored hash was replaced
+        """
+        if not self.password_needs_rehash():
+            return False
+        
+        self.password_hash = hash_password(password)
+        return True
+    
     def check_password(self, password: str) -> bool:
         """
         Check if provided password matches stored hash
@@ -107,7 +245,12 @@ class User(Base, UserMixin):
         Returns:
             True if password matches, False otherwise
         """
-        return check_password_hash(self.password_hash, password)
+        # werkzeug compares the derived hash with hmac.compare_digest
+        if self.password_hash.startswith(PREHASH_PREFIX):
+            return verify_password_hash(self.password_hash[len(PREHASH_PREFIX):], prehash_password(password))
+        
+        # Legacy hashes of the raw password, upgraded on next successful login
+        return verify_password_hash(self.password_hash, password)
     
     def is_admin(self) -> bool:
         """Check if user is an admin (can upload data)"""
@@ -157,10 +300,12 @@ class User(Base, UserMixin):
         """Record failed login attempt"""
         self.failed_login_attempts += 1
         
-        # Lock account after 5 failed attempts for 30 minutes
+        # Lock account after 5 failed attempts for 30 minutes, doubling for
+        # each further failure (capped at 8 hours)
         if self.failed_login_attempts >= 5:
             from datetime import timedelta
-            self.account_locked_until = datetime.utcnow() + timedelta(minutes=30)
+            backoff = 2 ** min(self.failed_login_attempts - 5, 4)
+            self.account_locked_until = datetime.utcnow() + timedelta(minutes=30 * backoff)
     
     def unlock_account(self) -> None:
         """Unlock user account (admin function)"""
@@ -335,6 +480,74 @@ class UserSession:
         }
 
 
+class AuthenticationCache:
+    """
+    Short-lived in-process cache of successful password checks
+    
+    Keys are HMAC-SHA256 digests of username and password under a per-process
+    random key, so plain passwords are never held. Each entry remembers the
+    password hash it was verified against and is ignored once that changes.
+    """
+    
+    def __init__(self, maxsize: int = 10000, ttl: int = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # Keyed once; per-call copies skip re-deriving the HMAC pads
+        self._hmac = hmac.new(secrets.token_bytes(32), digestmod=hashlib.sha256)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _make_key(self, username: str, password: str) -> bytes:
+        mac = self._hmac.copy()
+        mac.update(f"{username}\0{password}".encode('utf-8'))
+        return mac.digest()
+    
+    def get(self, username: str, password: str) -> Optional[Tuple[int, str]]:
+        """Return (user_id, password_hash) for a cached successful login, if fresh"""
+        key = self._make_key(username, password)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            user_id, password_hash, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            
+            self._entries.move_to_end(key)
+            return user_id, password_hash
+    
+    def add(self, username: str, password: str, user: 'User') -> None:
+        """Remember a successful password check for this user"""
+        key = self._make_key(username, password)
+        with self._lock:
+            self._entries[key] = (user.id, user.password_hash, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop every cached login for a user (password or status change)"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[0] == user_id]:
+                del self._entries[key]
+    
+    def clear(self) -> None:
+        """Drop all cached logins"""
+        with self._lock:
+            self._entries.clear()
+
+
+auth_cache = AuthenticationCache()
+
+
+@lru_cache(maxsize=1)
+def _dummy_password_hash() -> str:
+    """Hash of a random secret, built once with the same method as real passwords"""
+    return generate_password_hash(secrets.token_urlsafe(32), method=password_hash_method())
+
+
 # User management utility functions
 class UserManager:
     """Utility class for common user management operations"""
@@ -353,24 +566,47 @@ class UserManager:
             User object if authentication successful, None otherwise
         """
         try:
-            user = session.query(User).filter(
-                User.username == username.lower().strip()
-            ).first()
+            username = username.lower().strip()
             
-            if user and user.check_password(password):
-                if user.is_active():
+            # Repeat logins within the cache TTL skip the password hash check
+            cached = auth_cache.get(username, password)
+            if cached:
+                user_id, password_hash = cached
+                user = session.get(User, user_id)
+                if user and hmac.compare_digest(user.password_hash, password_hash) and user.is_active():
                     user.record_login()
+                    session.commit()
                     return user
-                else:
-                    # Account is locked or inactive
-                    return None
+                auth_cache.invalidate_user(user_id)
+            
+            # Inactive and locked accounts are excluded up front so they never
+            # reach a real password check (or extend their lockout)
+            user = session.query(User).filter(
+                User.username == username,
+                User.status == UserStatus.ACTIVE,
+                or_(User.account_locked_until.is_(None),
+                    User.account_locked_until < datetime.utcnow())
+            ).first()
+            
+            if user is None:
+                # Hash against a throwaway value so unknown, inactive and locked
+                # usernames take as long as bad passwords
+                verify_password_hash(_dummy_password_hash(), prehash_password(password))
+                return None
+            
+            if user.check_password(password):
+                user.upgrade_password_hash(password)
+                user.record_login()
+                session.commit()
+                auth_cache.add(username, password, user)
+                return user
             else:
-                if user:
-                    user.record_failed_login()
+                user.record_failed_login()
+                session.commit()
                 return None
                 
         except Exception as e:
-            print(f"Authentication error: {e}")
+            logger.error("Authentication error: %s", e)
             return None
     
     @staticmethod
@@ -4,9 +4,11 @@ This service coordinates all MNCAH calculations and provides a unified interface
 for processing health indicator data.
 """
 
-from typing import Dict, List, Any, Optional, Tuple
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple, Iterable
 from datetime import datetime
 import logging
+import numpy as np
 
 from ..models.base import PopulationData, PeriodType, ValidationStatus
 from ..models.anc import AntenatalCare
@@ -117,11 +119,9 @@ class MNCHACalculationService:
         
         # Calculate summary statistics
         indicator_values = list(all_indicators.values())
+        status_counts = Counter(all_validations.values())
         validation_counts = {
-            'green': sum(1 for v in all_validations.values() if v == 'green'),
-            'yellow': sum(1 for v in all_validations.values() if v == 'yellow'),
-            'red': sum(1 for v in all_validations.values() if v == 'red'),
-            'blue': sum(1 for v in all_validations.values() if v == 'blue')
+            status: status_counts[status] for status in ('green', 'yellow', 'red', 'blue')
         }
         
         total_indicators = len(all_indicators)
@@ -159,11 +159,9 @@ class MNCHACalculationService:
         indicators = category_results['indicators']
         validations = category_results['validations']
         
+        status_counts = Counter(validations.values())
         validation_counts = {
-            'green': sum(1 for v in validations.values() if v == 'green'),
-            'yellow': sum(1 for v in validations.values() if v == 'yellow'),
-            'red': sum(1 for v in validations.values() if v == 'red'),
-            'blue': sum(1 for v in validations.values() if v == 'blue')
+            status: status_counts[status] for status in ('green', 'yellow', 'red', 'blue')
         }
         
         total = len(indicators)
@@ -202,36 +200,53 @@ class MNCHACalculationService:
             facility_name: Name of the facility
             uploads: List of upload data dictionaries
             
+        Returns:
+            Trend analysis results
+        """
+        # Sort uploads by reporting period/date
+        sorted_uploads = sorted(uploads, key=lambda x: x.get('uploaded_at', ''))
+        
+        series = (
+            (upload.get('reporting_period', 'Unknown'), upload.get('uploaded_at'), upload['processed_data'])
+            for upload in sorted_uploads
+            if 'processed_data' in upload
+        )
+        
+        return self.get_indicator_trends_from_series(facility_name, series)
+    
+    def get_indicator_trends_from_series(self, facility_name: str,
+                                         series: Iterable[Tuple[str, Any, Dict]]) -> Dict[str, Any]:
+        """
+        Analyze trends for indicators from a stream of upload rows
+        
+        Args:
+            facility_name: Name of the facility
+            series: Iterable of (reporting_period, uploaded_at, processed_data) tuples,
+                    ordered oldest first. May be a generator over a database cursor.
+            
         Returns:
             Trend analysis results
         """
         try:
             trends = {}
             
-            # Sort uploads by reporting period/date
-            sorted_uploads = sorted(uploads, key=lambda x: x.get('uploaded_at', ''))
-            
-            if len(sorted_uploads) < 2:
-                return {
-                    'message': 'Insufficient data for trend analysis (minimum 2 data points required)',
-                    'data_points': len(sorted_uploads)
-                }
-            
             # Extract indicators across time periods
             all_periods = []
             indicator_series = {}
             
-            for upload in sorted_uploads:
-                if 'processed_data' not in upload:
+            for period, uploaded_at, processed_data in series:
+                if processed_data is None:
                     continue
                 
-                period = upload.get('reporting_period', 'Unknown')
+                period = period or 'Unknown'
+                if isinstance(uploaded_at, datetime):
+                    uploaded_at = uploaded_at.isoformat()
                 all_periods.append(period)
                 
                 # Extract indicators from all categories
                 for category in ['anc', 'intrapartum', 'pnc']:
-                    if category in upload['processed_data']:
-                        indicators = upload['processed_data'][category].get('indicators', {})
+                    if category in processed_data:
+                        indicators = processed_data[category].get('indicators', {})
                         for indicator, value in indicators.items():
                             full_name = f"{category}_{indicator}"
                             if full_name not in indicator_series:
@@ -239,13 +254,19 @@ class MNCHACalculationService:
                             indicator_series[full_name].append({
                                 'period': period,
                                 'value': value,
-                                'date': upload.get('uploaded_at')
+                                'date': uploaded_at
                             })
             
+            if len(all_periods) < 2:
+                return {
+                    'message': 'Insufficient data for trend analysis (minimum 2 data points required)',
+                    'data_points': len(all_periods)
+                }
+            
             # Calculate trends for each indicator
-            for indicator, series in indicator_series.items():
-                if len(series) >= 2:
-                    trends[indicator] = self._calculate_trend(series)
+            for indicator, series_points in indicator_series.items():
+                if len(series_points) >= 2:
+                    trends[indicator] = self._calculate_trend(series_points)
             
             return {
                 'facility_name': facility_name,
@@ -300,9 +321,10 @@ class MNCHACalculationService:
         if not trends:
             return {}
         
-        improving_count = sum(1 for t in trends.values() if t['recent_trend'] == 'improving')
-        declining_count = sum(1 for t in trends.values() if t['recent_trend'] == 'declining')
-        stable_count = sum(1 for t in trends.values() if t['recent_trend'] == 'stable')
+        trend_counts = Counter(t['recent_trend'] for t in trends.values())
+        improving_count = trend_counts['improving']
+        declining_count = trend_counts['declining']
+        stable_count = trend_counts['stable']
         
         total = len(trends)
         
@@ -355,36 +377,44 @@ class MNCHACalculationService:
                                 full_name = f"{category}_{indicator}"
                                 facility_indicators[facility_name][full_name] = value
             
-            # Calculate comparative statistics
-            comparison_results = {}
-            all_indicators = set()
+            # Stack values into a facilities x indicators matrix (NaN where missing)
+            facility_names = list(facility_indicators.keys())
+            all_indicators = sorted(set().union(*facility_indicators.values()))
+            matrix = np.full((len(facility_names), len(all_indicators)), np.nan)
             
-            # Get all unique indicators
-            for facility_data in facility_indicators.values():
-                all_indicators.update(facility_data.keys())
+            for row, facility in enumerate(facility_names):
+                for col, indicator in enumerate(all_indicators):
+                    value = facility_indicators[facility].get(indicator)
+                    if value is not None:
+                        matrix[row, col] = value
             
-            # Compare each indicator across facilities
-            for indicator in all_indicators:
-                values = []
-                facility_values = {}
-                
-                for facility, indicators in facility_indicators.items():
-                    if indicator in indicators:
-                        value = indicators[indicator]
-                        values.append(value)
-                        facility_values[facility] = value
+            # Column-wise statistics in one vectorised pass
+            present = ~np.isnan(matrix)
+            counts = present.sum(axis=0)
+            compared = counts >= 2
+            means = np.nanmean(matrix[:, compared], axis=0)
+            mins = np.nanmin(matrix[:, compared], axis=0)
+            maxs = np.nanmax(matrix[:, compared], axis=0)
+            
+            # Compare each indicator reported by at least two facilities
+            comparison_results = {}
+            for i, col in enumerate(np.flatnonzero(compared)):
+                indicator = all_indicators[col]
+                facility_values = {
+                    facility_names[row]: float(matrix[row, col])
+                    for row in np.flatnonzero(present[:, col])
+                }
                 
-                if len(values) >= 2:
-                    comparison_results[indicator] = {
-                        'values_by_facility': facility_values,
-                        'statistics': {
-                            'mean': sum(values) / len(values),
-                            'min': min(values),
-                            'max': max(values),
-                            'range': max(values) - min(values)
-                        },
-                        'rankings': self._rank_facilities(facility_values, indicator)
-                    }
+                comparison_results[indicator] = {
+                    'values_by_facility': facility_values,
+                    'statistics': {
+                        'mean': float(means[i]),
+                        'min': float(mins[i]),
+                        'max': float(maxs[i]),
+                        'range': float(maxs[i] - mins[i])
+                    },
+                    'rankings': self._rank_facilities(facility_values, indicator)
+                }
             
             return {
                 'analysis_date': datetime.utcnow().isoformat(),
@@ -439,9 +469,9 @@ class MNCHACalculationService:
                 top_facility = rankings[0]['facility']
                 facility_rankings[top_facility]['top_rankings'] += 1
                 
-                for facility in facilities:
-                    if any(r['facility'] == facility for r in rankings):
-                        facility_rankings[facility]['total_indicators'] += 1
+                # Each facility appears at most once per indicator's rankings
+                for ranking in rankings:
+                    facility_rankings[ranking['facility']]['total_indicators'] += 1
         
         # Calculate performance scores
         for facility, stats in facility_rankings.items():
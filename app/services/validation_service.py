@@ -5,6 +5,7 @@ for the MOH MNCAH Dashboard System.
 """
 
 import logging
+from collections import Counter
 from typing import Dict, List, Any, Tuple, Optional
 from datetime import datetime, timedelta
 from dataclasses import dataclass
@@ -38,15 +39,24 @@ class DataValidationService:
     Service for comprehensive data validation and quality assessment
     """
     
+    # Rule and threshold tables are read-only, so they are built once per process
+    _shared_validation_rules = None
+    _shared_outlier_thresholds = None
+    
     def __init__(self):
         """Initialize validation service"""
         self.logger = logging.getLogger(__name__)
         
+        cls = type(self)
+        if cls._shared_validation_rules is None:
+            cls._shared_validation_rules = self._initialize_validation_rules()
+            cls._shared_outlier_thresholds = self._initialize_outlier_thresholds()
+        
         # Define validation rules for each indicator
-        self.validation_rules = self._initialize_validation_rules()
+        self.validation_rules = cls._shared_validation_rules
         
         # Define outlier detection thresholds
-        self.outlier_thresholds = self._initialize_outlier_thresholds()
+        self.outlier_thresholds = cls._shared_outlier_thresholds
     
     def _initialize_validation_rules(self) -> Dict[str, Dict]:
         """Initialize comprehensive validation rules for all indicators"""
@@ -296,8 +306,33 @@ class DataValidationService:
         Returns:
             Validation report with issues and recommendations
         """
+        return self._build_validation_report(processed_data, datetime.utcnow().isoformat())
+    
+    def validate_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Validate several processed_data payloads in one pass
+        
+        Indicator checks are shared across the batch, so a value seen in
+        several uploads is only validated once.
+        
+        Args:
+            items: List of processed_data dictionaries
+            
+        Returns:
+            Validation reports, in the same order as items
+        """
+        validation_date = datetime.utcnow().isoformat()
+        indicator_issues = {}
+        return [
+            self._build_validation_report(processed_data, validation_date, indicator_issues)
+            for processed_data in items
+        ]
+    
+    def _build_validation_report(self, processed_data: Dict[str, Any], validation_date: str,
+                                 indicator_issues: Optional[Dict] = None) -> Dict[str, Any]:
+        """Build a validation report, optionally reusing indicator results from a batch"""
         validation_report = {
-            'validation_date': datetime.utcnow().isoformat(),
+            'validation_date': validation_date,
             'overall_status': 'valid',
             'issues': [],
             'summary': {
@@ -316,7 +351,8 @@ class DataValidationService:
                 if category in processed_data:
                     category_issues = self._validate_category(
                         category, 
-                        processed_data[category]
+                        processed_data[category],
+                        indicator_issues
                     )
                     validation_report['issues'].extend(category_issues)
             
@@ -336,7 +372,8 @@ class DataValidationService:
             validation_report['error'] = str(e)
             return validation_report
     
-    def _validate_category(self, category: str, category_data: Dict) -> List[ValidationIssue]:
+    def _validate_category(self, category: str, category_data: Dict,
+                           indicator_cache: Optional[Dict] = None) -> List[ValidationIssue]:
         """Validate indicators within a specific category"""
         issues = []
         
@@ -344,9 +381,17 @@ class DataValidationService:
         validations = category_data.get('validations', {})
         
         for indicator, value in indicators.items():
-            indicator_issues = self._validate_indicator(
-                category, indicator, value, validations.get(indicator)
-            )
+            if indicator_cache is None:
+                indicator_issues = self._validate_indicator(
+                    category, indicator, value, validations.get(indicator)
+                )
+            else:
+                key = (category, indicator, value)
+                indicator_issues = indicator_cache.get(key)
+                if indicator_issues is None:
+                    indicator_issues = indicator_cache[key] = self._validate_indicator(
+                        category, indicator, value, validations.get(indicator)
+                    )
             issues.extend(indicator_issues)
         
         return issues
@@ -449,9 +494,10 @@ class DataValidationService:
         issues = validation_report['issues']
         
         # Count by severity
-        critical_count = sum(1 for issue in issues if issue.severity == ValidationSeverity.CRITICAL)
-        error_count = sum(1 for issue in issues if issue.severity == ValidationSeverity.ERROR)
-        warning_count = sum(1 for issue in issues if issue.severity == ValidationSeverity.WARNING)
+        severity_counts = Counter(issue.severity for issue in issues)
+        critical_count = severity_counts[ValidationSeverity.CRITICAL]
+        error_count = severity_counts[ValidationSeverity.ERROR]
+        warning_count = severity_counts[ValidationSeverity.WARNING]
         
         validation_report['summary'].update({
             'issues_found': len(issues),
@@ -661,14 +707,11 @@ class DataValidationService:
         if not anomalies:
             return {'total_anomalies': 0, 'message': 'No anomalies detected'}
         
-        severity_counts = {}
-        for anomaly in anomalies:
-            severity = anomaly.get('severity', 'unknown')
-            severity_counts[severity] = severity_counts.get(severity, 0) + 1
+        severity_counts = Counter(anomaly.get('severity', 'unknown') for anomaly in anomalies)
         
         return {
             'total_anomalies': len(anomalies),
-            'severity_distribution': severity_counts,
+            'severity_distribution': dict(severity_counts),
             'most_severe': max(anomalies, key=lambda x: {'extreme': 4, 'severe': 3, 'mild': 2}.get(x.get('severity'), 1)),
             'categories_affected': len(set(a['indicator'].split('_')[0] for a in anomalies))
         }
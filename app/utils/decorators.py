@@ -4,14 +4,34 @@ This module provides decorators for authentication, authorization, and other uti
 for the MOH MNCAH Dashboard System.
 """
 
+import threading
+import time
 from functools import wraps
-from flask import abort, request, jsonify, flash, redirect, url_for
+from flask import abort, request, jsonify, flash, redirect, url_for, session, current_app, g, has_request_context
 from flask_login import current_user
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def get_current_user_permissions():
+    """
+    Get the current user's permissions, preferring the copy stored at login
+    
+    The login session already carries the permission list, so hot paths
+    (context processors, permission checks) avoid rebuilding it per request.
+    """
+    if not current_user.is_authenticated:
+        return []
+    
+    user_session = session.get('user_session') or {}
+    permissions = user_session.get('permissions')
+    if permissions is None or user_session.get('user_id') != current_user.id:
+        permissions = current_user.get_permissions()
+    
+    return permissions
+
+
 def admin_required(f):
     """
     Decorator to require admin privileges
@@ -92,7 +112,7 @@ def permission_required(permission):
                     return jsonify({'error': 'Authentication required'}), 401
                 return redirect(url_for('auth.login'))
             
-            if permission not in current_user.get_permissions():
+            if permission not in get_current_user_permissions():
                 logger.warning(f"User {current_user.username} lacks permission '{permission}' for resource")
                 
                 if request.is_json:
@@ -192,13 +212,15 @@ def validate_json_fields(required_fields):
     return decorator
 
 
-def rate_limit(max_requests=100, window=3600):
+def rate_limit(max_requests=100, window=3600, key_func=None, methods=None):
     """
-    Simple rate limiting decorator
+    Rate limiting decorator backed by Flask-Limiter
     
     Args:
         max_requests: Maximum requests allowed
         window: Time window in seconds
+        key_func: Callable returning the bucket key (defaults to client IP)
+        methods: HTTP methods to limit (defaults to all)
         
     Usage:
         @rate_limit(max_requests=10, window=60)
@@ -206,16 +228,35 @@ def rate_limit(max_requests=100, window=3600):
             pass
     """
     def decorator(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            # Simple implementation - in production, use Redis or proper rate limiter
-            # This is a placeholder for demonstration
-            return f(*args, **kwargs)
+        from .. import limiter
         
-        return decorated_function
+        # Without Flask-Limiter installed the view is left unlimited
+        if limiter is None:
+            return f
+        
+        return limiter.limit(
+            f"{max_requests} per {window} second",
+            key_func=key_func,
+            methods=methods
+        )(f)
+    
     return decorator
 
 
+def request_username_key():
+    """Rate limit key for the username submitted in a form or JSON body"""
+    # Don't parse oversized bodies just to find a key; the view rejects them
+    if (request.content_length or 0) > current_app.config.get('AUTH_MAX_CONTENT_LENGTH', 4096):
+        return 'username:'
+    
+    if request.is_json:
+        data = request.get_json(silent=True)
+        username = (data.get('username') if isinstance(data, dict) else None) or ''
+    else:
+        username = request.form.get('username', '')
+    return f"username:{str(username).lower().strip()}"
+
+
 def log_activity(action_type=None):
     """
     Decorator to log user activity
@@ -322,6 +363,95 @@ def cache_response(timeout=300):
     return decorator
 
 
+# Registry of ttl_cache-wrapped functions so data changes can drop every entry
+_ttl_cached_functions = []
+
+
+def ttl_cache(ttl=30):
+    """
+    Decorator to memoize a function result in-process for a limited time
+    
+    Results are keyed on the call arguments. Entries expire after ``ttl``
+    seconds or when clear_ttl_caches() is called after data changes.
+    
+    Args:
+        ttl: Cache lifetime in seconds
+        
+    Usage:
+        @ttl_cache(ttl=30)
+        def system_summary():
+            pass
+    """
+    def decorator(f):
+        cache = {}
+        lock = threading.Lock()
+        state = {'generation': 0}
+        
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            
+            with lock:
+                entry = cache.get(key)
+                if entry is not None and entry[0] > now:
+                    return entry[1]
+                generation = state['generation']
+            
+            result = f(*args, **kwargs)
+            
+            with lock:
+                # Don't store a result computed before an invalidation
+                if state['generation'] == generation:
+                    cache[key] = (now + ttl, result)
+            
+            return result
+        
+        def cache_clear():
+            with lock:
+                cache.clear()
+                state['generation'] += 1
+        
+        decorated_function.cache_clear = cache_clear
+        _ttl_cached_functions.append(decorated_function)
+        return decorated_function
+    
+    return decorator
+
+
+def clear_ttl_caches():
+    """Drop all results memoized with ttl_cache (call after uploads change)"""
+    for cached_function in _ttl_cached_functions:
+        cached_function.cache_clear()
+
+
+def request_cache(f):
+    """
+    Decorator to memoize a function result for the rest of the current request
+    
+    Lets several callers within one request (views, helpers, context
+    processors) share a single computation. Outside a request context the
+    function is simply called.
+    
+    Usage:
+        @request_cache
+        def dashboard_totals():
+            pass
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not has_request_context():
+            return f(*args, **kwargs)
+        
+        store = g.setdefault('_request_cache', {})
+        key = (f.__module__, f.__qualname__, args, tuple(sorted(kwargs.items())))
+        if key not in store:
+            store[key] = f(*args, **kwargs)
+        return store[key]
+    
+    return decorated_function
+
+
 def validate_form_fields(required_fields):
     """
     Decorator to validate required form fields
@@ -1 +1,25 @@
-# Helper functions
+"""
+Helper Functions
+Small query and statistics helpers shared by the MOH MNCAH Dashboard views.
+"""
+
+import numpy as np
+
+
+def escape_like(value):
+    """Escape LIKE wildcards so user input is matched literally"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def calculate_median(values):
+    """Calculate median with an O(n) selection instead of a full sort"""
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
+        return 0
+    
+    k = values.size // 2
+    if values.size % 2:
+        return float(np.partition(values, k)[k])
+    
+    partitioned = np.partition(values, (k - 1, k))
+    return float((partitioned[k - 1] + partitioned[k]) / 2)
@@ -9,6 +9,7 @@ from flask_login import login_required, current_user
 from sqlalchemy import desc, func
 from datetime import datetime, timedelta
 import logging
+from collections import Counter
 
 from ..models.upload import DataUpload, UploadStatus
 from ..services.calculation_service import MNCHACalculationService
@@ -205,7 +206,7 @@ def view_upload(upload_id):
     View detailed analysis for a specific upload
     """
     try:
-        upload = DataUpload.query.get_or_404(upload_id)
+        upload = db.get_or_404(DataUpload, upload_id)
         
         # Get detailed analysis
         detailed_analysis = get_upload_detailed_analysis(upload)
@@ -497,6 +498,7 @@ def get_indicator_detailed_analysis(indicator_name):
         
         # Calculate statistics
         values = [item['value'] for item in indicator_data]
+        validation_counts = Counter(item['validation'] for item in indicator_data)
         
         analysis = {
             'indicator_name': indicator_name,
@@ -509,10 +511,7 @@ def get_indicator_detailed_analysis(indicator_name):
                 'range': max(values) - min(values)
             },
             'performance_distribution': {
-                'green': sum(1 for item in indicator_data if item['validation'] == 'green'),
-                'yellow': sum(1 for item in indicator_data if item['validation'] == 'yellow'),
-                'red': sum(1 for item in indicator_data if item['validation'] == 'red'),
-                'blue': sum(1 for item in indicator_data if item['validation'] == 'blue')
+                status: validation_counts[status] for status in ('green', 'yellow', 'red', 'blue')
             }
         }
         
@@ -680,8 +679,7 @@ def get_category_performance_analysis(uploads, category):
     }
     
     for upload in uploads:
-        summary = upload.get_validation_summary()
-        validation_rate = summary.get('validation_rate', 0)
+        validation_rate = upload.validation_rate
         
         if validation_rate >= 90:
             performance_data['excellent'] += 1
@@ -738,7 +736,7 @@ def calculate_system_trends(upload_dicts):
         trends[period] = {
             'validation_rate': avg_rate,
             'upload_count': len(uploads),
-            'facilities': len(set(upload.get('facility_name') for upload in uploads))
+            'facilities': len({upload.get('facility_name') for upload in uploads})
         }
     
     return {
@@ -4,17 +4,29 @@ This module provides REST API endpoints for external integrations and modern fro
 applications to interact with the MOH MNCAH Dashboard System.
 """
 
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, stream_with_context
 from flask_login import login_required, current_user
-from sqlalchemy import desc, func
+from sqlalchemy import String, bindparam, case, desc, distinct, func, literal, select, tuple_, union_all
+from collections import Counter
 from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import chain
+import json
 import logging
 
-from ..models.upload import DataUpload, UploadStatus
-from ..models.user import User, UserType
+# Fast JSON serialization (falls back to Flask's jsonify when unavailable)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from ..models.upload import DataUpload, UploadStatus, FacilityStats
+from ..models.user import User, UserType, UserStatus
 from ..services.calculation_service import MNCHACalculationService
 from ..services.validation_service import DataValidationService
-from ..utils.decorators import admin_required, stakeholder_or_admin_required
+from ..utils.decorators import admin_required, stakeholder_or_admin_required, ttl_cache, get_current_user_permissions
+from ..utils.helpers import calculate_median, escape_like
 from .. import db
 
 
@@ -23,11 +35,64 @@ api_bp = Blueprint('api', __name__)
 logger = logging.getLogger(__name__)
 
 
+# Hot statements are built once at import with bound parameters, so each
+# request reuses the compiled form from the engine's statement cache
+UPLOAD_COUNT_STMT = select(func.count(DataUpload.id))
+UPLOAD_COUNT_BY_STATUS_STMT = select(func.count(DataUpload.id)).where(
+    DataUpload.status == bindparam('status')
+)
+UPLOAD_COUNT_SINCE_STMT = select(func.count(DataUpload.id)).where(
+    DataUpload.uploaded_at >= bindparam('since')
+)
+FACILITY_COUNT_STMT = select(func.count(distinct(DataUpload.facility_name)))
+DISTRICT_COUNT_STMT = select(func.count(distinct(DataUpload.district)))
+USER_COUNT_BY_STATUS_STMT = select(func.count(User.id)).where(
+    User.status == bindparam('status')
+)
+UPLOADS_BY_STATUS_STMT = select(DataUpload).where(DataUpload.status == bindparam('status'))
+UPLOAD_QUALITY_TOTALS_STMT = select(
+    func.count(DataUpload.id),
+    func.coalesce(func.sum(DataUpload.total_indicators), 0),
+    func.coalesce(func.sum(DataUpload.valid_indicators), 0),
+    func.coalesce(func.sum(DataUpload.warning_indicators), 0),
+    func.coalesce(func.sum(DataUpload.error_indicators), 0)
+).where(DataUpload.status == bindparam('status'))
+UPLOAD_PERFORMANCE_BANDS_STMT = select(
+    func.count(DataUpload.id),
+    func.avg(DataUpload.validation_rate),
+    func.sum(case((DataUpload.validation_rate >= 90, 1), else_=0)),
+    func.sum(case(((DataUpload.validation_rate >= 75) & (DataUpload.validation_rate < 90), 1), else_=0)),
+    func.sum(case(((DataUpload.validation_rate >= 60) & (DataUpload.validation_rate < 75), 1), else_=0)),
+    func.sum(case((DataUpload.validation_rate < 60, 1), else_=0))
+).where(DataUpload.status == bindparam('status'))
+
+
+def dump_json(obj):
+    """Encode an object to JSON bytes, using orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj).encode('utf-8')
+
+
+def ojsonify(obj, status=200):
+    """Serialize an API payload with orjson into a JSON response"""
+    if not ORJSON_AVAILABLE:
+        response = jsonify(obj)
+        response.status_code = status
+        return response
+    
+    return current_app.response_class(
+        orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY),
+        status=status,
+        mimetype='application/json'
+    )
+
+
 # API Version and Info
 @api_bp.route('/info')
 def api_info():
     """API information endpoint"""
-    return jsonify({
+    return ojsonify({
         'api_version': '1.0.0',
         'service': 'MOH MNCAH Dashboard API',
         'description': 'Maternal, Neonatal, Child and Adolescent Health Analytics API',
@@ -50,7 +115,7 @@ def api_info():
 @login_required
 def auth_status():
     """Get current authentication status"""
-    return jsonify({
+    return ojsonify({
         'authenticated': True,
         'user': {
             'id': current_user.id,
@@ -58,7 +123,7 @@ def auth_status():
             'user_type': current_user.user_type.value,
             'full_name': current_user.full_name,
             'organization': current_user.organization,
-            'permissions': current_user.get_permissions(),
+            'permissions': get_current_user_permissions(),
             'last_login': current_user.last_login.isoformat() if current_user.last_login else None
         },
         'session_info': {
@@ -76,29 +141,33 @@ def auth_status():
 def dashboard_stats():
     """Get dashboard statistics"""
     try:
+        now = datetime.utcnow()
+        
         stats = {
             'overview': {
-                'total_uploads': DataUpload.query.count(),
-                'completed_uploads': DataUpload.query.filter_by(status=UploadStatus.COMPLETED).count(),
-                'total_facilities': db.session.query(DataUpload.facility_name).distinct().count(),
-                'total_districts': db.session.query(DataUpload.district).filter(
-                    DataUpload.district.isnot(None)
-                ).distinct().count(),
-                'active_users': User.query.filter_by(status='active').count()
+                'total_uploads': db.session.scalar(UPLOAD_COUNT_STMT),
+                'completed_uploads': db.session.scalar(
+                    UPLOAD_COUNT_BY_STATUS_STMT, {'status': UploadStatus.COMPLETED}
+                ),
+                'total_facilities': db.session.scalar(FACILITY_COUNT_STMT),
+                'total_districts': db.session.scalar(DISTRICT_COUNT_STMT),
+                'active_users': db.session.scalar(
+                    USER_COUNT_BY_STATUS_STMT, {'status': UserStatus.ACTIVE}
+                )
             },
             'recent_activity': {
-                'uploads_last_30_days': DataUpload.query.filter(
-                    DataUpload.uploaded_at >= datetime.utcnow() - timedelta(days=30)
-                ).count(),
-                'uploads_last_7_days': DataUpload.query.filter(
-                    DataUpload.uploaded_at >= datetime.utcnow() - timedelta(days=7)
-                ).count()
+                'uploads_last_30_days': db.session.scalar(
+                    UPLOAD_COUNT_SINCE_STMT, {'since': now - timedelta(days=30)}
+                ),
+                'uploads_last_7_days': db.session.scalar(
+                    UPLOAD_COUNT_SINCE_STMT, {'since': now - timedelta(days=7)}
+                )
             },
             'data_quality': get_system_data_quality_stats(),
             'performance_summary': get_system_performance_summary()
         }
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': stats,
             'timestamp': datetime.utcnow().isoformat()
@@ -106,7 +175,7 @@ def dashboard_stats():
     
     except Exception as e:
         logger.error(f"Error getting dashboard stats: {str(e)}")
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': 'Failed to retrieve dashboard statistics',
             'message': str(e)
@@ -117,33 +186,65 @@ def dashboard_stats():
 @api_bp.route('/uploads')
 @login_required
 def get_uploads():
-    """Get uploads with pagination and filtering"""
+    """
+    Get uploads with pagination and filtering
+    
+    Filters:
+        facility_prefix: case-insensitive "starts with" match on facility name
+            (served by the lower(facility_name) index)
+        facility, district, period: case-insensitive substring match
+            (facility is trigram-indexed on PostgreSQL)
+    """
     try:
         # Pagination parameters
-        page = request.args.get('page', 1, type=int)
+        page = max(request.args.get('page', 1, type=int), 1)
         per_page = min(request.args.get('per_page', 20, type=int), 100)  # Max 100 items
+        include_total = request.args.get('include_total', '').lower() in ['1', 'true', 'yes']
+        
+        # Keyset cursor (takes precedence over page offsets when supplied)
+        after_id = request.args.get('after_id', type=int)
+        after_uploaded_at = request.args.get('after_uploaded_at')
+        use_cursor = after_id is not None and bool(after_uploaded_at)
+        if use_cursor:
+            try:
+                after_uploaded_at = datetime.fromisoformat(after_uploaded_at)
+            except ValueError:
+                return ojsonify({
+                    'success': False,
+                    'error': 'Invalid after_uploaded_at cursor, expected ISO 8601 timestamp'
+                }), 400
         
         # Filter parameters
         status_filter = request.args.get('status')
+        facility_prefix = request.args.get('facility_prefix')
         facility_filter = request.args.get('facility')
         district_filter = request.args.get('district')
         period_filter = request.args.get('period')
         
-        # Build query
-        query = DataUpload.query
+        # Build query (list rows only need the summary columns)
+        query = DataUpload.query.options(DataUpload.summary_load_option())
         
         if status_filter:
             try:
                 query = query.filter_by(status=UploadStatus(status_filter))
             except ValueError:
-                return jsonify({
+                return ojsonify({
                     'success': False,
                     'error': 'Invalid status filter',
                     'valid_statuses': [status.value for status in UploadStatus]
                 }), 400
         
+        facility_name_lower = func.lower(DataUpload.facility_name)
+        
+        if facility_prefix:
+            query = query.filter(
+                facility_name_lower.like(f'{escape_like(facility_prefix.lower())}%', escape='\\')
+            )
+        
         if facility_filter:
-            query = query.filter(DataUpload.facility_name.ilike(f'%{facility_filter}%'))
+            query = query.filter(
+                facility_name_lower.like(f'%{escape_like(facility_filter.lower())}%', escape='\\')
+            )
         
         if district_filter:
             query = query.filter(DataUpload.district.ilike(f'%{district_filter}%'))
@@ -151,24 +252,43 @@ def get_uploads():
         if period_filter:
             query = query.filter(DataUpload.reporting_period.ilike(f'%{period_filter}%'))
         
-        # Paginate results
-        uploads = query.order_by(desc(DataUpload.uploaded_at)).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        # Only count when the client asks for it - COUNT(*) scans the filtered set
+        total = query.order_by(None).count() if include_total else None
         
-        return jsonify({
+        # Paginate results, fetching one extra row to detect a next page
+        page_query = query.order_by(desc(DataUpload.uploaded_at), desc(DataUpload.id))
+        if use_cursor:
+            page_query = page_query.filter(
+                tuple_(DataUpload.uploaded_at, DataUpload.id) < (after_uploaded_at, after_id)
+            )
+        else:
+            page_query = page_query.offset((page - 1) * per_page)
+        
+        rows = page_query.limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        uploads = rows[:per_page]
+        
+        next_cursor = None
+        if has_next and uploads:
+            next_cursor = {
+                'after_id': uploads[-1].id,
+                'after_uploaded_at': uploads[-1].uploaded_at.isoformat()
+            }
+        
+        return ojsonify({
             'success': True,
             'data': {
-                'uploads': [upload.to_dict() for upload in uploads.items],
+                'uploads': [upload.to_dict() for upload in uploads],
                 'pagination': {
-                    'page': page,
+                    'page': None if use_cursor else page,
                     'per_page': per_page,
-                    'total': uploads.total,
-                    'pages': uploads.pages,
-                    'has_prev': uploads.has_prev,
-                    'has_next': uploads.has_next,
-                    'prev_num': uploads.prev_num,
-                    'next_num': uploads.next_num
+                    'total': total,
+                    'pages': -(-total // per_page) if total is not None else None,
+                    'has_prev': use_cursor or page > 1,
+                    'has_next': has_next,
+                    'prev_num': page - 1 if not use_cursor and page > 1 else None,
+                    'next_num': page + 1 if not use_cursor and has_next else None,
+                    'next_cursor': next_cursor
                 }
             },
             'filters_applied': {
@@ -181,7 +301,7 @@ def get_uploads():
     
     except Exception as e:
         logger.error(f"Error getting uploads: {str(e)}")
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': 'Failed to retrieve uploads',
             'message': str(e)
@@ -193,9 +313,9 @@ def get_uploads():
 def get_upload(upload_id):
     """Get specific upload details"""
     try:
-        upload = DataUpload.query.get_or_404(upload_id)
+        upload = db.get_or_404(DataUpload, upload_id)
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': upload.to_dict(include_data=True),
             'analysis': {
@@ -207,7 +327,7 @@ def get_upload(upload_id):
     
     except Exception as e:
         logger.error(f"Error getting upload {upload_id}: {str(e)}")
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': 'Upload not found or access denied'
         }), 404
@@ -219,47 +339,34 @@ def get_upload(upload_id):
 def get_facilities():
     """Get facilities list with performance data"""
     try:
-        # Get unique facilities with their latest upload
-        facilities_query = db.session.query(
-            DataUpload.facility_name,
-            DataUpload.district,
-            func.max(DataUpload.uploaded_at).label('latest_upload'),
-            func.count(DataUpload.id).label('total_uploads')
-        ).filter_by(status=UploadStatus.COMPLETED).group_by(
-            DataUpload.facility_name, DataUpload.district
+        # Per-facility aggregates are maintained in facility_stats on upload changes
+        facility_rows = db.session.query(FacilityStats).order_by(
+            desc(FacilityStats.latest_upload)
         ).all()
         
         facilities_data = []
-        for facility in facilities_query:
-            # Get latest upload data for performance metrics
-            latest_upload = DataUpload.query.filter_by(
-                facility_name=facility.facility_name,
-                status=UploadStatus.COMPLETED
-            ).order_by(desc(DataUpload.uploaded_at)).first()
-            
-            if latest_upload:
-                validation_summary = latest_upload.get_validation_summary()
-                facilities_data.append({
-                    'name': facility.facility_name,
-                    'district': facility.district,
-                    'latest_upload_date': facility.latest_upload.isoformat(),
-                    'total_uploads': facility.total_uploads,
-                    'latest_period': latest_upload.reporting_period,
-                    'performance': {
-                        'validation_rate': validation_summary.get('validation_rate', 0),
-                        'total_indicators': validation_summary.get('total_indicators', 0),
-                        'valid_indicators': validation_summary.get('valid_indicators', 0),
-                        'has_critical_issues': validation_summary.get('has_critical_issues', False)
-                    }
-                })
-        
-        return jsonify({
+        for facility in facility_rows:
+            facilities_data.append({
+                'name': facility.facility_name,
+                'district': facility.district,
+                'latest_upload_date': facility.latest_upload.isoformat(),
+                'total_uploads': facility.total_uploads,
+                'latest_period': facility.latest_period,
+                'performance': {
+                    'validation_rate': facility.latest_validation_rate,
+                    'total_indicators': facility.latest_total_indicators,
+                    'valid_indicators': facility.latest_valid_indicators,
+                    'has_critical_issues': facility.latest_error_indicators > 0
+                }
+            })
+        
+        return ojsonify({
             'success': True,
             'data': {
-                'facilities': sorted(facilities_data, key=lambda x: x['latest_upload_date'], reverse=True),
+                'facilities': facilities_data,
                 'summary': {
                     'total_facilities': len(facilities_data),
-                    'districts_covered': len(set(f['district'] for f in facilities_data if f['district'])),
+                    'districts_covered': len({f['district'] for f in facilities_data if f['district']}),
                     'average_validation_rate': sum(f['performance']['validation_rate'] for f in facilities_data) / len(facilities_data) if facilities_data else 0
                 }
             }
@@ -267,7 +374,7 @@ def get_facilities():
     
     except Exception as e:
         logger.error(f"Error getting facilities: {str(e)}")
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': 'Failed to retrieve facilities data',
             'message': str(e)
@@ -280,28 +387,38 @@ def get_facility_performance(facility_name):
     """Get performance data for a specific facility"""
     try:
         # Get all uploads for this facility
-        uploads = DataUpload.query.filter_by(
+        # JSON blobs are deferred here; trends stream processed_data separately below
+        uploads = DataUpload.query.options(
+            DataUpload.summary_load_option()
+        ).filter_by(
             facility_name=facility_name,
             status=UploadStatus.COMPLETED
         ).order_by(DataUpload.uploaded_at.desc()).all()
         
         if not uploads:
-            return jsonify({
+            return ojsonify({
                 'success': False,
                 'error': 'No data found for facility',
                 'facility_name': facility_name
             }), 404
         
-        # Get trends analysis
+        # Get trends analysis, streaming only the columns the calculation needs
         calculation_service = MNCHACalculationService()
-        upload_dicts = [upload.to_dict(include_data=True) for upload in uploads]
-        trends_data = calculation_service.get_indicator_trends(facility_name, upload_dicts)
+        trend_rows = db.session.query(
+            DataUpload.reporting_period,
+            DataUpload.uploaded_at,
+            DataUpload.processed_data
+        ).filter(
+            DataUpload.facility_name == facility_name,
+            DataUpload.status == UploadStatus.COMPLETED
+        ).order_by(DataUpload.uploaded_at).yield_per(100)
+        trends_data = calculation_service.get_indicator_trends_from_series(facility_name, trend_rows)
         
         # Latest performance
         latest_upload = uploads[0]
         latest_summary = latest_upload.get_validation_summary()
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': {
                 'facility_name': facility_name,
@@ -322,7 +439,7 @@ def get_facility_performance(facility_name):
     
     except Exception as e:
         logger.error(f"Error getting facility performance for {facility_name}: {str(e)}")
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': 'Failed to retrieve facility performance data',
             'message': str(e)
@@ -335,44 +452,14 @@ def get_facility_performance(facility_name):
 def get_indicators_list():
     """Get list of all MNCAH indicators with definitions"""
     try:
-        from ..models.anc import AntenatalCare
-        from ..models.intrapartum import IntrapartumCare
-        from ..models.pnc import PostnatalCare
-        from ..models.base import PopulationData, PeriodType
-        
-        # Create dummy instances to get indicator definitions
-        dummy_pop = PopulationData(1000, PeriodType.ANNUAL, "2025")
-        dummy_data = {}
-        
-        anc_model = AntenatalCare(dummy_pop, dummy_data)
-        intrapartum_model = IntrapartumCare(dummy_pop, dummy_data)
-        pnc_model = PostnatalCare(dummy_pop, dummy_data)
-        
-        indicators = {
-            'anc': anc_model.get_indicator_definitions(),
-            'intrapartum': intrapartum_model.get_indicator_definitions(),
-            'pnc': pnc_model.get_indicator_definitions()
-        }
-        
-        # Count total indicators
-        total_indicators = sum(len(category) for category in indicators.values())
-        
-        return jsonify({
+        return ojsonify({
             'success': True,
-            'data': {
-                'indicators': indicators,
-                'summary': {
-                    'total_indicators': total_indicators,
-                    'anc_indicators': len(indicators['anc']),
-                    'intrapartum_indicators': len(indicators['intrapartum']),
-                    'pnc_indicators': len(indicators['pnc'])
-                }
-            }
+            'data': get_indicator_definitions_data()
         })
     
     except Exception as e:
         logger.error(f"Error getting indicators list: {str(e)}")
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': 'Failed to retrieve indicators list',
             'message': str(e)
@@ -384,85 +471,154 @@ def get_indicators_list():
 def get_indicator_performance(indicator_name):
     """Get performance data for a specific indicator across facilities"""
     try:
-        # Get all uploads with processed data
-        uploads = DataUpload.query.filter_by(status=UploadStatus.COMPLETED).all()
-        
-        if not uploads:
-            return jsonify({
+        # Check for any processed data before committing to a streamed 200
+        if db.session.query(DataUpload.id).filter_by(status=UploadStatus.COMPLETED).first() is None:
+            return ojsonify({
                 'success': False,
                 'error': 'No data available'
             }), 404
         
-        # Extract indicator values across facilities
-        indicator_data = []
-        
-        for upload in uploads:
-            if upload.processed_data:
-                # Search for indicator in all categories
-                for category in ['anc', 'intrapartum', 'pnc']:
-                    if category in upload.processed_data:
-                        indicators = upload.processed_data[category].get('indicators', {})
-                        validations = upload.processed_data[category].get('validations', {})
-                        
-                        if indicator_name in indicators:
-                            indicator_data.append({
-                                'facility_name': upload.facility_name,
-                                'district': upload.district,
-                                'reporting_period': upload.reporting_period,
-                                'category': category,
-                                'value': indicators[indicator_name],
-                                'validation_status': validations.get(indicator_name, 'unknown'),
-                                'upload_date': upload.uploaded_at.isoformat()
-                            })
-        
-        if not indicator_data:
-            return jsonify({
+        # Extract just this indicator inside the database instead of shipping whole blobs
+        rows = db.session.execute(
+            indicator_values_statement(indicator_name),
+            execution_options={'yield_per': 500}
+        )
+        
+        data_points = iter_indicator_data_points(rows)
+        first_point = next(data_points, None)
+        
+        if first_point is None:
+            return ojsonify({
                 'success': False,
                 'error': f'No data found for indicator: {indicator_name}'
             }), 404
         
-        # Calculate statistics
-        values = [item['value'] for item in indicator_data]
-        
-        statistics = {
-            'count': len(values),
-            'mean': sum(values) / len(values),
-            'median': sorted(values)[len(values)//2],
-            'min': min(values),
-            'max': max(values),
-            'range': max(values) - min(values),
-            'std_dev': calculate_std_dev(values)
-        }
-        
-        # Performance distribution
-        performance_dist = {
-            'green': sum(1 for item in indicator_data if item['validation_status'] == 'green'),
-            'yellow': sum(1 for item in indicator_data if item['validation_status'] == 'yellow'),
-            'red': sum(1 for item in indicator_data if item['validation_status'] == 'red'),
-            'blue': sum(1 for item in indicator_data if item['validation_status'] == 'blue')
-        }
-        
-        return jsonify({
-            'success': True,
-            'data': {
-                'indicator_name': indicator_name,
-                'data_points': indicator_data,
-                'statistics': statistics,
-                'performance_distribution': performance_dist,
-                'facilities_count': len(set(item['facility_name'] for item in indicator_data)),
-                'periods_covered': list(set(item['reporting_period'] for item in indicator_data))
-            }
-        })
+        return current_app.response_class(
+            stream_with_context(stream_indicator_performance(
+                indicator_name, chain([first_point], data_points)
+            )),
+            mimetype='application/json'
+        )
     
     except Exception as e:
         logger.error(f"Error getting indicator performance for {indicator_name}: {str(e)}")
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': 'Failed to retrieve indicator performance data',
             'message': str(e)
         }), 500
 
 
+def indicator_values_statement(indicator_name):
+    """
+    Build a UNION ALL select of one indicator's value and validation status
+    
+    JSON path extraction runs in the database (#>> on PostgreSQL, JSON_EXTRACT
+    on SQLite), so only rows that report the indicator are returned.
+    """
+    selects = []
+    for category in ['anc', 'intrapartum', 'pnc']:
+        value = DataUpload.processed_data[(category, 'indicators', indicator_name)].as_float()
+        validation_status = DataUpload.processed_data[(category, 'validations', indicator_name)].as_string()
+        
+        selects.append(
+            select(
+                DataUpload.facility_name,
+                DataUpload.district,
+                DataUpload.reporting_period,
+                DataUpload.uploaded_at,
+                literal(category, String).label('category'),
+                value.label('value'),
+                validation_status.label('validation_status')
+            ).where(
+                DataUpload.status == UploadStatus.COMPLETED,
+                value.isnot(None)
+            )
+        )
+    
+    return union_all(*selects)
+
+
+def iter_indicator_data_points(rows):
+    """Yield one data point per extracted indicator row"""
+    for row in rows:
+        yield {
+            'facility_name': row.facility_name,
+            'district': row.district,
+            'reporting_period': row.reporting_period,
+            'category': row.category,
+            'value': row.value,
+            'validation_status': row.validation_status or 'unknown',
+            'upload_date': row.uploaded_at.isoformat()
+        }
+
+
+def stream_indicator_performance(indicator_name, data_points):
+    """
+    Stream the indicator performance payload as JSON chunks
+    
+    Data points are written as they arrive; statistics are accumulated in the
+    same pass (Welford for mean/variance) and emitted after the array. The
+    "success" flag comes last, so a stream cut short by an error ends with
+    "success": false and "truncated": true instead of partial statistics.
+    """
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    minimum = maximum = None
+    values = []
+    status_counts = Counter()
+    facilities = set()
+    periods = set()
+    
+    yield b'{"data":{"indicator_name":' + dump_json(indicator_name) + b',"data_points":['
+    
+    try:
+        for point in data_points:
+            if count:
+                yield b','
+            yield dump_json(point)
+            
+            value = point['value']
+            count += 1
+            delta = value - mean
+            mean += delta / count
+            m2 += delta * (value - mean)
+            minimum = value if minimum is None or value < minimum else minimum
+            maximum = value if maximum is None or value > maximum else maximum
+            values.append(value)
+            
+            status_counts[point['validation_status']] += 1
+            facilities.add(point['facility_name'])
+            periods.add(point['reporting_period'])
+    
+    except Exception as e:
+        # Headers are already sent; close the document and flag it as incomplete
+        logger.error(f"Error streaming indicator performance for {indicator_name}: {str(e)}")
+        yield b']},"success":false,"truncated":true,"error":"Error retrieving indicator performance"}'
+        return
+    
+    summary = {
+        'statistics': {
+            'count': count,
+            'mean': mean,
+            'median': calculate_median(values),
+            'min': minimum,
+            'max': maximum,
+            'range': maximum - minimum if count else 0,
+            'std_dev': (m2 / (count - 1)) ** 0.5 if count > 1 else 0
+        },
+        'performance_distribution': {
+            status: status_counts[status] for status in ('green', 'yellow', 'red', 'blue')
+        },
+        'facilities_count': len(facilities),
+        'periods_covered': list(periods)
+    }
+    
+    # Splice the summary object's members into the open "data" object
+    yield b'],' + dump_json(summary)[1:] + b',"success":true}'
+
+
 # Analysis API
 @api_bp.route('/analysis/summary')
 @login_required
@@ -477,7 +633,7 @@ def get_analysis_summary():
         ).all()
         
         if not uploads:
-            return jsonify({
+            return ojsonify({
                 'success': True,
                 'data': {
                     'message': 'No recent data available',
@@ -490,8 +646,8 @@ def get_analysis_summary():
             'period': 'last_30_days',
             'data_overview': {
                 'total_uploads': len(uploads),
-                'facilities': len(set(upload.facility_name for upload in uploads)),
-                'districts': len(set(upload.district for upload in uploads if upload.district)),
+                'facilities': len({upload.facility_name for upload in uploads}),
+                'districts': len({upload.district for upload in uploads if upload.district}),
                 'date_range': {
                     'from': min(upload.uploaded_at for upload in uploads).isoformat(),
                     'to': max(upload.uploaded_at for upload in uploads).isoformat()
@@ -506,7 +662,7 @@ def get_analysis_summary():
             'data_quality': get_system_data_quality_stats()
         }
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': analysis_summary,
             'timestamp': datetime.utcnow().isoformat()
@@ -514,7 +670,7 @@ def get_analysis_summary():
     
     except Exception as e:
         logger.error(f"Error getting analysis summary: {str(e)}")
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': 'Failed to retrieve analysis summary',
             'message': str(e)
@@ -543,7 +699,7 @@ def get_trends_analysis():
         uploads = query.order_by(DataUpload.uploaded_at).all()
         
         if len(uploads) < 2:
-            return jsonify({
+            return ojsonify({
                 'success': True,
                 'data': {
                     'message': 'Insufficient data for trend analysis (minimum 2 data points required)',
@@ -561,7 +717,7 @@ def get_trends_analysis():
             # System-wide trends would need additional implementation
             trends_data = {'message': 'System-wide trends not yet implemented'}
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': trends_data,
             'analysis_parameters': {
@@ -574,7 +730,7 @@ def get_trends_analysis():
     
     except Exception as e:
         logger.error(f"Error getting trends analysis: {str(e)}")
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': 'Failed to retrieve trends analysis',
             'message': str(e)
@@ -590,10 +746,12 @@ def get_validation_system_status():
         validation_service = DataValidationService()
         
         # Get all completed uploads
-        uploads = DataUpload.query.filter_by(status=UploadStatus.COMPLETED).all()
+        uploads = db.session.scalars(
+            UPLOADS_BY_STATUS_STMT, {'status': UploadStatus.COMPLETED}
+        ).all()
         
         if not uploads:
-            return jsonify({
+            return ojsonify({
                 'success': True,
                 'data': {
                     'message': 'No data available for validation analysis'
@@ -605,7 +763,7 @@ def get_validation_system_status():
             upload.to_dict(include_data=True) for upload in uploads
         ])
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'data': dashboard_data,
             'timestamp': datetime.utcnow().isoformat()
@@ -613,7 +771,7 @@ def get_validation_system_status():
     
     except Exception as e:
         logger.error(f"Error getting validation system status: {str(e)}")
-        return jsonify({
+        return ojsonify({
             'success': False,
             'error': 'Failed to retrieve validation status',
             'message': str(e)
@@ -622,60 +780,101 @@ def get_validation_system_status():
 
 # Helper Functions
 
-def get_system_data_quality_stats():
-    """Get system-wide data quality statistics"""
-    try:
-        uploads = DataUpload.query.filter_by(status=UploadStatus.COMPLETED).all()
-        
-        if not uploads:
-            return {'message': 'No data available'}
-        
-        total_indicators = sum(upload.total_indicators for upload in uploads)
-        valid_indicators = sum(upload.valid_indicators for upload in uploads)
-        warning_indicators = sum(upload.warning_indicators for upload in uploads)
-        error_indicators = sum(upload.error_indicators for upload in uploads)
-        
-        return {
-            'overall_quality_rate': (valid_indicators / total_indicators * 100) if total_indicators > 0 else 0,
+@lru_cache(maxsize=1)
+def get_indicator_definitions_data():
+    """Build indicator definitions once - they are static for the process lifetime"""
+    from ..models.anc import AntenatalCare
+    from ..models.intrapartum import IntrapartumCare
+    from ..models.pnc import PostnatalCare
+    from ..models.base import PopulationData, PeriodType
+    
+    # Create dummy instances to get indicator definitions
+    dummy_pop = PopulationData(1000, PeriodType.ANNUAL, "2025")
+    dummy_data = {}
+    
+    anc_model = AntenatalCare(dummy_pop, dummy_data)
+    intrapartum_model = IntrapartumCare(dummy_pop, dummy_data)
+    pnc_model = PostnatalCare(dummy_pop, dummy_data)
+    
+    indicators = {
+        'anc': anc_model.get_indicator_definitions(),
+        'intrapartum': intrapartum_model.get_indicator_definitions(),
+        'pnc': pnc_model.get_indicator_definitions()
+    }
+    
+    # Count total indicators
+    total_indicators = sum(len(category) for category in indicators.values())
+    
+    return {
+        'indicators': indicators,
+        'summary': {
             'total_indicators': total_indicators,
-            'valid_indicators': valid_indicators,
-            'warning_indicators': warning_indicators,
-            'error_indicators': error_indicators,
-            'uploads_analyzed': len(uploads)
+            'anc_indicators': len(indicators['anc']),
+            'intrapartum_indicators': len(indicators['intrapartum']),
+            'pnc_indicators': len(indicators['pnc'])
         }
+    }
+
+
+@ttl_cache(ttl=30)
+def _system_data_quality_stats():
+    """Compute system-wide data quality statistics"""
+    # Sum the indicator counts in the database instead of loading every upload
+    (uploads_analyzed, total_indicators, valid_indicators,
+     warning_indicators, error_indicators) = db.session.execute(
+        UPLOAD_QUALITY_TOTALS_STMT, {'status': UploadStatus.COMPLETED}
+    ).one()
+    
+    if not uploads_analyzed:
+        return {'message': 'No data available'}
     
+    return {
+        'overall_quality_rate': (valid_indicators / total_indicators * 100) if total_indicators > 0 else 0,
+        'total_indicators': total_indicators,
+        'valid_indicators': valid_indicators,
+        'warning_indicators': warning_indicators,
+        'error_indicators': error_indicators,
+        'uploads_analyzed': uploads_analyzed
+    }
+
+
+def get_system_data_quality_stats():
+    """Get system-wide data quality statistics"""
+    try:
+        return _system_data_quality_stats()
     except Exception as e:
         logger.error(f"Error getting data quality stats: {str(e)}")
         return {'error': str(e)}
 
 
+@ttl_cache(ttl=30)
+def _system_performance_summary():
+    """Compute system-wide performance summary"""
+    # Average and band the validation_rate expression in the database
+    (total_assessments, average_performance, excellent_count,
+     good_count, acceptable_count, poor_count) = db.session.execute(
+        UPLOAD_PERFORMANCE_BANDS_STMT, {'status': UploadStatus.COMPLETED}
+    ).one()
+    
+    if not total_assessments:
+        return {'message': 'No data available'}
+    
+    return {
+        'average_performance': average_performance or 0,
+        'performance_distribution': {
+            'excellent': excellent_count,
+            'good': good_count,
+            'acceptable': acceptable_count,
+            'poor': poor_count
+        },
+        'total_assessments': total_assessments
+    }
+
+
 def get_system_performance_summary():
     """Get system-wide performance summary"""
     try:
-        uploads = DataUpload.query.filter_by(status=UploadStatus.COMPLETED).all()
-        
-        if not uploads:
-            return {'message': 'No data available'}
-        
-        quality_rates = [upload.get_validation_summary().get('validation_rate', 0) for upload in uploads]
-        
-        # Performance categorization
-        excellent_count = sum(1 for rate in quality_rates if rate >= 90)
-        good_count = sum(1 for rate in quality_rates if 75 <= rate < 90)
-        acceptable_count = sum(1 for rate in quality_rates if 60 <= rate < 75)
-        poor_count = sum(1 for rate in quality_rates if rate < 60)
-        
-        return {
-            'average_performance': sum(quality_rates) / len(quality_rates) if quality_rates else 0,
-            'performance_distribution': {
-                'excellent': excellent_count,
-                'good': good_count,
-                'acceptable': acceptable_count,
-                'poor': poor_count
-            },
-            'total_assessments': len(quality_rates)
-        }
-    
+        return _system_performance_summary()
     except Exception as e:
         logger.error(f"Error getting performance summary: {str(e)}")
         return {'error': str(e)}
@@ -697,7 +896,7 @@ def get_category_analysis_summary(uploads, category):
         for upload in category_uploads:
             validations = upload.processed_data[category].get('validations', {})
             category_indicators += len(validations)
-            category_valid += sum(1 for status in validations.values() if status == 'green')
+            category_valid += sum(1 for v in validations.values() if v == 'green')
         
         validation_rate = (category_valid / category_indicators * 100) if category_indicators > 0 else 0
         
@@ -706,7 +905,7 @@ def get_category_analysis_summary(uploads, category):
             'total_indicators': category_indicators,
             'valid_indicators': category_valid,
             'validation_rate': validation_rate,
-            'facilities_covered': len(set(upload.facility_name for upload in category_uploads))
+            'facilities_covered': len({upload.facility_name for upload in category_uploads})
         }
     
     except Exception as e:
@@ -714,21 +913,11 @@ def get_category_analysis_summary(uploads, category):
         return {'error': str(e)}
 
 
-def calculate_std_dev(values):
-    """Calculate standard deviation"""
-    if len(values) < 2:
-        return 0
-    
-    mean = sum(values) / len(values)
-    variance = sum((x - mean) ** 2 for x in values) / (len(values) - 1)
-    return variance ** 0.5
-
-
 # Error Handlers for API Blueprint
 @api_bp.errorhandler(404)
 def api_not_found(error):
     """Handle API 404 errors"""
-    return jsonify({
+    return ojsonify({
         'success': False,
         'error': 'Resource not found',
         'message': 'The requested API endpoint or resource was not found'
@@ -738,7 +927,7 @@ def api_not_found(error):
 @api_bp.errorhandler(400)
 def api_bad_request(error):
     """Handle API 400 errors"""
-    return jsonify({
+    return ojsonify({
         'success': False,
         'error': 'Bad request',
         'message': 'Invalid request parameters or data format'
@@ -748,7 +937,7 @@ def api_bad_request(error):
 @api_bp.errorhandler(500)
 def api_internal_error(error):
     """Handle API 500 errors"""
-    return jsonify({
+    return ojsonify({
         'success': False,
         'error': 'Internal server error',
         'message': 'An unexpected error occurred while processing the request'
@@ -3,26 +3,91 @@ Authentication Views
 This module handles user authentication (login/logout) for the MOH MNCAH Dashboard.
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session, current_app
 from flask_login import login_user, logout_user, login_required, current_user
-try:
-    from werkzeug.urls import url_parse
-except ImportError:
-    from urllib.parse import urlparse
-    def url_parse(url):
-        return urlparse(url)
+import hashlib
 import logging
+import re
+import secrets
+from types import MappingProxyType
 
-from ..models.user import User, UserManager, UserSession, UserType
-from .. import db
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from ..models.user import User, UserManager, UserSession, UserType, auth_cache
+from ..utils.decorators import get_current_user_permissions, rate_limit, request_username_key
+from .. import db, cache
 
 
 # Create authentication blueprint
 auth_bp = Blueprint('auth', __name__)
 logger = logging.getLogger(__name__)
 
+# Keys accepted in a JSON login body
+LOGIN_JSON_FIELDS = frozenset({'username', 'password', 'remember', 'csrf_token'})
+
+# Default JSON login response sections (all of them, for existing clients)
+LOGIN_RESPONSE_FIELDS = frozenset({'redirect', 'user', 'permissions'})
+
+# Template globals shared by every render
+APP_NAME = 'MOH MNCAH Dashboard'
+EMPTY_USER_SESSION = MappingProxyType({})
+
+# Admin user list cache (JSON responses only)
+USER_LIST_CACHE_TIMEOUT = 60
+USER_LIST_CACHE_VERSION_KEY = 'admin:users:version'
+
+
+def user_list_cache_key(after_id, limit):
+    """Cache key for one user list page, or None when caching is unavailable"""
+    if cache is None:
+        return None
+    version = cache.get(USER_LIST_CACHE_VERSION_KEY) or 0
+    return f'admin:users:v1:{version}:{after_id}:{limit}'
+
+
+def invalidate_user_list_cache():
+    """Orphan every cached user list page by moving to a new cache version"""
+    if cache is not None:
+        cache.set(USER_LIST_CACHE_VERSION_KEY, secrets.token_hex(8), timeout=0)
+
+
+# Same-site relative paths only (matched with fullmatch): rejects absolute and
+# scheme-relative (//host) URLs, and anything with a trailing newline
+SAFE_NEXT_URL = re.compile(r'/(?!/)[A-Za-z0-9_\-/?=&%.]*')
+
+
+def auth_body_too_large():
+    """Check the declared body size against AUTH_MAX_CONTENT_LENGTH"""
+    return (request.content_length or 0) > current_app.config.get('AUTH_MAX_CONTENT_LENGTH', 4096)
+
+
+def error_response(message, status, template=None, redirect_endpoint=None):
+    """
+    Respond to a failed auth action: JSON for API clients, otherwise flash
+    the message and render the template or redirect to the endpoint
+    """
+    if request.is_json:
+        return jsonify({'success': False, 'message': message}), status
+    
+    flash(message, 'error')
+    if template:
+        return render_template(template)
+    return redirect(url_for(redirect_endpoint))
+
+
+def success_response(message, redirect_url, **extra):
+    """Respond to a successful auth action: JSON for API clients, otherwise flash and redirect"""
+    if request.is_json:
+        return jsonify({'success': True, 'message': message, **extra})
+    
+    flash(message, 'success')
+    return redirect(redirect_url)
+
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@rate_limit(max_requests=30, window=60, methods=['POST'])
+@rate_limit(max_requests=5, window=60, key_func=request_username_key, methods=['POST'])
 def login():
     """
     Handle user login for both admin and stakeholder users
@@ -32,24 +97,28 @@ def login():
         return redirect(url_for('dashboard.index'))
     
     if request.method == 'POST':
+        # Reject oversized bodies before parsing them
+        if auth_body_too_large():
+            return error_response('Request too large', 413, template='auth/login.html')
+        
         # Handle both form and JSON requests
         if request.is_json:
-            data = request.get_json()
-            username = data.get('username', '').strip()
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict) or not data.keys() <= LOGIN_JSON_FIELDS:
+                return error_response('Invalid login request', 400, template='auth/login.html')
+            if not all(isinstance(data.get(field, ''), str) for field in ('username', 'password')):
+                return error_response('Invalid login request', 400, template='auth/login.html')
+            username = data.get('username', '').strip().lower()
             password = data.get('password', '')
             remember_me = data.get('remember', False)
         else:
-            username = request.form.get('username', '').strip()
+            username = request.form.get('username', '').strip().lower()
             password = request.form.get('password', '')
             remember_me = bool(request.form.get('remember'))
         
         # Validate input
         if not username or not password:
-            error_msg = 'Username and password are required'
-            if request.is_json:
-                return jsonify({'success': False, 'message': error_msg}), 400
-            flash(error_msg, 'error')
-            return render_template('auth/login.html')
+            return error_response('Username and password are required', 400, template='auth/login.html')
         
         # Authenticate user
         try:
@@ -64,57 +133,50 @@ def login():
                 session['user_session'] = user_session.to_session_dict()
                 
                 # Log successful login
-                logger.info(f"User {username} logged in successfully from {request.remote_addr}")
+                logger.info("User %s logged in successfully from %s", username, request.remote_addr)
                 
                 # Determine redirect URL
                 next_page = request.args.get('next')
-                if not next_page or url_parse(next_page).netloc != '':
+                if not next_page or not SAFE_NEXT_URL.fullmatch(next_page):
                     next_page = url_for('dashboard.index')
                 
-                success_msg = f'Welcome, {user.full_name or user.username}!'
-                
+                # JSON clients may trim the response with ?fields=redirect,user,permissions
+                extra = {}
                 if request.is_json:
-                    return jsonify({
-                        'success': True,
-                        'message': success_msg,
-                        'redirect': next_page,
-                        'user': {
+                    wanted = set(filter(None, request.args.get('fields', '').split(','))) or LOGIN_RESPONSE_FIELDS
+                    if 'redirect' in wanted:
+                        extra['redirect'] = next_page
+                    if 'user' in wanted:
+                        extra['user'] = {
                             'username': user.username,
                             'user_type': user.user_type.value,
-                            'full_name': user.full_name,
-                            'permissions': user.get_permissions()
+                            'full_name': user.full_name
                         }
-                    })
+                        if 'permissions' in wanted:
+                            extra['user']['permissions'] = user_session.permissions
                 
-                flash(success_msg, 'success')
-                return redirect(next_page)
+                return success_response(
+                    f'Welcome, {user.full_name or user.username}!',
+                    next_page,
+                    **extra
+                )
             
             else:
                 # Authentication failed
-                error_msg = 'Invalid username or password'
-                logger.warning(f"Failed login attempt for username: {username} from {request.remote_addr}")
-                
-                if request.is_json:
-                    return jsonify({'success': False, 'message': error_msg}), 401
-                
-                flash(error_msg, 'error')
-                return render_template('auth/login.html')
+                logger.warning("Failed login attempt for username: %s from %s", username, request.remote_addr)
+                return error_response('Invalid username or password', 401, template='auth/login.html')
         
         except Exception as e:
-            error_msg = 'An error occurred during login. Please try again.'
-            logger.error(f"Login error for {username}: {str(e)}")
-            
-            if request.is_json:
-                return jsonify({'success': False, 'message': error_msg}), 500
-            
-            flash(error_msg, 'error')
-            return render_template('auth/login.html')
+            logger.error("Login error for %s: %s", username, e)
+            return error_response('An error occurred during login. Please try again.', 500,
+                                  template='auth/login.html')
     
     # GET request - show login form
     return render_template('auth/login.html')
 
 
 @auth_bp.route('/register', methods=['GET', 'POST'])
+@rate_limit(max_requests=10, window=3600, methods=['POST'])
 def register():
     """
     Public registration for stakeholder users
@@ -123,6 +185,10 @@ def register():
         return redirect(url_for('dashboard.index'))
 
     if request.method == 'POST':
+        if auth_body_too_large():
+            flash('Request too large.', 'error')
+            return render_template('auth/register.html'), 413
+        
         username = request.form.get('username', '').strip()
         password = request.form.get('password', '')
         confirm = request.form.get('confirm_password', '')
@@ -138,9 +204,11 @@ def register():
             flash('Passwords do not match.', 'error')
             return render_template('auth/register.html')
 
-        # Uniqueness check
-        existing = db.session.query(User).filter(User.username == username.lower()).first()
-        if existing:
+        # Uniqueness check (usernames are stored lowercased, so the unique index serves it)
+        taken = db.session.query(
+            db.session.query(User.id).filter(User.username == username.lower()).exists()
+        ).scalar()
+        if taken:
             flash('Username is already taken.', 'error')
             return render_template('auth/register.html')
 
@@ -154,11 +222,17 @@ def register():
                 full_name=full_name,
                 email=email
             )
+            invalidate_user_list_cache()
             flash('Account created successfully. Please log in.', 'success')
             return redirect(url_for('auth.login'))
+        except IntegrityError:
+            # Lost a race with a concurrent registration for the same username/email
+            db.session.rollback()
+            flash('Username or email is already taken.', 'error')
+            return render_template('auth/register.html')
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Registration error for {username}: {str(e)}")
+            logger.error("Registration error for %s: %s", username, e)
             flash('Error creating account. Please try again.', 'error')
             return render_template('auth/register.html')
 
@@ -182,7 +256,7 @@ def logout():
     logout_user()
     
     # Log logout
-    logger.info(f"User {username} ({user_type}) logged out from {request.remote_addr}")
+    logger.info("User %s (%s) logged out from %s", username, user_type, request.remote_addr)
     
     # Handle JSON requests
     if request.is_json:
@@ -202,9 +276,13 @@ def status():
     """
     Get current authentication status (API endpoint)
     """
+    etag = auth_state_etag()
+    if request.if_none_match.contains(etag):
+        return not_modified_response(etag)
+    
     user_session_data = session.get('user_session', {})
     
-    return jsonify({
+    return with_auth_state_etag(jsonify({
         'authenticated': True,
         'user': {
             'id': current_user.id,
@@ -213,10 +291,10 @@ def status():
             'full_name': current_user.full_name,
             'organization': current_user.organization,
             'last_login': current_user.last_login.isoformat() if current_user.last_login else None,
-            'permissions': current_user.get_permissions()
+            'permissions': get_current_user_permissions()
         },
         'session': user_session_data
-    })
+    }), etag)
 
 
 @auth_bp.route('/check')
@@ -224,15 +302,49 @@ def check():
     """
     Check authentication status without requiring login (for AJAX calls)
     """
+    etag = auth_state_etag()
+    if request.if_none_match.contains(etag):
+        return not_modified_response(etag)
+    
     if current_user.is_authenticated:
-        return jsonify({
+        return with_auth_state_etag(jsonify({
             'authenticated': True,
             'user_type': current_user.user_type.value,
             'username': current_user.username,
-            'permissions': current_user.get_permissions()
-        })
+            'permissions': get_current_user_permissions()
+        }), etag)
     
-    return jsonify({'authenticated': False})
+    return with_auth_state_etag(jsonify({'authenticated': False}), etag)
+
+
+def auth_state_etag():
+    """
+    ETag for the polling endpoints, derived from the state their payloads are built from
+    
+    Covers the endpoint, the user row version (updated_at changes on every
+    write, including logins) and the login session.
+    """
+    if not current_user.is_authenticated:
+        state = f"{request.endpoint}:anonymous"
+    else:
+        user_session = session.get('user_session') or {}
+        updated_at = current_user.updated_at.timestamp() if current_user.updated_at else 0
+        state = f"{request.endpoint}:{current_user.id}:{updated_at}:{user_session.get('login_time')}"
+    
+    return hashlib.blake2b(state.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def with_auth_state_etag(response, etag):
+    """Attach the ETag and a short private cache lifetime to a polling response"""
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = 30
+    return response
+
+
+def not_modified_response(etag):
+    """Empty 304 for a client that already holds the current payload"""
+    return with_auth_state_etag(current_app.response_class(status=304), etag)
 
 
 @auth_bp.route('/profile')
@@ -258,17 +370,24 @@ def update_profile():
         organization = request.form.get('organization', '').strip() or None
         position = request.form.get('position', '').strip() or None
         
-        # Update user information
-        current_user.full_name = full_name
-        current_user.email = email
-        current_user.phone_number = phone_number
-        current_user.organization = organization
-        current_user.position = position
+        # Single UPDATE instead of ORM dirty tracking; run the model's email
+        # validator explicitly since Core statements bypass @validates
+        email = current_user.validate_email('email', email)
+        db.session.execute(
+            update(User).where(User.id == current_user.id).values(
+                full_name=full_name,
+                email=email,
+                phone_number=phone_number,
+                organization=organization,
+                position=position
+            )
+        )
         
         # Commit changes
         db.session.commit()
+        invalidate_user_list_cache()
         
-        logger.info(f"User {current_user.username} updated profile information")
+        logger.info("User %s updated profile information", current_user.username)
         
         if request.is_json:
             return jsonify({
@@ -281,20 +400,14 @@ def update_profile():
     
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Error updating profile for {current_user.username}: {str(e)}")
-        
-        if request.is_json:
-            return jsonify({
-                'success': False,
-                'message': 'Error updating profile. Please try again.'
-            }), 500
-        
-        flash('Error updating profile. Please try again.', 'error')
-        return redirect(url_for('auth.profile'))
+        logger.error("Error updating profile for %s: %s", current_user.username, e)
+        return error_response('Error updating profile. Please try again.', 500,
+                              redirect_endpoint='auth.profile')
 
 
 @auth_bp.route('/change-password', methods=['POST'])
 @login_required
+@rate_limit(max_requests=5, window=60)
 def change_password():
     """
     Change user password
@@ -307,66 +420,44 @@ def change_password():
         
         # Validate input
         if not current_password or not new_password or not confirm_password:
-            error_msg = 'All password fields are required'
-            if request.is_json:
-                return jsonify({'success': False, 'message': error_msg}), 400
-            flash(error_msg, 'error')
-            return redirect(url_for('auth.profile'))
+            return error_response('All password fields are required', 400, redirect_endpoint='auth.profile')
         
         # Verify current password
         if not current_user.check_password(current_password):
-            error_msg = 'Current password is incorrect'
-            if request.is_json:
-                return jsonify({'success': False, 'message': error_msg}), 400
-            flash(error_msg, 'error')
-            return redirect(url_for('auth.profile'))
+            return error_response('Current password is incorrect', 400, redirect_endpoint='auth.profile')
         
         # Check password confirmation
         if new_password != confirm_password:
-            error_msg = 'New passwords do not match'
-            if request.is_json:
-                return jsonify({'success': False, 'message': error_msg}), 400
-            flash(error_msg, 'error')
-            return redirect(url_for('auth.profile'))
+            return error_response('New passwords do not match', 400, redirect_endpoint='auth.profile')
         
         # Validate password strength (basic)
         if len(new_password) < 6:
-            error_msg = 'Password must be at least 6 characters long'
-            if request.is_json:
-                return jsonify({'success': False, 'message': error_msg}), 400
-            flash(error_msg, 'error')
-            return redirect(url_for('auth.profile'))
+            return error_response('Password must be at least 6 characters long', 400, redirect_endpoint='auth.profile')
         
         # Update password
         current_user.set_password(new_password)
         db.session.commit()
+        auth_cache.invalidate_user(current_user.id)
         
-        logger.info(f"User {current_user.username} changed password")
-        
-        success_msg = 'Password changed successfully'
-        if request.is_json:
-            return jsonify({'success': True, 'message': success_msg})
+        logger.info("User %s changed password", current_user.username)
         
-        flash(success_msg, 'success')
-        return redirect(url_for('auth.profile'))
+        return success_response('Password changed successfully', url_for('auth.profile'))
     
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Error changing password for {current_user.username}: {str(e)}")
-        
-        error_msg = 'Error changing password. Please try again.'
-        if request.is_json:
-            return jsonify({'success': False, 'message': error_msg}), 500
+        logger.error("Error changing password for %s: %s", current_user.username, e)
         
-        flash(error_msg, 'error')
-        return redirect(url_for('auth.profile'))
+        return error_response('Error changing password. Please try again.', 500,
+                              redirect_endpoint='auth.profile')
 
 
 @auth_bp.route('/admin/users')
 @login_required
 def list_users():
     """
-    List all users (admin only)
+    List users (admin only), keyset-paginated by id
+    
+    Query params: limit (default 50, max 200) and after_id (last id of the previous page).
     """
     # Check if user is admin
     if not current_user.is_admin():
@@ -376,17 +467,47 @@ def list_users():
         return redirect(url_for('dashboard.index'))
     
     try:
-        users = db.session.query(User).all()
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+        after_id = request.args.get('after_id', 0, type=int)
+        
+        # JSON pages are cached briefly; writes to users bump the cache version
+        cache_key = user_list_cache_key(after_id, limit) if request.is_json else None
+        cached = cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            response = jsonify(cached)
+            if cached['next']:
+                next_url = url_for('auth.list_users', limit=limit, after_id=cached['next'])
+                response.headers['Link'] = f'<{next_url}>; rel="next"'
+            return response
+        
+        # Fetch one extra row to know whether another page follows
+        users = db.session.query(User).options(User.list_load_option()).filter(
+            User.id > after_id
+        ).order_by(User.id).limit(limit + 1).all()
+        
+        next_after_id = users[limit - 1].id if len(users) > limit else None
+        users = users[:limit]
+        next_url = url_for('auth.list_users', limit=limit, after_id=next_after_id) if next_after_id else None
         
         if request.is_json:
-            return jsonify({
-                'users': [user.to_dict() for user in users]
-            })
+            payload = {
+                'users': [user.to_dict() for user in users],
+                'next': next_after_id
+            }
+            if cache_key:
+                cache.set(cache_key, payload, timeout=USER_LIST_CACHE_TIMEOUT)
+            response = jsonify(payload)
+        else:
+            response = current_app.make_response(
+                render_template('auth/users.html', users=users, next_url=next_url)
+            )
         
-        return render_template('auth/users.html', users=users)
+        if next_url:
+            response.headers['Link'] = f'<{next_url}>; rel="next"'
+        return response
     
     except Exception as e:
-        logger.error(f"Error listing users: {str(e)}")
+        logger.error("Error listing users: %s", e)
         
         if request.is_json:
             return jsonify({'error': 'Error retrieving users'}), 500
@@ -418,11 +539,7 @@ def toggle_user_status(user_id):
         
         # Don't allow admin to deactivate themselves
         if user.id == current_user.id:
-            error_msg = 'Cannot change your own account status'
-            if request.is_json:
-                return jsonify({'success': False, 'message': error_msg}), 400
-            flash(error_msg, 'error')
-            return redirect(url_for('auth.list_users'))
+            return error_response('Cannot change your own account status', 400, redirect_endpoint='auth.list_users')
         
         # Toggle status
         if user.is_active():
@@ -433,30 +550,24 @@ def toggle_user_status(user_id):
             action = 'activated'
         
         db.session.commit()
-        
-        logger.info(f"Admin {current_user.username} {action} user {user.username}")
-        
-        success_msg = f'User {user.username} has been {action}'
-        if request.is_json:
-            return jsonify({
-                'success': True,
-                'message': success_msg,
-                'user_status': user.status.value
-            })
-        
-        flash(success_msg, 'success')
-        return redirect(url_for('auth.list_users'))
+        auth_cache.invalidate_user(user.id)
+        invalidate_user_list_cache()
+        if action == 'deactivated':
+            revoke_user_sessions(user.id)
+        
+        logger.info("Admin %s %s user %s", current_user.username, action, user.username)
+        
+        return success_response(
+            f'User {user.username} has been {action}',
+            url_for('auth.list_users'),
+            user_status=user.status.value
+        )
     
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Error toggling user status: {str(e)}")
-        
-        error_msg = 'Error updating user status'
-        if request.is_json:
-            return jsonify({'success': False, 'message': error_msg}), 500
+        logger.error("Error toggling user status: %s", e)
         
-        flash(error_msg, 'error')
-        return redirect(url_for('auth.list_users'))
+        return error_response('Error updating user status', 500, redirect_endpoint='auth.list_users')
 
 
 # Error handlers for authentication blueprint
@@ -481,8 +592,44 @@ def handle_forbidden(error):
 @auth_bp.app_context_processor
 def inject_auth_data():
     """Inject authentication data into templates"""
+    # Anonymous pages (e.g. login) have no user session to read
+    if not current_user.is_authenticated:
+        return {
+            'current_user': current_user,
+            'user_session': EMPTY_USER_SESSION,
+            'app_name': APP_NAME
+        }
+    
     return {
         'current_user': current_user,
-        'user_session': session.get('user_session', {}),
-        'app_name': 'MOH MNCAH Dashboard'
+        'user_session': session.get('user_session', EMPTY_USER_SESSION),
+        'app_name': APP_NAME
     }
+
+
+def revoke_user_sessions(user_id):
+    """
+    Delete a user's server-side sessions so a deactivated account is logged out
+    
+    Only possible with redis-backed sessions; signed-cookie sessions live on the client.
+    """
+    if current_app.config.get('SESSION_TYPE') != 'redis':
+        return 0
+    
+    session_interface = current_app.session_interface
+    redis_client = current_app.config['SESSION_REDIS']
+    prefix = current_app.config.get('SESSION_KEY_PREFIX', 'session:')
+    revoked = 0
+    
+    for key in redis_client.scan_iter(match=f'{prefix}*', count=500):
+        try:
+            data = session_interface.serializer.decode(redis_client.get(key))
+        except Exception:
+            continue
+        
+        if str(data.get('_user_id')) == str(user_id):
+            redis_client.delete(key)
+            revoked += 1
+    
+    logger.info("Revoked %s session(s) for user %s", revoked, user_id)
+    return revoked
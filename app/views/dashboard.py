@@ -5,55 +5,56 @@ This module handles the main dashboard interface for the MOH MNCAH Dashboard Sys
 
 from flask import Blueprint, render_template, request, jsonify, current_app
 from flask_login import login_required, current_user
-from sqlalchemy import desc, func
+from sqlalchemy import DateTime, Integer, case, cast, desc, func, literal_column, null, select, union_all
+from sqlalchemy.orm import aliased, load_only
 from datetime import datetime, timedelta
+import hashlib
 import logging
 
-from ..models.upload import DataUpload, UploadStatus
-from ..models.user import User, UserType
+from ..models.upload import DataUpload, FacilityStats, UploadStatus, year_month
+from ..models.user import User, UserStatus, UserType
 from ..services.calculation_service import MNCHACalculationService
 from ..services.validation_service import DataValidationService
-from .. import db
+from ..utils.decorators import get_current_user_permissions, request_cache, ttl_cache
+from ..utils.helpers import escape_like
+from .. import db, cache
 
 
 # Create dashboard blueprint
 dashboard_bp = Blueprint('dashboard', __name__)
 logger = logging.getLogger(__name__)
 
+# Facility comparison results, keyed on the latest upload per facility
+FACILITY_COMPARISON_CACHE_PREFIX = 'facility_cmp:'
+FACILITY_COMPARISON_CACHE_TIMEOUT = 3600
+
 
 @dashboard_bp.route('/')
 @login_required
 def index():
     """
     Main dashboard view showing overview statistics and recent activity
+    
+    Recent uploads and the facilities panel load themselves from the
+    dashboard API endpoints once the page has rendered.
     """
     try:
         # Get dashboard statistics
         stats = get_dashboard_statistics()
         
-        # Get recent uploads
-        recent_uploads = get_recent_uploads(limit=10)
-        
         # Get validation summary
         validation_summary = get_validation_summary()
         
-        # Get facilities summary
-        facilities_summary = get_facilities_summary()
-        
         return render_template('dashboard/index.html',
                              stats=stats,
-                             recent_uploads=recent_uploads,
                              validation_summary=validation_summary,
-                             facilities_summary=facilities_summary,
                              user_type=current_user.user_type.value)
     
     except Exception as e:
         logger.error(f"Error loading dashboard: {str(e)}")
         return render_template('dashboard/index.html',
                              stats={},
-                             recent_uploads=[],
                              validation_summary={},
-                             facilities_summary={},
                              error="Error loading dashboard data")
 
 
@@ -79,7 +80,7 @@ def api_recent_uploads():
     API endpoint to get recent uploads
     """
     try:
-        limit = request.args.get('limit', 20, type=int)
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)  # Max 100 items
         uploads = get_recent_uploads(limit=limit)
         
         return jsonify({
@@ -107,6 +108,21 @@ def api_validation_summary():
         return jsonify({'error': 'Error retrieving validation summary'}), 500
 
 
+@dashboard_bp.route('/api/facilities-summary')
+@login_required
+def api_facilities_summary():
+    """
+    API endpoint to get the facilities summary
+    """
+    try:
+        summary = get_facilities_summary()
+        return jsonify(summary)
+    
+    except Exception as e:
+        logger.error(f"Error getting facilities summary: {str(e)}")
+        return jsonify({'error': 'Error retrieving facilities summary'}), 500
+
+
 @dashboard_bp.route('/overview')
 @login_required
 def overview():
@@ -203,32 +219,57 @@ def search():
         return jsonify({'error': 'Error performing search'}), 500
 
 
-def get_dashboard_statistics():
-    """Get basic dashboard statistics"""
-    try:
-        stats = {
-            'total_uploads': db.session.query(DataUpload).count(),
-            'total_facilities': db.session.query(DataUpload.facility_name).distinct().count(),
-            'total_users': db.session.query(User).count(),
-            'active_users': db.session.query(User).filter_by(status='active').count(),
-            'completed_uploads': db.session.query(DataUpload).filter_by(status=UploadStatus.COMPLETED).count(),
-            'pending_uploads': db.session.query(DataUpload).filter_by(status=UploadStatus.PENDING).count(),
-            'failed_uploads': db.session.query(DataUpload).filter_by(status=UploadStatus.FAILED).count(),
-        }
+@ttl_cache(ttl=30)
+def _dashboard_statistics():
+    """Compute basic dashboard statistics"""
+    # Recent activity window (last 30 days)
+    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+    
+    # All upload counts in one round trip via conditional aggregation
+    upload_counts = db.session.execute(select(
+        func.count(DataUpload.id),
+        func.count(func.distinct(DataUpload.facility_name)),
+        func.sum(case((DataUpload.status == UploadStatus.COMPLETED, 1), else_=0)),
+        func.sum(case((DataUpload.status == UploadStatus.PENDING, 1), else_=0)),
+        func.sum(case((DataUpload.status == UploadStatus.FAILED, 1), else_=0)),
+        func.sum(case((DataUpload.uploaded_at >= thirty_days_ago, 1), else_=0))
+    )).one()
+    
+    user_counts = db.session.execute(select(
+        func.count(User.id),
+        func.sum(case((User.status == UserStatus.ACTIVE, 1), else_=0))
+    )).one()
+    
+    (total_uploads, total_facilities, completed_uploads,
+     pending_uploads, failed_uploads, recent_uploads) = upload_counts
+    total_users, active_users = user_counts
+    
+    # SUM() over an empty table is NULL
+    stats = {
+        'total_uploads': total_uploads,
+        'total_facilities': total_facilities,
+        'total_users': total_users,
+        'active_users': active_users or 0,
+        'completed_uploads': completed_uploads or 0,
+        'pending_uploads': pending_uploads or 0,
+        'failed_uploads': failed_uploads or 0,
+        'recent_uploads': recent_uploads or 0,
+    }
 
-        # Recent activity (last 30 days)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        stats['recent_uploads'] = db.session.query(DataUpload).filter(
-            DataUpload.uploaded_at >= thirty_days_ago
-        ).count()
+    # Calculate upload success rate
+    stats['success_rate'] = (
+        (stats['completed_uploads'] / stats['total_uploads']) * 100
+        if stats['total_uploads'] > 0 else 0
+    )
 
-        # Calculate upload success rate
-        stats['success_rate'] = (
-            (stats['completed_uploads'] / stats['total_uploads']) * 100
-            if stats['total_uploads'] > 0 else 0
-        )
+    return stats
 
-        return stats
+
+@request_cache
+def get_dashboard_statistics():
+    """Get basic dashboard statistics"""
+    try:
+        return _dashboard_statistics()
     except Exception as e:
         logger.error(f"Error calculating dashboard statistics: {str(e)}")
         return {}
@@ -237,7 +278,10 @@ def get_dashboard_statistics():
 def get_recent_uploads(limit=10):
     """Get recent data uploads"""
     try:
-        uploads = db.session.query(DataUpload).order_by(
+        # Only the summary columns are rendered, so skip the JSON payloads
+        uploads = db.session.query(DataUpload).options(
+            DataUpload.summary_load_option()
+        ).order_by(
             desc(DataUpload.uploaded_at)
         ).limit(limit).all()
         return uploads
@@ -246,118 +290,126 @@ def get_recent_uploads(limit=10):
         return []
 
 
-def get_validation_summary():
-    """Get validation summary across all uploads"""
-    try:
-        # Get completed uploads with validation data
-        uploads = db.session.query(DataUpload).filter_by(status=UploadStatus.COMPLETED).all()
-        
-        if not uploads:
-            return {
-                'total_indicators': 0,
-                'valid_indicators': 0,
-                'warning_indicators': 0,
-                'error_indicators': 0,
-                'validation_rate': 0
-            }
-        
-        total_indicators = sum(upload.total_indicators for upload in uploads)
-        valid_indicators = sum(upload.valid_indicators for upload in uploads)
-        warning_indicators = sum(upload.warning_indicators for upload in uploads)
-        error_indicators = sum(upload.error_indicators for upload in uploads)
-        
-        validation_rate = (valid_indicators / total_indicators * 100) if total_indicators > 0 else 0
-        
+@ttl_cache(ttl=30)
+def _validation_summary():
+    """Compute validation summary across all uploads"""
+    # Sum indicator counts in the database rather than loading every upload
+    (total_indicators, valid_indicators, warning_indicators,
+     error_indicators, uploads_analyzed) = db.session.execute(select(
+        func.coalesce(func.sum(DataUpload.total_indicators), 0),
+        func.coalesce(func.sum(DataUpload.valid_indicators), 0),
+        func.coalesce(func.sum(DataUpload.warning_indicators), 0),
+        func.coalesce(func.sum(DataUpload.error_indicators), 0),
+        func.count(DataUpload.id)
+    ).where(DataUpload.status == UploadStatus.COMPLETED)).one()
+    
+    if not uploads_analyzed:
         return {
-            'total_indicators': total_indicators,
-            'valid_indicators': valid_indicators,
-            'warning_indicators': warning_indicators,
-            'error_indicators': error_indicators,
-            'validation_rate': validation_rate,
-            'uploads_analyzed': len(uploads)
+            'total_indicators': 0,
+            'valid_indicators': 0,
+            'warning_indicators': 0,
+            'error_indicators': 0,
+            'validation_rate': 0
         }
     
+    validation_rate = (valid_indicators / total_indicators * 100) if total_indicators > 0 else 0
+    
+    return {
+        'total_indicators': total_indicators,
+        'valid_indicators': valid_indicators,
+        'warning_indicators': warning_indicators,
+        'error_indicators': error_indicators,
+        'validation_rate': validation_rate,
+        'uploads_analyzed': uploads_analyzed
+    }
+
+
+@request_cache
+def get_validation_summary():
+    """Get validation summary across all uploads"""
+    try:
+        return _validation_summary()
     except Exception as e:
         logger.error(f"Error getting validation summary: {str(e)}")
         return {}
 
 
+@ttl_cache(ttl=30)
+def _facilities_summary():
+    """Compute summary of facilities and their performance"""
+    # Per-facility aggregates are maintained in facility_stats on upload changes;
+    # the window count is evaluated before LIMIT, so it still covers every facility
+    facility_rows = db.session.execute(select(
+        FacilityStats,
+        func.count().over().label('total_facilities')
+    ).order_by(desc(FacilityStats.latest_upload)).limit(10)).all()
+    
+    facilities_data = [{
+        'name': facility.facility_name,
+        'district': facility.district,
+        'latest_upload': facility.latest_upload,
+        'total_uploads': facility.total_uploads,
+        'validation_rate': facility.latest_validation_rate,
+        'has_critical_issues': (facility.latest_error_indicators or 0) > 0
+    } for facility, _ in facility_rows]
+    
+    return {
+        'total_facilities': facility_rows[0].total_facilities if facility_rows else 0,
+        'facilities': facilities_data
+    }
+
+
+@request_cache
 def get_facilities_summary():
     """Get summary of facilities and their performance"""
     try:
-        # Get unique facilities with their latest upload
-        facilities_query = db.session.query(
-            DataUpload.facility_name,
-            DataUpload.district,
-            func.max(DataUpload.uploaded_at).label('latest_upload'),
-            func.count(DataUpload.id).label('total_uploads')
-        ).filter_by(status=UploadStatus.COMPLETED).group_by(
-            DataUpload.facility_name, DataUpload.district
-        ).all()
-
-        facilities_data = []
-        for facility in facilities_query:
-            # Get latest upload data for this facility
-            latest_upload = db.session.query(DataUpload).filter_by(
-                facility_name=facility.facility_name,
-                status=UploadStatus.COMPLETED
-            ).order_by(desc(DataUpload.uploaded_at)).first()
-
-            if latest_upload:
-                validation_summary = latest_upload.get_validation_summary()
-                facilities_data.append({
-                    'name': facility.facility_name,
-                    'district': facility.district,
-                    'latest_upload': facility.latest_upload,
-                    'total_uploads': facility.total_uploads,
-                    'validation_rate': validation_summary.get('validation_rate', 0),
-                    'has_critical_issues': validation_summary.get('has_critical_issues', False)
-                })
-
-        return {
-            'total_facilities': len(facilities_data),
-            'facilities': sorted(facilities_data, key=lambda x: x['latest_upload'], reverse=True)[:10]
-        }
+        return _facilities_summary()
     except Exception as e:
         logger.error(f"Error getting facilities summary: {str(e)}")
         return {}
 
 
+@ttl_cache(ttl=30)
+def _comprehensive_statistics():
+    """Compute comprehensive statistics for overview page"""
+    # Copy so the cached basic statistics aren't modified
+    stats = dict(_dashboard_statistics())
+    
+    # Add more detailed statistics
+    uploads_by_period = db.session.execute(select(
+        DataUpload.period_type,
+        func.count(DataUpload.id)
+    ).group_by(DataUpload.period_type)).all()
+    
+    stats['uploads_by_period'] = {period.value: count for period, count in uploads_by_period}
+    
+    # Districts statistics
+    districts = db.session.execute(select(
+        DataUpload.district,
+        func.count(DataUpload.id)
+    ).where(DataUpload.district.isnot(None)).group_by(DataUpload.district)).all()
+    
+    stats['districts'] = len(districts)
+    stats['uploads_by_district'] = dict(districts)
+    
+    # Monthly upload trends (last 12 months)
+    twelve_months_ago = datetime.utcnow() - timedelta(days=365)
+    month = year_month(DataUpload.uploaded_at).label('month')
+    monthly_uploads = db.session.execute(select(
+        month,
+        func.count(DataUpload.id)
+    ).where(DataUpload.uploaded_at >= twelve_months_ago).group_by(month)).all()
+    
+    stats['monthly_trends'] = dict(monthly_uploads)
+    
+    return stats
+
+
+@request_cache
 def get_comprehensive_statistics():
     """Get comprehensive statistics for overview page"""
     try:
-        stats = get_dashboard_statistics()
-        
-        # Add more detailed statistics
-        uploads_by_period = db.session.query(
-            DataUpload.period_type,
-            func.count(DataUpload.id)
-        ).group_by(DataUpload.period_type).all()
-        
-        stats['uploads_by_period'] = {period.value: count for period, count in uploads_by_period}
-        
-        # Districts statistics
-        districts = db.session.query(
-            DataUpload.district,
-            func.count(DataUpload.id)
-        ).filter(DataUpload.district.isnot(None)).group_by(DataUpload.district).all()
-        
-        stats['districts'] = len(districts)
-        stats['uploads_by_district'] = dict(districts)
-        
-        # Monthly upload trends (last 12 months)
-        twelve_months_ago = datetime.utcnow() - timedelta(days=365)
-        monthly_uploads = db.session.query(
-            func.strftime('%Y-%m', DataUpload.uploaded_at).label('month'),
-            func.count(DataUpload.id)
-        ).filter(DataUpload.uploaded_at >= twelve_months_ago).group_by(
-            func.strftime('%Y-%m', DataUpload.uploaded_at)
-        ).all()
-        
-        stats['monthly_trends'] = dict(monthly_uploads)
-        
-        return stats
-    
+        return _comprehensive_statistics()
     except Exception as e:
         logger.error(f"Error getting comprehensive statistics: {str(e)}")
         return get_dashboard_statistics()
@@ -366,40 +418,31 @@ def get_comprehensive_statistics():
 def get_performance_trends():
     """Get performance trends over time"""
     try:
-        calculation_service = MNCHACalculationService()
-        
-        # Get uploads from last 6 months for trend analysis
+        # Aggregate uploads from last 6 months by month in the database
         six_months_ago = datetime.utcnow() - timedelta(days=180)
-        uploads = DataUpload.query.filter(
+        month = year_month(DataUpload.uploaded_at).label('month')
+        
+        monthly_rows = db.session.execute(select(
+            month,
+            func.avg(DataUpload.validation_rate),
+            func.count(DataUpload.id),
+            func.count(func.distinct(DataUpload.facility_name))
+        ).where(
             DataUpload.uploaded_at >= six_months_ago,
             DataUpload.status == UploadStatus.COMPLETED
-        ).order_by(DataUpload.uploaded_at).all()
+        ).group_by(month).order_by(month)).all()
         
-        if len(uploads) < 2:
+        if sum(upload_count for _, _, upload_count, _ in monthly_rows) < 2:
             return {'message': 'Insufficient data for trend analysis'}
         
-        # Group uploads by month
-        monthly_data = {}
-        for upload in uploads:
-            month_key = upload.uploaded_at.strftime('%Y-%m')
-            if month_key not in monthly_data:
-                monthly_data[month_key] = []
-            monthly_data[month_key].append(upload.to_dict(include_data=True))
-        
-        trends_data = {}
-        for month, month_uploads in monthly_data.items():
-            # Calculate average validation rates for the month
-            total_validation_rate = sum(
-                upload.get('validation_summary', {}).get('validation_rate', 0) 
-                for upload in month_uploads
-            )
-            avg_validation_rate = total_validation_rate / len(month_uploads) if month_uploads else 0
-            
-            trends_data[month] = {
-                'validation_rate': avg_validation_rate,
-                'upload_count': len(month_uploads),
-                'facilities_count': len(set(upload.get('facility_name') for upload in month_uploads))
+        trends_data = {
+            month_key: {
+                'validation_rate': avg_validation_rate or 0,
+                'upload_count': upload_count,
+                'facilities_count': facilities_count
             }
+            for month_key, avg_validation_rate, upload_count, facilities_count in monthly_rows
+        }
         
         return {
             'monthly_trends': trends_data,
@@ -414,24 +457,45 @@ def get_performance_trends():
 def get_facility_comparison():
     """Get facility performance comparison"""
     try:
+        # Key the cached result on each facility's latest completed upload and
+        # processing time, so new, reprocessed or removed uploads produce a new
+        # key instead of needing invalidation
+        cache_key = None
+        if cache is not None:
+            latest_uploads = db.session.execute(select(
+                DataUpload.facility_name,
+                func.max(DataUpload.uploaded_at),
+                func.max(DataUpload.processed_at),
+                func.count(DataUpload.id)
+            ).where(DataUpload.status == UploadStatus.COMPLETED).group_by(
+                DataUpload.facility_name
+            ).order_by(DataUpload.facility_name)).all()
+            
+            signature = hashlib.blake2b(
+                repr([tuple(row) for row in latest_uploads]).encode(), digest_size=16
+            ).hexdigest()
+            cache_key = f'{FACILITY_COMPARISON_CACHE_PREFIX}{signature}'
+            
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         calculation_service = MNCHACalculationService()
         
-        # Get latest upload for each facility
-        latest_uploads = db.session.query(
-            DataUpload.facility_name,
-            func.max(DataUpload.uploaded_at).label('latest_date')
-        ).filter_by(status=UploadStatus.COMPLETED).group_by(DataUpload.facility_name).all()
+        # Latest completed upload for each facility (shared with the facilities
+        # listing in the same request), plus just their calculated indicators
+        latest_uploads = [upload for upload, _ in get_latest_completed_uploads()]
+        processed_data = dict(db.session.execute(
+            select(DataUpload.id, DataUpload.processed_data).where(
+                DataUpload.id.in_([upload.id for upload in latest_uploads])
+            )
+        ).all()) if latest_uploads else {}
         
-        facility_data = []
-        for facility_name, latest_date in latest_uploads:
-            upload = db.session.query(DataUpload).filter_by(
-                facility_name=facility_name,
-                uploaded_at=latest_date,
-                status=UploadStatus.COMPLETED
-            ).first()
-            
-            if upload:
-                facility_data.append(upload.to_dict(include_data=True))
+        # The comparison only reads the facility name and calculated indicators
+        facility_data = [
+            {'facility_name': upload.facility_name, 'processed_data': processed_data.get(upload.id) or {}}
+            for upload in latest_uploads
+        ]
         
         if len(facility_data) < 2:
             return {'message': 'Need at least 2 facilities for comparison'}
@@ -439,6 +503,9 @@ def get_facility_comparison():
         # Use calculation service for comparison
         comparison_results = calculation_service.compare_facilities(facility_data)
         
+        if cache_key and 'error' not in comparison_results:
+            cache.set(cache_key, comparison_results, timeout=FACILITY_COMPARISON_CACHE_TIMEOUT)
+        
         return comparison_results
     
     except Exception as e:
@@ -446,31 +513,49 @@ def get_facility_comparison():
         return {}
 
 
+@request_cache
+def get_latest_completed_uploads():
+    """
+    Get each facility's latest completed upload with its total upload count
+    
+    A single window-function scan replaces a latest-upload query and a
+    count query per facility. Only the summary columns are loaded, and the
+    result is shared by every caller within a request.
+    
+    Returns:
+        List of (DataUpload, total_uploads) rows, newest upload first
+    """
+    ranked = db.session.query(
+        DataUpload,
+        func.row_number().over(
+            partition_by=(DataUpload.facility_name, DataUpload.status),
+            order_by=desc(DataUpload.uploaded_at)
+        ).label('rn'),
+        func.count(DataUpload.id).over(
+            partition_by=DataUpload.facility_name
+        ).label('total_uploads')
+    ).subquery()
+    latest_upload = aliased(DataUpload, ranked)
+    
+    return db.session.query(latest_upload, ranked.c.total_uploads).options(
+        load_only(*(getattr(latest_upload, name) for name in DataUpload.SUMMARY_COLUMNS))
+    ).filter(
+        ranked.c.rn == 1,
+        latest_upload.status == UploadStatus.COMPLETED
+    ).order_by(desc(latest_upload.uploaded_at)).all()
+
+
 def get_all_facilities_data():
     """Get data for all facilities"""
     try:
-        facilities = db.session.query(DataUpload.facility_name).distinct().all()
-        facilities_data = []
-        
-        for (facility_name,) in facilities:
-            # Get latest upload for this facility
-            latest_upload = db.session.query(DataUpload).filter_by(
-                facility_name=facility_name,
-                status=UploadStatus.COMPLETED
-            ).order_by(desc(DataUpload.uploaded_at)).first()
-            
-            if latest_upload:
-                facility_info = {
-                    'name': facility_name,
-                    'district': latest_upload.district,
-                    'latest_upload_date': latest_upload.uploaded_at,
-                    'reporting_period': latest_upload.reporting_period,
-                    'validation_summary': latest_upload.get_validation_summary(),
-                'total_uploads': db.session.query(DataUpload).filter_by(facility_name=facility_name).count()
-                }
-                facilities_data.append(facility_info)
-        
-        return sorted(facilities_data, key=lambda x: x['latest_upload_date'], reverse=True)
+        return [{
+            'name': latest_upload.facility_name,
+            'district': latest_upload.district,
+            'latest_upload_date': latest_upload.uploaded_at,
+            'reporting_period': latest_upload.reporting_period,
+            'validation_summary': latest_upload.get_validation_summary(),
+            'total_uploads': total_uploads
+        } for latest_upload, total_uploads in get_latest_completed_uploads()]
     
     except Exception as e:
         logger.error(f"Error getting all facilities data: {str(e)}")
@@ -493,34 +578,72 @@ def perform_search(query, category):
         results = []
         query_lower = query.lower()
         
+        # Match on lower(column) so the pg_trgm indexes serve the substring search
+        pattern = f'%{escape_like(query_lower)}%'
+        facility_match = func.lower(DataUpload.facility_name).like(pattern, escape='\\')
+        
+        # Each branch becomes a subquery so its own DISTINCT/LIMIT survive the UNION ALL
+        branches = []
+        
         # Search facilities
         if category in ['all', 'facilities']:
-            facilities = db.session.query(DataUpload.facility_name, DataUpload.district).filter(
-                DataUpload.facility_name.ilike(f'%{query}%') |
-                DataUpload.district.ilike(f'%{query}%')
-            ).distinct().all()
+            facilities = select(
+                DataUpload.facility_name,
+                DataUpload.district.label('detail')
+            ).where(
+                facility_match |
+                func.lower(DataUpload.district).like(pattern, escape='\\')
+            ).distinct().limit(20).subquery()
             
-            for facility_name, district in facilities:
-                results.append({
-                    'type': 'facility',
-                    'title': facility_name,
-                    'subtitle': district,
-                    'url': f'/analysis?facility={facility_name}'
-                })
+            branches.append(select(
+                literal_column("'facility'").label('type'),
+                facilities.c.facility_name,
+                facilities.c.detail,
+                cast(null(), Integer).label('id'),
+                cast(null(), DateTime).label('uploaded_at')
+            ))
         
         # Search uploads by reporting period
         if category in ['all', 'uploads']:
-            uploads = DataUpload.query.filter(
-                DataUpload.reporting_period.ilike(f'%{query}%') |
-                DataUpload.facility_name.ilike(f'%{query}%')
-            ).limit(10).all()
+            uploads = select(
+                DataUpload.id,
+                DataUpload.facility_name,
+                DataUpload.reporting_period.label('detail'),
+                DataUpload.uploaded_at
+            ).where(
+                func.lower(DataUpload.reporting_period).like(pattern, escape='\\') |
+                facility_match
+            ).limit(10).subquery()
             
-            for upload in uploads:
+            branches.append(select(
+                literal_column("'upload'").label('type'),
+                uploads.c.facility_name,
+                uploads.c.detail,
+                uploads.c.id,
+                uploads.c.uploaded_at
+            ))
+        
+        if not branches:
+            return results
+        
+        # One round trip for both branches
+        rows = db.session.execute(union_all(*branches) if len(branches) > 1 else branches[0]).all()
+        
+        # UNION ALL doesn't promise branch order; keep facilities ahead of uploads
+        for row in sorted(rows, key=lambda row: row.type != 'facility'):
+            if row.type == 'facility':
+                results.append({
+                    'type': 'facility',
+                    'title': row.facility_name,
+                    'subtitle': row.detail,
+                    'url': f'/analysis?facility={row.facility_name}'
+                })
+            else:
                 results.append({
                     'type': 'upload',
-                    'title': f"{upload.facility_name} - {upload.reporting_period}",
-                    'subtitle': f"Uploaded {upload.uploaded_at.strftime('%Y-%m-%d')}",
-                    'url': f'/analysis/upload/{upload.id}'
+                    'title': f"{row.facility_name} - {row.detail}",
+                    'subtitle': f"Uploaded {row.uploaded_at.strftime('%Y-%m-%d')}",
+                    'url': f'/analysis/upload/{row.id}'
                 })
         
         return results
@@ -537,5 +660,5 @@ def inject_dashboard_globals():
     return {
         'current_time': datetime.utcnow(),
         'user_can_upload': current_user.can_upload_data() if current_user.is_authenticated else False,
-        'user_permissions': current_user.get_permissions() if current_user.is_authenticated else []
+        'user_permissions': get_current_user_permissions()
     }
@@ -6,31 +6,74 @@ for the MOH MNCAH Dashboard System.
 
 import os
 import io
+import sys
+import bisect
+import copy
+import functools
+import hashlib
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from flask import Blueprint, render_template, request, jsonify, send_file, current_app
+from types import SimpleNamespace
+from flask import (Blueprint, render_template, request, jsonify, send_file, current_app,
+                   url_for, copy_current_request_context, after_this_request)
 from flask_login import login_required, current_user
+from sqlalchemy import and_, case, func, or_, select
 import logging
-
-# PDF generation imports
-try:
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib import colors
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
+import numpy as np
 
 from ..models.upload import DataUpload, UploadStatus
 from ..services.validation_service import DataValidationService
 from ..services.calculation_service import MNCHACalculationService
-from .. import db
+from ..utils.decorators import request_cache
+from ..utils.helpers import calculate_median, escape_like
+from .. import db, cache
 
 
 # Create reports blueprint
 reports_bp = Blueprint('reports', __name__)
 logger = logging.getLogger(__name__)
 
+# Validation rate band lower bounds, and the labels for each band from lowest to highest
+QUALITY_BAND_THRESHOLDS = (60, 75, 90)
+QUALITY_BAND_KEYS = ('poor', 'needs_improvement', 'good', 'excellent')
+PERFORMANCE_LEVELS = ('Needs Improvement', 'Acceptable', 'Good', 'Excellent')
+
+# Filter dropdown lists, cached under the current uploads data version
+REPORT_FILTERS_CACHE_PREFIX = 'report_filters:'
+REPORT_FILTERS_CACHE_TIMEOUT = 300
+
+# Upper bound on facilities rendered into one bulk PDF export
+PDF_BULK_MAX_FACILITIES = 50
+
+# Rendered PDF bytes, cached per user, export parameters and uploads data version
+PDF_EXPORT_CACHE_PREFIX = 'pdf_export:'
+PDF_EXPORT_CACHE_TIMEOUT = 300
+
+# Opt-in background PDF jobs (async=1). Job state lives in the shared cache and the
+# rendered file in EXPORT_FOLDER, so any worker can answer status and download polls.
+PDF_JOB_CACHE_PREFIX = 'pdf_job:'
+PDF_JOB_TTL = 3600
+PDF_JOB_ID = re.compile(r'[0-9a-f]{32}')
+PDF_JOB_WORKERS = 2
+pdf_job_executor = ThreadPoolExecutor(max_workers=PDF_JOB_WORKERS, thread_name_prefix='pdf-export')
+
+# In-process LRU of generated report data, keyed on the filters and data version
+REPORT_DATA_CACHE_SIZE = 32
+report_data_cache = OrderedDict()
+report_data_cache_lock = threading.Lock()
+
+
+def quality_band(rate, labels=QUALITY_BAND_KEYS):
+    """Return the label of the validation rate band that rate falls in"""
+    return labels[bisect.bisect_right(QUALITY_BAND_THRESHOLDS, rate)]
+
 
 @reports_bp.route('/')
 @login_required
@@ -198,13 +241,11 @@ def export_excel():
         categories = request.args.getlist('categories') or ['anc', 'intrapartum', 'pnc']
         
         # Generate Excel file
-        excel_file = create_excel_export(facilities, districts, categories)
+        excel_path = create_excel_export(facilities, districts, categories)
         
-        return send_file(
-            excel_file,
-            as_attachment=True,
-            download_name=f'MNCAH_Data_Export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx',
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        return send_excel_file(
+            excel_path,
+            f'MNCAH_Data_Export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
         )
     
     except Exception as e:
@@ -217,20 +258,18 @@ def export_excel():
 def export_pdf():
     """
     Export report to PDF format
+    
+    With async=1 rendering runs in the background and the response carries a
+    job id to poll; otherwise the PDF is returned directly.
     """
     try:
         # Get parameters
         report_type = request.args.get('report_type', 'summary')
         facility = request.args.get('facility')
         
-        # Generate PDF
-        pdf_file = create_pdf_export(report_type, facility)
-        
-        return send_file(
-            pdf_file,
-            as_attachment=True,
-            download_name=f'MNCAH_Report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf',
-            mimetype='application/pdf'
+        return export_pdf_response(
+            f'MNCAH_Report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf',
+            create_pdf_export, report_type, facility
         )
     
     except Exception as e:
@@ -238,6 +277,77 @@ def export_pdf():
         return jsonify({'success': False, 'message': 'Error generating PDF export'}), 500
 
 
+@reports_bp.route('/export/pdf/bulk')
+@login_required
+def export_pdf_bulk():
+    """
+    Export several facility reports as sections of a single PDF
+    """
+    try:
+        facilities = [facility for facility in request.args.getlist('facilities') if facility]
+        
+        if not facilities:
+            return jsonify({'success': False, 'message': 'At least one facility is required'}), 400
+        
+        if len(facilities) > PDF_BULK_MAX_FACILITIES:
+            return jsonify({
+                'success': False,
+                'message': f'At most {PDF_BULK_MAX_FACILITIES} facilities can be exported at once'
+            }), 400
+        
+        return export_pdf_response(
+            f'MNCAH_Facility_Reports_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf',
+            create_pdf_export_bulk, facilities
+        )
+    
+    except Exception as e:
+        logger.error(f"Error exporting bulk PDF: {str(e)}")
+        return jsonify({'success': False, 'message': 'Error generating PDF export'}), 500
+
+
+@reports_bp.route('/export/pdf/status/<string:job_id>')
+@login_required
+def export_pdf_status(job_id):
+    """
+    Report the state of a background PDF export
+    """
+    job = get_pdf_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Export job not found'}), 404
+    
+    status = job['status']
+    response = {'success': True, 'job_id': job_id, 'status': status}
+    if status == 'completed':
+        response['download_url'] = url_for('reports.export_pdf_download', job_id=job_id)
+    
+    return jsonify(response)
+
+
+@reports_bp.route('/export/pdf/download/<string:job_id>')
+@login_required
+def export_pdf_download(job_id):
+    """
+    Download the PDF produced by a background export
+    """
+    job = get_pdf_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Export job not found'}), 404
+    
+    if job['status'] == 'failed':
+        return jsonify({'success': False, 'message': 'Error generating PDF export'}), 500
+    
+    path = pdf_job_path(job_id)
+    if job['status'] != 'completed' or not os.path.exists(path):
+        return jsonify({'success': False, 'message': 'Export is still being generated'}), 409
+    
+    return send_file(
+        path,
+        as_attachment=True,
+        download_name=job['download_name'],
+        mimetype='application/pdf'
+    )
+
+
 @reports_bp.route('/validation-dashboard')
 @login_required
 def validation_dashboard():
@@ -247,13 +357,13 @@ def validation_dashboard():
     try:
         validation_service = DataValidationService()
         
-        # Get all completed uploads
-        uploads = DataUpload.query.filter_by(status=UploadStatus.COMPLETED).all()
+        # Get all completed uploads as plain dictionaries
+        uploads = DataUpload.bulk_to_dicts(
+            db.session, DataUpload.status == UploadStatus.COMPLETED
+        )
         
         # Generate validation dashboard data
-        dashboard_data = validation_service.generate_validation_dashboard_data([
-            upload.to_dict(include_data=True) for upload in uploads
-        ])
+        dashboard_data = validation_service.generate_validation_dashboard_data(uploads)
         
         return render_template('reports/validation_dashboard.html',
                              dashboard_data=dashboard_data)
@@ -274,11 +384,15 @@ def api_report_data():
     API endpoint for report data
     """
     try:
+        etag = report_data_etag()
+        if request.if_none_match.contains(etag):
+            return not_modified_response(etag)
+        
         report_type = request.args.get('type', 'summary')
         facilities = request.args.getlist('facilities')
         
         data = generate_api_report_data(report_type, facilities)
-        return jsonify(data)
+        return with_report_data_etag(jsonify(data), etag)
     
     except Exception as e:
         logger.error(f"Error getting report data: {str(e)}")
@@ -292,8 +406,12 @@ def api_validation_summary():
     API endpoint for validation summary
     """
     try:
+        etag = report_data_etag()
+        if request.if_none_match.contains(etag):
+            return not_modified_response(etag)
+        
         summary = get_system_validation_summary()
-        return jsonify(summary)
+        return with_report_data_etag(jsonify(summary), etag)
     
     except Exception as e:
         logger.error(f"Error getting validation summary: {str(e)}")
@@ -302,30 +420,52 @@ def api_validation_summary():
 
 # Helper functions
 
+def report_data_etag():
+    """
+    ETag for the report API endpoints, derived from the endpoint, its query
+    arguments and the uploads data version
+    """
+    state = f"{request.endpoint}:{sorted(request.args.items(multi=True))}:{get_uploads_data_version()}"
+    return hashlib.blake2b(state.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def with_report_data_etag(response, etag):
+    """Attach the ETag and a short private cache lifetime to a report API response"""
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = 60
+    return response
+
+
+def not_modified_response(etag):
+    """Empty 304 for a client that already holds the current payload"""
+    return with_report_data_etag(current_app.response_class(status=304), etag)
+
+
 def get_report_statistics():
     """Get statistics for reports dashboard"""
     try:
-        stats = {
-            'total_facilities': db.session.query(DataUpload.facility_name).distinct().count(),
-            'total_uploads': DataUpload.query.filter_by(status=UploadStatus.COMPLETED).count(),
-            'districts_covered': db.session.query(DataUpload.district).filter(
-                DataUpload.district.isnot(None)
-            ).distinct().count(),
-            'latest_period': db.session.query(DataUpload.reporting_period).order_by(
-                DataUpload.reporting_period.desc()
-            ).first()
-        }
-        
-        # Data quality stats
-        uploads = DataUpload.query.filter_by(status=UploadStatus.COMPLETED).all()
-        if uploads:
-            total_indicators = sum(upload.total_indicators for upload in uploads)
-            valid_indicators = sum(upload.valid_indicators for upload in uploads)
-            stats['overall_quality_rate'] = (valid_indicators / total_indicators * 100) if total_indicators > 0 else 0
-        else:
-            stats['overall_quality_rate'] = 0
+        completed = DataUpload.status == UploadStatus.COMPLETED
+        (total_facilities, total_uploads, districts_covered, latest_period,
+         total_indicators, valid_indicators) = db.session.execute(
+            select(
+                func.count(func.distinct(DataUpload.facility_name)),
+                func.count(case((completed, 1))),
+                func.count(func.distinct(DataUpload.district)),
+                func.max(DataUpload.reporting_period),
+                func.coalesce(func.sum(case((completed, DataUpload.total_indicators))), 0),
+                func.coalesce(func.sum(case((completed, DataUpload.valid_indicators))), 0)
+            )
+        ).one()
         
-        return stats
+        return {
+            'total_facilities': total_facilities,
+            'total_uploads': total_uploads,
+            'districts_covered': districts_covered,
+            'latest_period': latest_period,
+            # Data quality stats
+            'overall_quality_rate': (valid_indicators / total_indicators * 100) if total_indicators > 0 else 0
+        }
     
     except Exception as e:
         logger.error(f"Error getting report statistics: {str(e)}")
@@ -336,20 +476,27 @@ def get_recent_report_activity():
     """Get recent report generation activity"""
     try:
         # Get recent uploads as proxy for report activity
-        recent_uploads = DataUpload.query.filter_by(
-            status=UploadStatus.COMPLETED
-        ).order_by(
-            DataUpload.uploaded_at.desc()
-        ).limit(10).all()
+        recent_uploads = db.session.execute(
+            select(
+                DataUpload.facility_name,
+                DataUpload.reporting_period,
+                DataUpload.uploaded_at,
+                DataUpload.validation_rate
+            ).where(
+                DataUpload.status == UploadStatus.COMPLETED
+            ).order_by(
+                DataUpload.uploaded_at.desc()
+            ).limit(10)
+        ).all()
         
         activity = []
-        for upload in recent_uploads:
+        for facility_name, reporting_period, uploaded_at, validation_rate in recent_uploads:
             activity.append({
                 'type': 'data_upload',
-                'facility': upload.facility_name,
-                'period': upload.reporting_period,
-                'date': upload.uploaded_at,
-                'quality_score': upload.get_validation_summary().get('validation_rate', 0)
+                'facility': facility_name,
+                'period': reporting_period,
+                'date': uploaded_at,
+                'quality_score': validation_rate
             })
         
         return activity
@@ -359,9 +506,37 @@ def get_recent_report_activity():
         return []
 
 
+@request_cache
+def get_uploads_data_version():
+    """
+    Get a stamp that changes whenever uploads are added, reprocessed or removed
+    
+    Cache keys that include it stop matching once the underlying data
+    changes, so cached report data never needs explicit invalidation.
+    """
+    latest_upload, latest_processed, upload_count = db.session.execute(select(
+        func.max(DataUpload.uploaded_at),
+        func.max(DataUpload.processed_at),
+        func.count(DataUpload.id)
+    )).one()
+    
+    return '{}:{}:{}'.format(
+        latest_upload.timestamp() if latest_upload else 0,
+        latest_processed.timestamp() if latest_processed else 0,
+        upload_count
+    )
+
+
 def get_report_filters_data():
     """Get data for report filters"""
     try:
+        cache_key = None
+        if cache is not None:
+            cache_key = f'{REPORT_FILTERS_CACHE_PREFIX}{get_uploads_data_version()}'
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         # Get unique facilities
         facilities = db.session.query(DataUpload.facility_name).distinct().order_by(DataUpload.facility_name).all()
         
@@ -375,11 +550,16 @@ def get_report_filters_data():
             DataUpload.reporting_period.desc()
         ).all()
         
-        return {
+        filters_data = {
             'facilities': [f[0] for f in facilities],
             'districts': [d[0] for d in districts],
             'periods': [p[0] for p in periods]
         }
+        
+        if cache_key:
+            cache.set(cache_key, filters_data, timeout=REPORT_FILTERS_CACHE_TIMEOUT)
+        
+        return filters_data
     
     except Exception as e:
         logger.error(f"Error getting report filters data: {str(e)}")
@@ -388,26 +568,77 @@ def get_report_filters_data():
 
 def generate_report_data(report_type='comprehensive', facilities=None, districts=None, 
                         period_from=None, period_to=None, include_validation=True):
-    """Generate comprehensive report data"""
+    """
+    Generate comprehensive report data, reusing a recent identical report
+    
+    Results are cached per filter combination and uploads data version, so
+    re-requesting a report (HTML, then PDF) skips rebuilding it until the
+    data changes. Callers get their own copy.
+    """
+    key = (
+        report_type,
+        tuple(sorted(facilities or ())),
+        tuple(sorted(districts or ())),
+        period_from,
+        period_to,
+        include_validation,
+        get_uploads_data_version()
+    )
+    
+    with report_data_cache_lock:
+        report_data = report_data_cache.get(key)
+        if report_data is not None:
+            report_data_cache.move_to_end(key)
+    
+    if report_data is None:
+        report_data = build_report_data(report_type, facilities, districts,
+                                        period_from, period_to, include_validation)
+        if 'error' in report_data:
+            return report_data
+        
+        with report_data_cache_lock:
+            report_data_cache[key] = report_data
+            while len(report_data_cache) > REPORT_DATA_CACHE_SIZE:
+                report_data_cache.popitem(last=False)
+    
+    report_data = copy.deepcopy(report_data)
+    if 'metadata' in report_data:
+        report_data['metadata']['generated_at'] = datetime.utcnow()
+        report_data['metadata']['generated_by'] = current_user.username
+    
+    return report_data
+
+
+def build_report_data(report_type='comprehensive', facilities=None, districts=None, 
+                      period_from=None, period_to=None, include_validation=True):
+    """Build comprehensive report data from the matching uploads"""
     try:
-        # Build query
-        query = DataUpload.query.filter_by(status=UploadStatus.COMPLETED)
+        # Build filter criteria, shared by the query and the SQL aggregates
+        criteria = [DataUpload.status == UploadStatus.COMPLETED]
         
         if facilities:
-            query = query.filter(DataUpload.facility_name.in_(facilities))
+            criteria.append(DataUpload.facility_name.in_(facilities))
         
         if districts:
-            query = query.filter(DataUpload.district.in_(districts))
+            criteria.append(DataUpload.district.in_(districts))
         
         if period_from:
-            query = query.filter(DataUpload.reporting_period >= period_from)
+            criteria.append(DataUpload.reporting_period >= period_from)
         
         if period_to:
-            query = query.filter(DataUpload.reporting_period <= period_to)
+            criteria.append(DataUpload.reporting_period <= period_to)
+        
+        # Summary columns plus each category's indicators and validations, extracted in SQL
+        uploads = db.session.execute(
+            select(*scan_columns()).where(*criteria)
+            .order_by(DataUpload.uploaded_at.desc())
+            .execution_options(yield_per=500)
+        )
         
-        uploads = query.order_by(DataUpload.uploaded_at.desc()).all()
+        # One streamed pass over the uploads feeds every section below
+        scan = scan_uploads(uploads)
         
-        if not uploads:
+        if not scan.upload_count:
             return {'message': 'No data available for the selected criteria'}
         
         # Generate report sections based on type
@@ -416,29 +647,29 @@ def generate_report_data(report_type='comprehensive', facilities=None, districts
                 'generated_at': datetime.utcnow(),
                 'generated_by': current_user.username,
                 'report_type': report_type,
-                'total_uploads': len(uploads),
+                'total_uploads': scan.upload_count,
                 'date_range': {
-                    'from': min(upload.uploaded_at for upload in uploads),
-                    'to': max(upload.uploaded_at for upload in uploads)
+                    'from': scan.first_uploaded_at,
+                    'to': scan.last_uploaded_at
                 }
             },
-            'executive_summary': generate_executive_summary(uploads),
-            'data_overview': generate_data_overview(uploads)
+            'executive_summary': generate_executive_summary(scan, criteria),
+            'data_overview': generate_data_overview(scan, criteria)
         }
         
         # Add category-specific data based on report type
         if report_type in ['comprehensive', 'anc']:
-            report_data['anc_analysis'] = generate_category_report(uploads, 'anc')
+            report_data['anc_analysis'] = generate_category_report(scan, 'anc')
         
         if report_type in ['comprehensive', 'intrapartum']:
-            report_data['intrapartum_analysis'] = generate_category_report(uploads, 'intrapartum')
+            report_data['intrapartum_analysis'] = generate_category_report(scan, 'intrapartum')
         
         if report_type in ['comprehensive', 'pnc']:
-            report_data['pnc_analysis'] = generate_category_report(uploads, 'pnc')
+            report_data['pnc_analysis'] = generate_category_report(scan, 'pnc')
         
         # Add validation data if requested
         if include_validation:
-            report_data['data_quality'] = generate_validation_report(uploads)
+            report_data['data_quality'] = generate_validation_report(scan)
         
         return report_data
     
@@ -447,38 +678,37 @@ def generate_report_data(report_type='comprehensive', facilities=None, districts
         return {'error': str(e)}
 
 
-def generate_executive_summary(uploads):
+def generate_executive_summary(scan, criteria):
     """Generate executive summary for report"""
     try:
-        # Calculate key metrics
-        total_facilities = len(set(upload.facility_name for upload in uploads))
-        total_indicators = sum(upload.total_indicators for upload in uploads)
-        valid_indicators = sum(upload.valid_indicators for upload in uploads)
+        # Calculate key metrics in the database
+        totals = db.session.execute(
+            select(
+                func.count(func.distinct(DataUpload.facility_name)),
+                func.coalesce(func.sum(DataUpload.total_indicators), 0),
+                func.coalesce(func.sum(DataUpload.valid_indicators), 0)
+            ).where(*criteria)
+        ).one()
+        total_facilities, total_indicators, valid_indicators = totals
         
         overall_quality = (valid_indicators / total_indicators * 100) if total_indicators > 0 else 0
         
-        # Categorize performance
-        excellent_facilities = 0
-        good_facilities = 0
-        poor_facilities = 0
-        
-        facility_performance = {}
-        for upload in uploads:
-            facility = upload.facility_name
-            if facility not in facility_performance:
-                facility_performance[facility] = []
-            
-            summary = upload.get_validation_summary()
-            facility_performance[facility].append(summary.get('validation_rate', 0))
-        
-        for facility, rates in facility_performance.items():
-            avg_rate = sum(rates) / len(rates)
-            if avg_rate >= 85:
-                excellent_facilities += 1
-            elif avg_rate >= 70:
-                good_facilities += 1
-            else:
-                poor_facilities += 1
+        # Categorize performance on each facility's average validation rate
+        facility_rates = (
+            select(func.avg(DataUpload.validation_rate).label('avg_rate'))
+            .where(*criteria)
+            .group_by(DataUpload.facility_name)
+            .subquery()
+        )
+        distribution = db.session.execute(
+            select(
+                func.count(case((facility_rates.c.avg_rate >= 85, 1))),
+                func.count(case((and_(facility_rates.c.avg_rate >= 70,
+                                      facility_rates.c.avg_rate < 85), 1))),
+                func.count(case((facility_rates.c.avg_rate < 70, 1)))
+            )
+        ).one()
+        excellent_facilities, good_facilities, poor_facilities = distribution
         
         return {
             'total_facilities': total_facilities,
@@ -488,8 +718,8 @@ def generate_executive_summary(uploads):
                 'good': good_facilities,
                 'needs_improvement': poor_facilities
             },
-            'key_findings': generate_key_findings(uploads),
-            'recommendations': generate_recommendations(uploads)
+            'key_findings': generate_key_findings(scan),
+            'recommendations': generate_recommendations(scan)
         }
     
     except Exception as e:
@@ -497,20 +727,22 @@ def generate_executive_summary(uploads):
         return {}
 
 
-def generate_data_overview(uploads):
+def generate_data_overview(scan, criteria):
     """Generate data overview section"""
     try:
         # Geographic distribution
-        districts = {}
-        for upload in uploads:
-            if upload.district:
-                districts[upload.district] = districts.get(upload.district, 0) + 1
+        districts = dict(db.session.execute(
+            select(DataUpload.district, func.count())
+            .where(*criteria, DataUpload.district.isnot(None), DataUpload.district != '')
+            .group_by(DataUpload.district)
+        ).all())
         
         # Temporal distribution
-        periods = {}
-        for upload in uploads:
-            period = upload.reporting_period
-            periods[period] = periods.get(period, 0) + 1
+        periods = dict(db.session.execute(
+            select(DataUpload.reporting_period, func.count())
+            .where(*criteria)
+            .group_by(DataUpload.reporting_period)
+        ).all())
         
         # Facility types (based on naming patterns)
         facility_types = {
@@ -521,24 +753,25 @@ def generate_data_overview(uploads):
             'Other': 0
         }
         
-        for upload in uploads:
-            facility_name = upload.facility_name.lower()
-            if 'national' in facility_name:
-                facility_types['National Referral'] += 1
-            elif 'regional' in facility_name:
-                facility_types['Regional Referral'] += 1
-            elif 'district' in facility_name:
-                facility_types['District Hospital'] += 1
-            elif 'health center' in facility_name or 'hc' in facility_name:
-                facility_types['Health Center'] += 1
-            else:
-                facility_types['Other'] += 1
+        facility_name = func.lower(DataUpload.facility_name)
+        facility_type = case(
+            (facility_name.contains('national', autoescape=True), 'National Referral'),
+            (facility_name.contains('regional', autoescape=True), 'Regional Referral'),
+            (facility_name.contains('district', autoescape=True), 'District Hospital'),
+            (or_(facility_name.contains('health center', autoescape=True),
+                 facility_name.contains('hc', autoescape=True)), 'Health Center'),
+            else_='Other'
+        ).label('facility_type')
+        for type_name, count in db.session.execute(
+            select(facility_type, func.count()).where(*criteria).group_by(facility_type)
+        ):
+            facility_types[type_name] = count
         
         return {
             'geographic_distribution': districts,
             'temporal_distribution': periods,
             'facility_types': facility_types,
-            'data_completeness': calculate_data_completeness(uploads)
+            'data_completeness': calculate_data_completeness(scan)
         }
     
     except Exception as e:
@@ -546,42 +779,45 @@ def generate_data_overview(uploads):
         return {}
 
 
-def generate_category_report(uploads, category):
+def generate_category_report(scan, category):
     """Generate report for a specific MNCAH category"""
     try:
-        category_data = []
-        
-        for upload in uploads:
-            if upload.processed_data and category in upload.processed_data:
-                upload_category_data = {
-                    'facility': upload.facility_name,
-                    'district': upload.district,
-                    'period': upload.reporting_period,
-                    'indicators': upload.processed_data[category].get('indicators', {}),
-                    'validations': upload.processed_data[category].get('validations', {})
-                }
-                category_data.append(upload_category_data)
+        category_data = scan.category_rows[category]
         
         if not category_data:
             return {'message': f'No {category.upper()} data available'}
         
-        # Calculate category statistics
-        all_indicators = {}
-        for data in category_data:
+        # Calculate category statistics over an uploads x indicators matrix
+        indicator_names = list(dict.fromkeys(
+            indicator for data in category_data for indicator in data['indicators']
+        ))
+        matrix = np.full((len(category_data), len(indicator_names)), np.nan)
+        positions = {indicator: i for i, indicator in enumerate(indicator_names)}
+        for row, data in enumerate(category_data):
             for indicator, value in data['indicators'].items():
-                if indicator not in all_indicators:
-                    all_indicators[indicator] = []
-                all_indicators[indicator].append(value)
-        
-        statistics = {}
-        for indicator, values in all_indicators.items():
-            statistics[indicator] = {
-                'count': len(values),
-                'mean': sum(values) / len(values),
-                'min': min(values),
-                'max': max(values),
-                'median': sorted(values)[len(values)//2]
+                matrix[row, positions[indicator]] = value
+        
+        present = ~np.isnan(matrix)
+        counts = np.count_nonzero(present, axis=0)
+        # Same median as the API (mean of the two middle values for even counts)
+        medians = [
+            calculate_median(matrix[present[:, i], i]) if counts[i] else np.nan
+            for i in range(len(indicator_names))
+        ]
+        means = np.nanmean(matrix, axis=0)
+        mins = np.nanmin(matrix, axis=0)
+        maxs = np.nanmax(matrix, axis=0)
+        
+        statistics = {
+            indicator: {
+                'count': int(counts[i]),
+                'mean': float(means[i]),
+                'min': float(mins[i]),
+                'max': float(maxs[i]),
+                'median': float(medians[i])
             }
+            for i, indicator in enumerate(indicator_names)
+        }
         
         return {
             'category': category.upper(),
@@ -600,37 +836,41 @@ def generate_data_quality_report(facility_filter=None, district_filter=None, per
     try:
         validation_service = DataValidationService()
         
-        # Build query with filters
-        query = DataUpload.query.filter_by(status=UploadStatus.COMPLETED)
+        # Build filters
+        criteria = [DataUpload.status == UploadStatus.COMPLETED]
         
         if facility_filter:
-            query = query.filter(DataUpload.facility_name.ilike(f'%{facility_filter}%'))
+            criteria.append(
+                func.lower(DataUpload.facility_name).like(f'%{escape_like(facility_filter.lower())}%', escape='\\')
+            )
         
         if district_filter:
-            query = query.filter(DataUpload.district.ilike(f'%{district_filter}%'))
+            criteria.append(
+                func.lower(DataUpload.district).like(f'%{escape_like(district_filter.lower())}%', escape='\\')
+            )
         
         if period_filter:
-            query = query.filter(DataUpload.reporting_period.ilike(f'%{period_filter}%'))
+            criteria.append(
+                func.lower(DataUpload.reporting_period).like(f'%{escape_like(period_filter.lower())}%', escape='\\')
+            )
         
-        uploads = query.all()
+        uploads = DataUpload.bulk_to_dicts(db.session, *criteria, include_processed_data=True)
         
         if not uploads:
             return {'message': 'No data available for the selected filters'}
         
-        # Generate validation reports for each upload
-        validation_results = []
-        for upload in uploads:
-            if upload.processed_data:
-                validation_report = validation_service.validate_upload_data(upload.processed_data)
-                validation_report['facility'] = upload.facility_name
-                validation_report['district'] = upload.district
-                validation_report['period'] = upload.reporting_period
-                validation_results.append(validation_report)
+        # Generate validation reports for all uploads in one batch
+        validated_uploads = [upload for upload in uploads if upload['processed_data']]
+        validation_results = validation_service.validate_batch(
+            [upload['processed_data'] for upload in validated_uploads]
+        )
+        for upload, validation_report in zip(validated_uploads, validation_results):
+            validation_report['facility'] = upload['facility_name']
+            validation_report['district'] = upload['district']
+            validation_report['period'] = upload['reporting_period']
         
         # Generate dashboard data
-        dashboard_data = validation_service.generate_validation_dashboard_data([
-            upload.to_dict(include_data=True) for upload in uploads
-        ])
+        dashboard_data = validation_service.generate_validation_dashboard_data(uploads)
         
         return {
             'validation_results': validation_results,
@@ -639,7 +879,7 @@ def generate_data_quality_report(facility_filter=None, district_filter=None, per
                 'total_uploads': len(uploads),
                 'uploads_analyzed': len(validation_results),
                 'average_quality_score': sum(
-                    upload.get_validation_summary().get('validation_rate', 0) 
+                    upload['validation_summary']['validation_rate'] 
                     for upload in uploads
                 ) / len(uploads) if uploads else 0
             }
@@ -655,16 +895,27 @@ def generate_performance_summary():
     try:
         calculation_service = MNCHACalculationService()
         
-        # Get all completed uploads
-        uploads = DataUpload.query.filter_by(status=UploadStatus.COMPLETED).all()
+        # Get all completed uploads; only the summary columns and each
+        # category's indicators and validations are read
+        uploads = db.session.execute(
+            select(*scan_columns()).where(DataUpload.status == UploadStatus.COMPLETED)
+        ).all()
         
         if not uploads:
             return {'message': 'No data available'}
         
         # Convert to format for calculation service
-        facility_data = []
-        for upload in uploads:
-            facility_data.append(upload.to_dict(include_data=True))
+        facility_data = [
+            {
+                'facility_name': upload.facility_name,
+                'processed_data': {
+                    category: {'indicators': getattr(upload, f'{category}_indicators')}
+                    for category in ['anc', 'intrapartum', 'pnc']
+                    if getattr(upload, f'{category}_indicators') is not None
+                }
+            }
+            for upload in uploads
+        ]
         
         # Generate facility comparison
         if len(facility_data) >= 2:
@@ -673,17 +924,20 @@ def generate_performance_summary():
             comparison_results = {'message': 'Need at least 2 facilities for comparison'}
         
         # Generate system-wide statistics
+        scan = scan_uploads(uploads)
         system_stats = {
-            'total_facilities': len(set(upload.facility_name for upload in uploads)),
-            'total_indicators_analyzed': sum(upload.total_indicators for upload in uploads),
-            'overall_performance': calculate_overall_performance(uploads),
-            'category_performance': calculate_category_performance(uploads)
+            'total_facilities': len(scan.facilities),
+            'total_indicators_analyzed': scan.total_indicators,
+            'overall_performance': calculate_overall_performance(
+                DataUpload.status == UploadStatus.COMPLETED
+            ),
+            'category_performance': calculate_category_performance(scan)
         }
         
         return {
             'system_statistics': system_stats,
             'facility_comparison': comparison_results,
-            'performance_trends': calculate_performance_trends(uploads)
+            'performance_trends': calculate_performance_trends(DataUpload.status == UploadStatus.COMPLETED)
         }
     
     except Exception as e:
@@ -695,34 +949,45 @@ def generate_facility_report(facility_name):
     """Generate detailed report for a specific facility"""
     try:
         calculation_service = MNCHACalculationService()
+        criteria = (
+            DataUpload.facility_name == facility_name,
+            DataUpload.status == UploadStatus.COMPLETED
+        )
         
-        # Get all uploads for this facility
-        uploads = DataUpload.query.filter_by(
-            facility_name=facility_name,
-            status=UploadStatus.COMPLETED
-        ).order_by(DataUpload.uploaded_at.desc()).all()
+        # Last 12 uploads, limited and ordered in the database
+        upload_dicts = DataUpload.bulk_to_dicts(
+            db.session,
+            *criteria,
+            order_by=DataUpload.uploaded_at.desc(),
+            limit=12
+        )
         
-        if not uploads:
+        if not upload_dicts:
             return {'message': f'No data available for facility: {facility_name}'}
         
-        # Convert to format for trend analysis
-        upload_dicts = [upload.to_dict(include_data=True) for upload in uploads]
+        total_uploads = db.session.execute(
+            select(func.count(DataUpload.id)).where(*criteria)
+        ).scalar()
         
-        # Get trends analysis
-        trends_data = calculation_service.get_indicator_trends(facility_name, upload_dicts)
+        # Get trends analysis, streaming only the columns the calculation needs
+        trend_rows = db.session.query(
+            DataUpload.reporting_period,
+            DataUpload.uploaded_at,
+            DataUpload.processed_data
+        ).filter(*criteria).order_by(DataUpload.uploaded_at).yield_per(100)
+        trends_data = calculation_service.get_indicator_trends_from_series(facility_name, trend_rows)
         
         # Get latest performance
-        latest_upload = uploads[0]
-        latest_summary = latest_upload.get_validation_summary()
+        latest_upload = upload_dicts[0]
         
         return {
             'facility_name': facility_name,
-            'district': latest_upload.district,
-            'latest_period': latest_upload.reporting_period,
-            'total_uploads': len(uploads),
-            'latest_performance': latest_summary,
+            'district': latest_upload['district'],
+            'latest_period': latest_upload['reporting_period'],
+            'total_uploads': total_uploads,
+            'latest_performance': latest_upload['validation_summary'],
             'trends_analysis': trends_data,
-            'historical_data': [upload.to_dict() for upload in uploads[:12]]  # Last 12 uploads
+            'historical_data': upload_dicts
         }
     
     except Exception as e:
@@ -731,80 +996,289 @@ def generate_facility_report(facility_name):
 
 
 def create_excel_export(facilities=None, districts=None, categories=None):
-    """Create Excel export file"""
+    """
+    Create Excel export file and return its temporary path
+    
+    Uploads are read in a single streamed pass and written into a write-only
+    workbook: summary rows go straight to their sheet, category rows are kept
+    as plain lists until each sheet's indicator columns are known. The
+    workbook is saved to disk so the response can stream it from there.
+    """
     try:
-        import pandas as pd
-        from io import BytesIO
+        from openpyxl import Workbook
         
-        # Build query
-        query = DataUpload.query.filter_by(status=UploadStatus.COMPLETED)
+        # Build filters
+        criteria = [DataUpload.status == UploadStatus.COMPLETED]
         
         if facilities:
-            query = query.filter(DataUpload.facility_name.in_(facilities))
+            criteria.append(DataUpload.facility_name.in_(facilities))
         
         if districts:
-            query = query.filter(DataUpload.district.in_(districts))
-        
-        uploads = query.all()
+            criteria.append(DataUpload.district.in_(districts))
         
-        if not uploads:
+        if not db.session.execute(select(DataUpload.id).where(*criteria).limit(1)).first():
             raise ValueError("No data available for export")
         
-        # Create Excel file in memory
-        output = BytesIO()
-        
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # Summary sheet
-            summary_data = []
-            for upload in uploads:
-                summary_data.append({
-                    'Facility': upload.facility_name,
-                    'District': upload.district,
-                    'Period': upload.reporting_period,
-                    'Population': upload.total_population,
-                    'Upload Date': upload.uploaded_at,
-                    'Validation Rate': upload.get_validation_summary().get('validation_rate', 0)
-                })
+        workbook = Workbook(write_only=True)
+        
+        # Summary sheet
+        summary_sheet = workbook.create_sheet('Summary')
+        summary_sheet.append(['Facility', 'District', 'Period', 'Population',
+                              'Upload Date', 'Validation Rate'])
+        
+        # Category rows and their indicator column positions, in first-seen order
+        categories = categories or ['anc', 'intrapartum', 'pnc']
+        category_rows = {category: [] for category in categories}
+        category_columns = {category: {} for category in categories}
+        
+        uploads = db.session.execute(
+            select(
+                DataUpload.facility_name, DataUpload.district,
+                DataUpload.reporting_period, DataUpload.total_population,
+                DataUpload.uploaded_at, DataUpload.total_indicators,
+                DataUpload.valid_indicators, DataUpload.processed_data
+            ).where(*criteria).execution_options(yield_per=500)
+        )
+        for (facility_name, district, period, population, uploaded_at,
+             total_indicators, valid_indicators, processed_data) in uploads:
+            summary = DataUpload.summarize_validation(total_indicators or 0, valid_indicators or 0, 0, 0)
+            summary_sheet.append([facility_name, district, period, population,
+                                  uploaded_at, summary['validation_rate']])
             
-            pd.DataFrame(summary_data).to_excel(writer, sheet_name='Summary', index=False)
+            if not processed_data:
+                continue
             
-            # Category-specific sheets
-            for category in categories or ['anc', 'intrapartum', 'pnc']:
-                category_data = []
+            for category in categories:
+                if category not in processed_data:
+                    continue
+                
+                indicators = processed_data[category].get('indicators', {})
+                validations = processed_data[category].get('validations', {})
+                columns = category_columns[category]
                 
-                for upload in uploads:
-                    if upload.processed_data and category in upload.processed_data:
-                        row_data = {
-                            'Facility': upload.facility_name,
-                            'District': upload.district,
-                            'Period': upload.reporting_period
-                        }
-                        
-                        indicators = upload.processed_data[category].get('indicators', {})
-                        validations = upload.processed_data[category].get('validations', {})
-                        
-                        for indicator, value in indicators.items():
-                            row_data[f'{indicator}_value'] = value
-                            row_data[f'{indicator}_status'] = validations.get(indicator, 'unknown')
-                        
-                        category_data.append(row_data)
+                row = [facility_name, district, period] + [None] * (2 * len(columns))
+                for indicator, value in indicators.items():
+                    position = columns.get(indicator)
+                    if position is None:
+                        position = columns[indicator] = len(columns)
+                        row.extend((None, None))
+                    row[3 + 2 * position] = value
+                    row[4 + 2 * position] = validations.get(indicator, 'unknown')
                 
-                if category_data:
-                    pd.DataFrame(category_data).to_excel(
-                        writer, sheet_name=category.upper(), index=False
-                    )
+                category_rows[category].append(row)
         
-        output.seek(0)
-        return output
+        # Category-specific sheets
+        for category in categories:
+            rows = category_rows[category]
+            if not rows:
+                continue
+            
+            header = ['Facility', 'District', 'Period']
+            for indicator in category_columns[category]:
+                header.extend((f'{indicator}_value', f'{indicator}_status'))
+            
+            category_sheet = workbook.create_sheet(category.upper())
+            category_sheet.append(header)
+            for row in rows:
+                row.extend([None] * (len(header) - len(row)))
+                category_sheet.append(row)
+        
+        # Save to a temporary file; send_excel_file removes it after the response
+        with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as export_file:
+            export_path = export_file.name
+        try:
+            workbook.save(export_path)
+        except Exception:
+            os.remove(export_path)
+            raise
+        
+        return export_path
     
     except Exception as e:
         logger.error(f"Error creating Excel export: {str(e)}")
         raise
 
 
+def send_excel_file(path, download_name):
+    """Send a temporary Excel export and delete it once the response is built"""
+    response = send_file(
+        path,
+        as_attachment=True,
+        download_name=download_name,
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+    
+    # The response already holds an open handle, so the file can be unlinked now
+    @after_this_request
+    def remove_export_file(response):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove Excel export {path}: {str(e)}")
+        return response
+    
+    return response
+
+
+def export_pdf_response(download_name, render, *args):
+    """
+    Return a rendered PDF, or queue it as a background job when async=1
+    
+    Background jobs need a working cache to record their state; without one
+    the PDF is always rendered in the request.
+    """
+    job_store_available = cache is not None and current_app.config.get('CACHE_TYPE') != 'NullCache'
+    if request.args.get('async') in ('1', 'true') and job_store_available:
+        return pdf_job_response(submit_pdf_job(download_name, render, *args))
+    
+    return send_pdf(render_pdf_bytes(render, *args), download_name)
+
+
+def send_pdf(pdf_bytes, download_name):
+    """Send rendered PDF bytes as an attachment"""
+    return send_file(
+        io.BytesIO(pdf_bytes),
+        as_attachment=True,
+        download_name=download_name,
+        mimetype='application/pdf'
+    )
+
+
+def submit_pdf_job(download_name, render, *args):
+    """Queue a PDF render in the background and return its job id"""
+    purge_expired_pdf_jobs()
+    
+    job_id = uuid.uuid4().hex
+    job = {'user_id': current_user.id, 'download_name': download_name, 'status': 'pending'}
+    path = pdf_job_path(job_id)
+    set_pdf_job(job_id, job)
+    
+    # The copied request context gives the worker thread current_user and its own DB session
+    @copy_current_request_context
+    def run():
+        set_pdf_job(job_id, dict(job, status='running'))
+        try:
+            pdf_bytes = render_pdf_bytes(render, *args)
+            
+            # Write under a temporary name so a download never sees a partial file
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial_path = f'{path}.part'
+            with open(partial_path, 'wb') as pdf_file:
+                pdf_file.write(pdf_bytes)
+            os.replace(partial_path, path)
+        except Exception as e:
+            logger.error(f"Error exporting to PDF: {str(e)}")
+            set_pdf_job(job_id, dict(job, status='failed'))
+            return
+        
+        set_pdf_job(job_id, dict(job, status='completed'))
+    
+    pdf_job_executor.submit(run)
+    return job_id
+
+
+def render_pdf_bytes(render, *args):
+    """
+    Render a PDF export to bytes, reusing a cached copy for identical requests
+    
+    The key includes the uploads data version, so a cached PDF is only served
+    while the data it was built from is unchanged.
+    """
+    if cache is None:
+        return render(*args).getvalue()
+    
+    signature = hashlib.blake2b(repr((render.__name__, args)).encode('utf-8'), digest_size=12).hexdigest()
+    cache_key = f'{PDF_EXPORT_CACHE_PREFIX}{current_user.id}:{signature}:{get_uploads_data_version()}'
+    
+    pdf_bytes = cache.get(cache_key)
+    if pdf_bytes is None:
+        pdf_bytes = render(*args).getvalue()
+        cache.set(cache_key, pdf_bytes, timeout=PDF_EXPORT_CACHE_TIMEOUT)
+    
+    return pdf_bytes
+
+
+def pdf_job_response(job_id):
+    """Build the 202 response pointing the client at a queued PDF job"""
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('reports.export_pdf_status', job_id=job_id)
+    }), 202
+
+
+def pdf_job_path(job_id):
+    """Location of a background PDF job's rendered file"""
+    return os.path.join(current_app.config['EXPORT_FOLDER'], f'pdf_job_{job_id}.pdf')
+
+
+def set_pdf_job(job_id, job):
+    """Record a PDF job's state in the shared cache"""
+    cache.set(f'{PDF_JOB_CACHE_PREFIX}{job_id}', job, timeout=PDF_JOB_TTL)
+
+
+def get_pdf_job(job_id):
+    """Return the current user's PDF job, or None"""
+    if cache is None or not PDF_JOB_ID.fullmatch(job_id):
+        return None
+    
+    job = cache.get(f'{PDF_JOB_CACHE_PREFIX}{job_id}')
+    if job is None or job['user_id'] != current_user.id:
+        return None
+    
+    return job
+
+
+def purge_expired_pdf_jobs():
+    """Delete rendered PDF job files older than PDF_JOB_TTL"""
+    export_folder = current_app.config['EXPORT_FOLDER']
+    cutoff = time.time() - PDF_JOB_TTL
+    try:
+        with os.scandir(export_folder) as entries:
+            for entry in entries:
+                if entry.name.startswith('pdf_job_') and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+    except OSError as e:
+        logger.warning(f"Could not purge expired PDF exports in {export_folder}: {str(e)}")
+
+
+@functools.lru_cache(maxsize=1)
+def load_reportlab():
+    """
+    Import ReportLab on first PDF export rather than at module load
+    
+    Returns a namespace of the pieces the PDF builders use, including the
+    stylesheets built once here, or None when ReportLab is not installed.
+    """
+    try:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib import colors
+    except ImportError:
+        return None
+    
+    styles = getSampleStyleSheet()
+    
+    # Custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#2c5aa0'),
+        spaceAfter=30
+    )
+    
+    return SimpleNamespace(
+        A4=A4, SimpleDocTemplate=SimpleDocTemplate, Paragraph=Paragraph, Spacer=Spacer,
+        PageBreak=PageBreak, styles=styles, title_style=title_style
+    )
+
+
 def create_pdf_export(report_type, facility=None):
     """Create PDF export file"""
-    if not REPORTLAB_AVAILABLE:
+    reportlab = load_reportlab()
+    if reportlab is None:
         raise ImportError("ReportLab is required for PDF generation")
     
     try:
@@ -813,28 +1287,10 @@ def create_pdf_export(report_type, facility=None):
         output = BytesIO()
         
         # Create PDF document
-        doc = SimpleDocTemplate(output, pagesize=A4)
-        styles = getSampleStyleSheet()
-        
-        # Custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#2c5aa0'),
-            spaceAfter=30
-        )
+        doc = reportlab.SimpleDocTemplate(output, pagesize=reportlab.A4)
+        styles = reportlab.styles
         
-        story = []
-        
-        # Title
-        story.append(Paragraph("MOH MNCAH Dashboard Report", title_style))
-        story.append(Spacer(1, 20))
-        
-        # Report metadata
-        story.append(Paragraph(f"Generated: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", styles['Normal']))
-        story.append(Paragraph(f"Generated by: {current_user.username}", styles['Normal']))
-        story.append(Spacer(1, 20))
+        story = list(create_pdf_header_content(styles))
         
         # Report content based on type
         if facility:
@@ -855,68 +1311,206 @@ def create_pdf_export(report_type, facility=None):
         raise
 
 
+def create_pdf_export_bulk(facility_names):
+    """Create one PDF holding a report section per facility, built in a single pass"""
+    reportlab = load_reportlab()
+    if reportlab is None:
+        raise ImportError("ReportLab is required for PDF generation")
+    
+    try:
+        from io import BytesIO
+        
+        output = BytesIO()
+        
+        # Create PDF document
+        doc = reportlab.SimpleDocTemplate(output, pagesize=reportlab.A4)
+        styles = reportlab.styles
+        
+        story = list(create_pdf_header_content(styles))
+        
+        for index, facility in enumerate(facility_names):
+            if index:
+                story.append(reportlab.PageBreak())
+            facility_data = generate_facility_report(facility)
+            story.extend(create_pdf_facility_content(facility_data, styles))
+        
+        # Build PDF
+        doc.build(story)
+        output.seek(0)
+        return output
+    
+    except Exception as e:
+        logger.error(f"Error creating bulk PDF export: {str(e)}")
+        raise
+
+
+def create_pdf_header_content(styles):
+    """Yield the PDF title and report metadata shared by all exports"""
+    reportlab = load_reportlab()
+    
+    # Title
+    yield reportlab.Paragraph("MOH MNCAH Dashboard Report", reportlab.title_style)
+    yield reportlab.Spacer(1, 20)
+    
+    # Report metadata
+    yield reportlab.Paragraph(f"Generated: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", styles['Normal'])
+    yield reportlab.Paragraph(f"Generated by: {current_user.username}", styles['Normal'])
+    yield reportlab.Spacer(1, 20)
+
+
 def create_pdf_facility_content(facility_data, styles):
-    """Create PDF content for facility report"""
-    content = []
+    """Yield PDF flowables for a facility report"""
+    reportlab = load_reportlab()
     
-    content.append(Paragraph(f"Facility Report: {facility_data.get('facility_name', 'Unknown')}", styles['Heading2']))
-    content.append(Spacer(1, 12))
+    yield reportlab.Paragraph(f"Facility Report: {facility_data.get('facility_name', 'Unknown')}", styles['Heading2'])
+    yield reportlab.Spacer(1, 12)
     
     # Basic info
     if 'district' in facility_data:
-        content.append(Paragraph(f"District: {facility_data['district']}", styles['Normal']))
+        yield reportlab.Paragraph(f"District: {facility_data['district']}", styles['Normal'])
     
-    content.append(Paragraph(f"Total Uploads: {facility_data.get('total_uploads', 0)}", styles['Normal']))
-    content.append(Spacer(1, 12))
+    yield reportlab.Paragraph(f"Total Uploads: {facility_data.get('total_uploads', 0)}", styles['Normal'])
+    yield reportlab.Spacer(1, 12)
     
     # Performance summary
     latest_perf = facility_data.get('latest_performance', {})
     if latest_perf:
-        content.append(Paragraph("Latest Performance Summary:", styles['Heading3']))
-        content.append(Paragraph(f"Validation Rate: {latest_perf.get('validation_rate', 0):.1f}%", styles['Normal']))
-        content.append(Paragraph(f"Total Indicators: {latest_perf.get('total_indicators', 0)}", styles['Normal']))
-        content.append(Spacer(1, 12))
-    
-    return content
+        yield reportlab.Paragraph("Latest Performance Summary:", styles['Heading3'])
+        yield reportlab.Paragraph(f"Validation Rate: {latest_perf.get('validation_rate', 0):.1f}%", styles['Normal'])
+        yield reportlab.Paragraph(f"Total Indicators: {latest_perf.get('total_indicators', 0)}", styles['Normal'])
+        yield reportlab.Spacer(1, 12)
 
 
 def create_pdf_summary_content(report_data, styles):
-    """Create PDF content for summary report"""
-    content = []
+    """Yield PDF flowables for a summary report"""
+    reportlab = load_reportlab()
     
-    content.append(Paragraph("Executive Summary", styles['Heading2']))
-    content.append(Spacer(1, 12))
+    yield reportlab.Paragraph("Executive Summary", styles['Heading2'])
+    yield reportlab.Spacer(1, 12)
     
     # Executive summary
     exec_summary = report_data.get('executive_summary', {})
     if exec_summary:
-        content.append(Paragraph(f"Total Facilities: {exec_summary.get('total_facilities', 0)}", styles['Normal']))
-        content.append(Paragraph(f"Overall Quality Rate: {exec_summary.get('overall_quality_rate', 0):.1f}%", styles['Normal']))
-        content.append(Spacer(1, 12))
+        yield reportlab.Paragraph(f"Total Facilities: {exec_summary.get('total_facilities', 0)}", styles['Normal'])
+        yield reportlab.Paragraph(f"Overall Quality Rate: {exec_summary.get('overall_quality_rate', 0):.1f}%", styles['Normal'])
+        yield reportlab.Spacer(1, 12)
         
         # Performance distribution
         perf_dist = exec_summary.get('performance_distribution', {})
         if perf_dist:
-            content.append(Paragraph("Performance Distribution:", styles['Heading3']))
-            content.append(Paragraph(f"Excellent: {perf_dist.get('excellent', 0)} facilities", styles['Normal']))
-            content.append(Paragraph(f"Good: {perf_dist.get('good', 0)} facilities", styles['Normal']))
-            content.append(Paragraph(f"Needs Improvement: {perf_dist.get('needs_improvement', 0)} facilities", styles['Normal']))
-    
-    return content
+            yield reportlab.Paragraph("Performance Distribution:", styles['Heading3'])
+            yield reportlab.Paragraph(f"Excellent: {perf_dist.get('excellent', 0)} facilities", styles['Normal'])
+            yield reportlab.Paragraph(f"Good: {perf_dist.get('good', 0)} facilities", styles['Normal'])
+            yield reportlab.Paragraph(f"Needs Improvement: {perf_dist.get('needs_improvement', 0)} facilities", styles['Normal'])
 
 
 # Additional helper functions
 
-def generate_key_findings(uploads):
+@dataclass
+class UploadScan:
+    """Aggregates collected from a single pass over a set of uploads"""
+    upload_count: int = 0
+    total_indicators: int = 0
+    first_uploaded_at: datetime = None
+    last_uploaded_at: datetime = None
+    facilities: set = field(default_factory=set)
+    districts: set = field(default_factory=set)
+    periods: set = field(default_factory=set)
+    validation_rates: list = field(default_factory=list)
+    category_indicators: Counter = field(default_factory=Counter)
+    category_valid: Counter = field(default_factory=Counter)
+    category_issues: dict = field(default_factory=lambda: {
+        category: Counter() for category in ['anc', 'intrapartum', 'pnc']
+    })
+    indicator_issues: Counter = field(default_factory=Counter)
+    category_rows: dict = field(default_factory=lambda: {
+        category: [] for category in ['anc', 'intrapartum', 'pnc']
+    })
+
+
+def scan_columns():
+    """
+    Columns read by scan_uploads
+    
+    Each category's indicators and validations are pulled out of
+    processed_data by JSON path in the database, so the definitions and
+    population info stored alongside them never leave it.
+    """
+    columns = [
+        DataUpload.facility_name, DataUpload.district, DataUpload.reporting_period,
+        DataUpload.uploaded_at, DataUpload.total_indicators,
+        DataUpload.validation_rate.label('validation_rate')
+    ]
+    for category in ['anc', 'intrapartum', 'pnc']:
+        columns.append(DataUpload.processed_data[(category, 'indicators')].label(f'{category}_indicators'))
+        columns.append(DataUpload.processed_data[(category, 'validations')].label(f'{category}_validations'))
+    
+    return columns
+
+
+def scan_uploads(uploads):
+    """
+    Walk uploads once, collecting everything the report helpers need
+    
+    uploads are rows of scan_columns(), and may be streamed (yield_per);
+    no row is held after it has been folded in.
+    """
+    scan = UploadScan()
+    
+    for upload in uploads:
+        rate = upload.validation_rate
+        
+        # The same names recur across thousands of rows; intern them so the
+        # per-category rows kept below share one copy of each string
+        facility = sys.intern(upload.facility_name)
+        district = sys.intern(upload.district) if upload.district else upload.district
+        period = sys.intern(upload.reporting_period)
+        
+        scan.upload_count += 1
+        scan.total_indicators += upload.total_indicators or 0
+        if scan.first_uploaded_at is None or upload.uploaded_at < scan.first_uploaded_at:
+            scan.first_uploaded_at = upload.uploaded_at
+        if scan.last_uploaded_at is None or upload.uploaded_at > scan.last_uploaded_at:
+            scan.last_uploaded_at = upload.uploaded_at
+        scan.facilities.add(facility)
+        if district:
+            scan.districts.add(district)
+        scan.periods.add(period)
+        scan.validation_rates.append(rate)
+        
+        for category in ['anc', 'intrapartum', 'pnc']:
+            indicators = getattr(upload, f'{category}_indicators')
+            validations = getattr(upload, f'{category}_validations')
+            if indicators is None and validations is None:
+                continue
+            
+            validations = validations or {}
+            scan.category_rows[category].append({
+                'facility': facility,
+                'district': district,
+                'period': period,
+                'indicators': indicators or {},
+                'validations': validations
+            })
+            
+            scan.category_indicators[category] += len(validations)
+            for indicator, status in validations.items():
+                if status == 'green':
+                    scan.category_valid[category] += 1
+                elif status in ['red', 'blue']:
+                    scan.category_issues[category][indicator] += 1
+                    scan.indicator_issues[indicator] += 1
+    
+    return scan
+
+
+def generate_key_findings(scan):
     """Generate key findings from uploads data"""
     findings = []
     
     try:
-        # Calculate overall metrics
-        total_facilities = len(set(upload.facility_name for upload in uploads))
-        
         # Quality analysis
-        quality_rates = [upload.get_validation_summary().get('validation_rate', 0) for upload in uploads]
+        quality_rates = scan.validation_rates
         avg_quality = sum(quality_rates) / len(quality_rates) if quality_rates else 0
         
         if avg_quality >= 85:
@@ -927,12 +1521,10 @@ def generate_key_findings(uploads):
             findings.append("Data quality issues identified that require immediate attention")
         
         # Geographic coverage
-        districts = set(upload.district for upload in uploads if upload.district)
-        findings.append(f"Data covers {len(districts)} districts across Uganda")
+        findings.append(f"Data covers {len(scan.districts)} districts across Uganda")
         
         # Temporal coverage
-        periods = set(upload.reporting_period for upload in uploads)
-        findings.append(f"Reporting spans {len(periods)} time periods")
+        findings.append(f"Reporting spans {len(scan.periods)} time periods")
         
         return findings
     
@@ -941,36 +1533,17 @@ def generate_key_findings(uploads):
         return []
 
 
-def generate_recommendations(uploads):
+def generate_recommendations(scan):
     """Generate recommendations based on data analysis"""
     recommendations = []
     
     try:
-        # Analyze common issues
-        validation_issues = []
-        for upload in uploads:
-            if upload.processed_data:
-                for category in ['anc', 'intrapartum', 'pnc']:
-                    if category in upload.processed_data:
-                        validations = upload.processed_data[category].get('validations', {})
-                        for indicator, status in validations.items():
-                            if status in ['red', 'blue']:
-                                validation_issues.append((indicator, status))
-        
-        # Count most common issues
-        issue_counts = {}
-        for indicator, status in validation_issues:
-            issue_counts[indicator] = issue_counts.get(indicator, 0) + 1
-        
-        # Generate recommendations based on common issues
-        if issue_counts:
-            most_problematic = sorted(issue_counts.items(), key=lambda x: x[1], reverse=True)[:3]
-            for indicator, count in most_problematic:
-                recommendations.append(f"Focus improvement efforts on {indicator} indicator (issues in {count} facilities)")
+        # Generate recommendations based on the most common issues
+        for indicator, count in scan.indicator_issues.most_common(3):
+            recommendations.append(f"Focus improvement efforts on {indicator} indicator (issues in {count} facilities)")
         
         # General recommendations
-        quality_rates = [upload.get_validation_summary().get('validation_rate', 0) for upload in uploads]
-        low_quality_facilities = sum(1 for rate in quality_rates if rate < 70)
+        low_quality_facilities = sum(1 for rate in scan.validation_rates if rate < 70)
         
         if low_quality_facilities > 0:
             recommendations.append(f"Provide targeted data quality training to {low_quality_facilities} facilities with quality rates below 70%")
@@ -985,12 +1558,12 @@ def generate_recommendations(uploads):
         return []
 
 
-def calculate_data_completeness(uploads):
+def calculate_data_completeness(scan):
     """Calculate data completeness metrics"""
     try:
         completeness_data = {
-            'total_expected_indicators': len(uploads) * 25,  # 25 MNCAH indicators per upload
-            'total_actual_indicators': sum(upload.total_indicators for upload in uploads),
+            'total_expected_indicators': scan.upload_count * 25,  # 25 MNCAH indicators per upload
+            'total_actual_indicators': scan.total_indicators,
             'completeness_rate': 0
         }
         
@@ -1010,42 +1583,42 @@ def calculate_data_completeness(uploads):
 def analyze_category_performance(category_data):
     """Analyze performance for a category"""
     try:
+        import pandas as pd
+        
         performance_analysis = {
             'total_facilities': len(category_data),
             'indicator_performance': {},
             'facility_rankings': []
         }
         
-        # Analyze each indicator
-        all_indicators = {}
-        for facility_data in category_data:
-            validations = facility_data.get('validations', {})
-            for indicator, status in validations.items():
-                if indicator not in all_indicators:
-                    all_indicators[indicator] = {'green': 0, 'yellow': 0, 'red': 0, 'blue': 0}
-                all_indicators[indicator][status] = all_indicators[indicator].get(status, 0) + 1
+        # One row per facility upload, one column per indicator, cells are status colours
+        statuses = pd.DataFrame([facility_data.get('validations', {}) for facility_data in category_data])
         
-        performance_analysis['indicator_performance'] = all_indicators
+        # Analyze each indicator
+        status_counts = statuses.apply(lambda column: column.value_counts()).fillna(0).astype(int)
+        performance_analysis['indicator_performance'] = {
+            indicator: {'green': 0, 'yellow': 0, 'red': 0, 'blue': 0, **{
+                status: count for status, count in counts.items() if count
+            }}
+            for indicator, counts in status_counts.to_dict().items()
+        }
         
         # Rank facilities by performance
-        facility_scores = []
-        for facility_data in category_data:
-            validations = facility_data.get('validations', {})
-            green_count = sum(1 for status in validations.values() if status == 'green')
-            total_indicators = len(validations)
-            score = (green_count / total_indicators * 100) if total_indicators > 0 else 0
-            
-            facility_scores.append({
+        green_counts = statuses.eq('green').sum(axis=1)
+        totals = statuses.notna().sum(axis=1)
+        scores = (green_counts / totals.where(totals > 0) * 100).fillna(0)
+        
+        # Built from the input rows so None districts and integer counts survive
+        performance_analysis['facility_rankings'] = sorted((
+            {
                 'facility': facility_data['facility'],
                 'district': facility_data['district'],
-                'score': score,
-                'green_indicators': green_count,
-                'total_indicators': total_indicators
-            })
-        
-        # Sort by score
-        facility_scores.sort(key=lambda x: x['score'], reverse=True)
-        performance_analysis['facility_rankings'] = facility_scores
+                'score': float(score),
+                'green_indicators': int(green),
+                'total_indicators': int(total)
+            }
+            for facility_data, score, green, total in zip(category_data, scores, green_counts, totals)
+        ), key=lambda ranking: ranking['score'], reverse=True)
         
         return performance_analysis
     
@@ -1054,23 +1627,20 @@ def analyze_category_performance(category_data):
         return {}
 
 
-def calculate_overall_performance(uploads):
-    """Calculate overall system performance"""
+def calculate_overall_performance(*criteria):
+    """Calculate overall system performance for the uploads matching criteria"""
     try:
-        total_indicators = sum(upload.total_indicators for upload in uploads)
-        valid_indicators = sum(upload.valid_indicators for upload in uploads)
+        total_indicators, valid_indicators = db.session.execute(
+            select(
+                func.coalesce(func.sum(DataUpload.total_indicators), 0),
+                func.coalesce(func.sum(DataUpload.valid_indicators), 0)
+            ).where(*criteria)
+        ).one()
         
         overall_rate = (valid_indicators / total_indicators * 100) if total_indicators > 0 else 0
         
         # Categorize performance
-        if overall_rate >= 90:
-            performance_level = "Excellent"
-        elif overall_rate >= 75:
-            performance_level = "Good"
-        elif overall_rate >= 60:
-            performance_level = "Acceptable"
-        else:
-            performance_level = "Needs Improvement"
+        performance_level = quality_band(overall_rate, PERFORMANCE_LEVELS)
         
         return {
             'overall_validation_rate': overall_rate,
@@ -1084,20 +1654,14 @@ def calculate_overall_performance(uploads):
         return {}
 
 
-def calculate_category_performance(uploads):
+def calculate_category_performance(scan):
     """Calculate performance by MNCAH category"""
     try:
         category_performance = {}
         
         for category in ['anc', 'intrapartum', 'pnc']:
-            category_indicators = 0
-            category_valid = 0
-            
-            for upload in uploads:
-                if upload.processed_data and category in upload.processed_data:
-                    validations = upload.processed_data[category].get('validations', {})
-                    category_indicators += len(validations)
-                    category_valid += sum(1 for status in validations.values() if status == 'green')
+            category_indicators = scan.category_indicators[category]
+            category_valid = scan.category_valid[category]
             
             category_rate = (category_valid / category_indicators * 100) if category_indicators > 0 else 0
             
@@ -1114,31 +1678,31 @@ def calculate_category_performance(uploads):
         return {}
 
 
-def calculate_performance_trends(uploads):
-    """Calculate performance trends over time"""
+def calculate_performance_trends(*criteria):
+    """Calculate performance trends over time for the uploads matching criteria"""
     try:
-        # Group uploads by period
-        period_performance = {}
+        rate = DataUpload.validation_rate
+        
+        # Aggregate each period in the database; only one row per period comes back
+        rows = db.session.execute(
+            select(
+                DataUpload.reporting_period,
+                func.avg(rate),
+                func.count(),
+                func.min(rate),
+                func.max(rate)
+            ).where(*criteria).group_by(DataUpload.reporting_period)
+        ).all()
         
-        for upload in uploads:
-            period = upload.reporting_period
-            if period not in period_performance:
-                period_performance[period] = []
-            
-            summary = upload.get_validation_summary()
-            period_performance[period].append(summary.get('validation_rate', 0))
-        
-        # Calculate average for each period
-        trends = {}
-        for period, rates in period_performance.items():
-            trends[period] = {
-                'average_rate': sum(rates) / len(rates),
-                'facility_count': len(rates),
-                'min_rate': min(rates),
-                'max_rate': max(rates)
+        return {
+            period: {
+                'average_rate': average_rate,
+                'facility_count': facility_count,
+                'min_rate': min_rate,
+                'max_rate': max_rate
             }
-        
-        return trends
+            for period, average_rate, facility_count, min_rate, max_rate in rows
+        }
     
     except Exception as e:
         logger.error(f"Error calculating performance trends: {str(e)}")
@@ -1149,18 +1713,20 @@ def generate_api_report_data(report_type, facilities):
     """Generate report data for API endpoints"""
     try:
         # This is a simplified version for API consumption
-        query = DataUpload.query.filter_by(status=UploadStatus.COMPLETED)
+        criteria = [DataUpload.status == UploadStatus.COMPLETED]
         
         if facilities:
-            query = query.filter(DataUpload.facility_name.in_(facilities))
+            criteria.append(DataUpload.facility_name.in_(facilities))
         
-        uploads = query.limit(100).all()  # Limit for API performance
+        facility_names = db.session.execute(
+            select(DataUpload.facility_name).where(*criteria).limit(100)  # Limit for API performance
+        ).scalars().all()
         
         api_data = {
             'report_type': report_type,
-            'total_uploads': len(uploads),
-            'facilities': [upload.facility_name for upload in uploads],
-            'summary_statistics': calculate_overall_performance(uploads)
+            'total_uploads': len(facility_names),
+            'facilities': facility_names,
+            'summary_statistics': calculate_overall_performance(*criteria)
         }
         
         return api_data
@@ -1173,25 +1739,31 @@ def generate_api_report_data(report_type, facilities):
 def get_system_validation_summary():
     """Get system-wide validation summary"""
     try:
-        uploads = DataUpload.query.filter_by(status=UploadStatus.COMPLETED).all()
-        
-        if not uploads:
+        (total_uploads, total_indicators, valid_indicators, warning_indicators,
+         error_indicators, facilities_covered, districts_covered) = db.session.execute(
+            select(
+                func.count(DataUpload.id),
+                func.coalesce(func.sum(DataUpload.total_indicators), 0),
+                func.coalesce(func.sum(DataUpload.valid_indicators), 0),
+                func.coalesce(func.sum(DataUpload.warning_indicators), 0),
+                func.coalesce(func.sum(DataUpload.error_indicators), 0),
+                func.count(func.distinct(DataUpload.facility_name)),
+                func.count(func.distinct(case((DataUpload.district != '', DataUpload.district))))
+            ).where(DataUpload.status == UploadStatus.COMPLETED)
+        ).one()
+        
+        if not total_uploads:
             return {'message': 'No data available'}
         
-        total_indicators = sum(upload.total_indicators for upload in uploads)
-        valid_indicators = sum(upload.valid_indicators for upload in uploads)
-        warning_indicators = sum(upload.warning_indicators for upload in uploads)
-        error_indicators = sum(upload.error_indicators for upload in uploads)
-        
         return {
-            'total_uploads': len(uploads),
+            'total_uploads': total_uploads,
             'total_indicators': total_indicators,
             'valid_indicators': valid_indicators,
             'warning_indicators': warning_indicators,
             'error_indicators': error_indicators,
             'overall_validation_rate': (valid_indicators / total_indicators * 100) if total_indicators > 0 else 0,
-            'facilities_covered': len(set(upload.facility_name for upload in uploads)),
-            'districts_covered': len(set(upload.district for upload in uploads if upload.district))
+            'facilities_covered': facilities_covered,
+            'districts_covered': districts_covered
         }
     
     except Exception as e:
@@ -1199,11 +1771,9 @@ def get_system_validation_summary():
         return {'error': str(e)}
 
 
-def generate_validation_report(uploads):
+def generate_validation_report(scan):
     """Generate validation report section"""
     try:
-        validation_service = DataValidationService()
-        
         validation_data = {
             'overall_summary': get_system_validation_summary(),
             'category_validation': {},
@@ -1219,26 +1789,12 @@ def generate_validation_report(uploads):
         # Category-specific validation
         for category in ['anc', 'intrapartum', 'pnc']:
             category_validation = {
-                'total_indicators': 0,
-                'valid_indicators': 0,
+                'total_indicators': scan.category_indicators[category],
+                'valid_indicators': scan.category_valid[category],
                 'validation_rate': 0,
-                'common_issues': []
+                'common_issues': scan.category_issues[category].most_common(5)
             }
             
-            category_issues = []
-            for upload in uploads:
-                if upload.processed_data and category in upload.processed_data:
-                    validations = upload.processed_data[category].get('validations', {})
-                    category_validation['total_indicators'] += len(validations)
-                    category_validation['valid_indicators'] += sum(
-                        1 for status in validations.values() if status == 'green'
-                    )
-                    
-                    # Collect issues
-                    for indicator, status in validations.items():
-                        if status in ['red', 'blue']:
-                            category_issues.append(indicator)
-            
             # Calculate validation rate
             if category_validation['total_indicators'] > 0:
                 category_validation['validation_rate'] = (
@@ -1246,30 +1802,12 @@ def generate_validation_report(uploads):
                     category_validation['total_indicators'] * 100
                 )
             
-            # Find common issues
-            issue_counts = {}
-            for issue in category_issues:
-                issue_counts[issue] = issue_counts.get(issue, 0) + 1
-            
-            category_validation['common_issues'] = sorted(
-                issue_counts.items(), key=lambda x: x[1], reverse=True
-            )[:5]
-            
             validation_data['category_validation'][category] = category_validation
         
         # Quality distribution
-        for upload in uploads:
-            summary = upload.get_validation_summary()
-            rate = summary.get('validation_rate', 0)
-            
-            if rate >= 90:
-                validation_data['quality_distribution']['excellent'] += 1
-            elif rate >= 75:
-                validation_data['quality_distribution']['good'] += 1
-            elif rate >= 60:
-                validation_data['quality_distribution']['needs_improvement'] += 1
-            else:
-                validation_data['quality_distribution']['poor'] += 1
+        quality_distribution = validation_data['quality_distribution']
+        for rate in scan.validation_rates:
+            quality_distribution[quality_band(rate)] += 1
         
         return validation_data
     
@@ -1281,14 +1819,9 @@ def generate_validation_report(uploads):
 def generate_pdf_report(report_data, include_charts):
     """Generate PDF report with ReportLab"""
     try:
-        pdf_file = create_pdf_export('comprehensive')
+        pdf_bytes = render_pdf_bytes(create_pdf_export, 'comprehensive')
         
-        return send_file(
-            pdf_file,
-            as_attachment=True,
-            download_name=f'MNCAH_Report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf',
-            mimetype='application/pdf'
-        )
+        return send_pdf(pdf_bytes, f'MNCAH_Report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf')
     
     except Exception as e:
         logger.error(f"Error generating PDF report: {str(e)}")
@@ -1298,13 +1831,11 @@ def generate_pdf_report(report_data, include_charts):
 def generate_excel_report(report_data):
     """Generate Excel report with data"""
     try:
-        excel_file = create_excel_export()
+        excel_path = create_excel_export()
         
-        return send_file(
-            excel_file,
-            as_attachment=True,
-            download_name=f'MNCAH_Report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx',
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        return send_excel_file(
+            excel_path,
+            f'MNCAH_Report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
         )
     
     except Exception as e:
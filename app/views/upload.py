@@ -4,17 +4,21 @@ This module handles file uploads, data processing, and validation for the MOH MN
 """
 
 import os
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, current_app, send_file
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import event, or_, select, update
+from sqlalchemy.orm import Session, object_session
 import logging
 
-from ..models.upload import DataUpload, DataProcessor, UploadStatus
+from ..models.upload import DataUpload, DataProcessor, UploadStatus, FacilityStats
 from ..models.base import PeriodType
 from ..services.validation_service import DataValidationService
-from ..utils.decorators import admin_required
+from ..utils.decorators import admin_required, clear_ttl_caches
 from .. import db
 
 
@@ -22,6 +26,12 @@ from .. import db
 upload_bp = Blueprint('upload', __name__)
 logger = logging.getLogger(__name__)
 
+# Uploads are processed off the request thread; clients poll the upload's status.
+# Queued work is not durable, so PENDING uploads (and PROCESSING ones whose worker
+# died mid-job) are re-queued when a worker serves its first request.
+UPLOAD_PROCESSING_WORKERS = 2
+upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_PROCESSING_WORKERS, thread_name_prefix='upload-processing')
+
 
 @upload_bp.route('/')
 @login_required
@@ -51,7 +61,10 @@ def index():
 @admin_required
 def upload_file():
     """
-    Handle file upload and data processing
+    Handle file upload and queue its data processing
+    
+    Processing runs in the background; the response carries the upload id
+    and a status URL to poll.
     """
     try:
         # Validate form data
@@ -113,27 +126,11 @@ def upload_file():
         db.session.add(upload)
         db.session.commit()
         
-        # Process the upload
-        success, message = upload.process_upload()
+        # Process the upload in the background
+        submit_upload_processing(upload.id)
+        logger.info(f"Queued upload {upload.id} for {facility_name}")
         
-        if success:
-            db.session.commit()
-            logger.info(f"Successfully processed upload {upload.id} for {facility_name}")
-            
-            return jsonify({
-                'success': True,
-                'message': 'File uploaded and processed successfully!',
-                'upload_id': upload.id,
-                'redirect': url_for('analysis.view_upload', upload_id=upload.id)
-            })
-        else:
-            db.session.rollback()
-            logger.error(f"Failed to process upload {upload.id}: {message}")
-            
-            return jsonify({
-                'success': False,
-                'message': f'File uploaded but processing failed: {message}'
-            }), 500
+        return upload_queued_response(upload.id, 'File uploaded; processing has started')
     
     except Exception as e:
         db.session.rollback()
@@ -160,7 +157,7 @@ def validate_upload(upload_id):
     Validate uploaded data and show validation results
     """
     try:
-        upload = DataUpload.query.get_or_404(upload_id)
+        upload = db.get_or_404(DataUpload, upload_id)
         
         # Run validation service
         validation_service = DataValidationService()
@@ -192,7 +189,7 @@ def view_upload(upload_id):
     View upload details and processing results
     """
     try:
-        upload = DataUpload.query.get_or_404(upload_id)
+        upload = db.get_or_404(DataUpload, upload_id)
         
         return render_template('upload/view.html', upload=upload)
     
@@ -210,38 +207,23 @@ def reprocess_upload(upload_id):
     Reprocess failed upload
     """
     try:
-        upload = DataUpload.query.get_or_404(upload_id)
+        upload = db.get_or_404(DataUpload, upload_id)
         
-        if upload.status not in [UploadStatus.FAILED, UploadStatus.PENDING]:
+        if upload.status not in [UploadStatus.FAILED, UploadStatus.PENDING] and not is_stale_processing(upload):
             return jsonify({
                 'success': False,
-                'message': 'Only failed or pending uploads can be reprocessed'
+                'message': 'Only failed, pending or stalled uploads can be reprocessed'
             }), 400
         
-        # Reset status and reprocess
+        # Reset status and reprocess in the background
         upload.status = UploadStatus.PENDING
         upload.error_log = None
         db.session.commit()
         
-        success, message = upload.process_upload()
+        submit_upload_processing(upload_id)
+        logger.info(f"Queued reprocessing of upload {upload_id}")
         
-        if success:
-            db.session.commit()
-            logger.info(f"Successfully reprocessed upload {upload_id}")
-            
-            return jsonify({
-                'success': True,
-                'message': 'Upload reprocessed successfully!',
-                'redirect': url_for('analysis.view_upload', upload_id=upload_id)
-            })
-        else:
-            db.session.commit()  # Commit the failed status
-            logger.error(f"Failed to reprocess upload {upload_id}: {message}")
-            
-            return jsonify({
-                'success': False,
-                'message': f'Reprocessing failed: {message}'
-            }), 500
+        return upload_queued_response(upload_id, 'Reprocessing has started')
     
     except Exception as e:
         db.session.rollback()
@@ -261,7 +243,7 @@ def delete_upload(upload_id):
     Delete upload and associated files
     """
     try:
-        upload = DataUpload.query.get_or_404(upload_id)
+        upload = db.get_or_404(DataUpload, upload_id)
         
         # Delete associated file
         if upload.file_path and os.path.exists(upload.file_path):
@@ -271,10 +253,12 @@ def delete_upload(upload_id):
                 logger.warning(f"Could not delete file {upload.file_path}: {str(e)}")
         
         # Delete database record
+        facility_name = upload.facility_name
         db.session.delete(upload)
         db.session.commit()
+        refresh_upload_aggregates([facility_name])
         
-        logger.info(f"Deleted upload {upload_id} - {upload.facility_name}")
+        logger.info(f"Deleted upload {upload_id} - {facility_name}")
         
         return jsonify({
             'success': True,
@@ -367,7 +351,7 @@ def api_upload_details(upload_id):
     API endpoint to get upload details
     """
     try:
-        upload = DataUpload.query.get_or_404(upload_id)
+        upload = db.get_or_404(DataUpload, upload_id)
         return jsonify(upload.to_dict(include_data=True))
     
     except Exception as e:
@@ -375,6 +359,27 @@ def api_upload_details(upload_id):
         return jsonify({'error': 'Error retrieving upload details'}), 500
 
 
+@upload_bp.route('/api/upload/<int:upload_id>/status')
+@login_required
+def api_upload_status(upload_id):
+    """
+    API endpoint polled while an upload is processed in the background
+    """
+    upload = db.session.execute(
+        select(DataUpload.status, DataUpload.error_log).where(DataUpload.id == upload_id)
+    ).first()
+    if upload is None:
+        return jsonify({'success': False, 'message': 'Upload not found'}), 404
+    
+    response = {'success': True, 'upload_id': upload_id, 'status': upload.status.value}
+    if upload.status == UploadStatus.COMPLETED:
+        response['redirect'] = url_for('analysis.view_upload', upload_id=upload_id)
+    elif upload.status == UploadStatus.FAILED:
+        response['message'] = f'Processing failed: {upload.error_log or "unknown error"}'
+    
+    return jsonify(response)
+
+
 @upload_bp.route('/bulk-upload', methods=['GET', 'POST'])
 @login_required
 @admin_required
@@ -418,6 +423,179 @@ def bulk_upload():
         return jsonify({'success': False, 'message': 'Error processing bulk upload'}), 500
 
 
+def submit_upload_processing(upload_id):
+    """Queue processing of a saved upload on the upload pool"""
+    return upload_executor.submit(process_upload_job, current_app._get_current_object(), upload_id)
+
+
+def process_upload_job(app, upload_id):
+    """
+    Process one upload by id, in its own app context and database session
+    
+    The upload is claimed by moving it from PENDING to PROCESSING in one
+    UPDATE, so a job queued twice (or re-queued by another worker at start)
+    runs once. The claim stamps processed_at, which the finished processing
+    overwrites; until then it dates the claim for stale-job detection. The outcome is recorded on the upload itself (completed, or
+    failed with its error log), which is what clients polling the upload see.
+    """
+    with app.app_context():
+        claimed = db.session.execute(
+            update(DataUpload)
+            .where(DataUpload.id == upload_id, DataUpload.status == UploadStatus.PENDING)
+            .values(status=UploadStatus.PROCESSING, processed_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            logger.info(f"Upload {upload_id} is not pending; skipping processing")
+            return False
+        
+        upload = db.session.get(DataUpload, upload_id)
+        facility_name = upload.facility_name
+        try:
+            success, message = upload.process_upload()
+            if not success:
+                # Never leave a claimed upload in PROCESSING, or stamped with the claim time
+                upload.status = UploadStatus.FAILED
+                upload.error_log = upload.error_log or message
+                upload.processed_at = None
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error processing upload {upload_id}: {str(e)}")
+            db.session.execute(
+                update(DataUpload).where(DataUpload.id == upload_id)
+                .values(status=UploadStatus.FAILED, error_log=str(e), processed_at=None)
+            )
+            db.session.commit()
+            # A Core UPDATE bypasses the mapper events that clear cached summaries
+            clear_ttl_caches()
+            return False
+        
+        if success:
+            refresh_upload_aggregates([facility_name])
+            logger.info(f"Successfully processed upload {upload_id} for {facility_name}")
+        else:
+            logger.error(f"Failed to process upload {upload_id}: {message}")
+        
+        return success
+
+
+def stale_processing_cutoff():
+    """Uploads claimed before this time are treated as abandoned by their worker"""
+    return datetime.utcnow() - timedelta(seconds=current_app.config['PROCESSING_TIMEOUT'])
+
+
+def is_stale_processing(upload):
+    """Whether an upload has been PROCESSING for longer than PROCESSING_TIMEOUT"""
+    return upload.status == UploadStatus.PROCESSING and (
+        upload.processed_at is None or upload.processed_at < stale_processing_cutoff()
+    )
+
+
+def reset_stale_uploads():
+    """Return uploads stuck in PROCESSING (their worker died mid-job) to PENDING"""
+    reset = db.session.execute(
+        update(DataUpload)
+        .where(
+            DataUpload.status == UploadStatus.PROCESSING,
+            or_(DataUpload.processed_at.is_(None), DataUpload.processed_at < stale_processing_cutoff())
+        )
+        .values(status=UploadStatus.PENDING)
+    ).rowcount
+    db.session.commit()
+    
+    if reset:
+        logger.warning(f"Reset {reset} uploads left processing past the timeout")
+    return reset
+
+
+def resume_pending_uploads():
+    """Re-queue uploads left PENDING or stuck PROCESSING by a worker that stopped"""
+    try:
+        reset_stale_uploads()
+        pending_ids = db.session.scalars(
+            select(DataUpload.id).where(DataUpload.status == UploadStatus.PENDING)
+        ).all()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error finding pending uploads: {str(e)}")
+        return
+    
+    for upload_id in pending_ids:
+        submit_upload_processing(upload_id)
+    
+    if pending_ids:
+        logger.info(f"Re-queued {len(pending_ids)} pending uploads")
+
+
+def resume_uploads_on_first_request(app):
+    """
+    Resume interrupted uploads once the app serves its first request
+    
+    Deferred from create_app so CLI commands, which also build the app,
+    never queue background processing of their own.
+    """
+    lock = threading.Lock()
+    state = {'resumed': False}
+    
+    @app.before_request
+    def resume_interrupted_uploads():
+        if state['resumed']:
+            return
+        with lock:
+            if state['resumed']:
+                return
+            state['resumed'] = True
+        resume_pending_uploads()
+
+
+def upload_queued_response(upload_id, message):
+    """Build the 202 response pointing the client at a queued upload"""
+    return jsonify({
+        'success': True,
+        'message': message,
+        'upload_id': upload_id,
+        'status': UploadStatus.PENDING.value,
+        'status_url': url_for('upload.api_upload_status', upload_id=upload_id),
+        'redirect': url_for('upload.view_upload', upload_id=upload_id)
+    }), 202
+
+
+def refresh_upload_aggregates(facility_names=None):
+    """Rebuild facility aggregates and drop cached summaries after uploads change"""
+    try:
+        FacilityStats.refresh(db.session, facility_names)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error refreshing facility stats: {str(e)}")
+    
+    clear_ttl_caches()
+
+
+@event.listens_for(DataUpload, 'after_insert')
+@event.listens_for(DataUpload, 'after_update')
+@event.listens_for(DataUpload, 'after_delete')
+def mark_uploads_changed(mapper, connection, target):
+    """Flag the session so cached upload summaries are dropped once it commits"""
+    session = object_session(target)
+    if session is not None:
+        session.info['uploads_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def clear_caches_after_upload_commit(session):
+    """Drop memoized dashboard summaries after a commit that touched uploads"""
+    if session.info.pop('uploads_changed', False):
+        clear_ttl_caches()
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_upload_change_flag(session):
+    """Rolled-back upload changes leave cached summaries valid"""
+    session.info.pop('uploads_changed', None)
+
+
 def allowed_file(filename):
     """Check if uploaded file has allowed extension"""
     return '.' in filename and \
@@ -17,9 +17,13 @@ class BaseConfig:
     # Database configuration
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_RECORD_QUERIES = True
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'query_cache_size': 1200  # Compiled statement LRU cache (SQLAlchemy default is 500)
+    }
     
     # File upload configuration
     MAX_CONTENT_LENGTH = 15 * 1024 * 1024  # 15MB max file size
+    AUTH_MAX_CONTENT_LENGTH = 4 * 1024  # Login/register bodies are tiny; reject larger ones unparsed
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
     EXPORT_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'exports')
     
@@ -28,6 +32,14 @@ class BaseConfig:
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     PERMANENT_SESSION_LIFETIME = timedelta(hours=12)
+    SESSION_TYPE = None  # None keeps Flask's signed-cookie sessions; 'redis' stores them server-side
+    SESSION_KEY_PREFIX = 'mncah:'
+    
+    # Password hashing (werkzeug method string; stored hashes using another
+    # method are re-hashed on the user's next successful login)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_MIN_MS = 100  # flask check-password-cost warns if hashing is faster than this
+    PASSWORD_HASH_WORKERS = 0  # >0 verifies passwords in a process pool of this size
     
     # CSRF configuration
     WTF_CSRF_TIME_LIMIT = 3600  # 1 hour
@@ -58,7 +70,7 @@ class BaseConfig:
     VALIDATION_LOG_LEVEL = 'INFO'
     
     # Cache settings
-    CACHE_TYPE = 'simple'
+    CACHE_TYPE = 'SimpleCache'
     CACHE_DEFAULT_TIMEOUT = 300  # 5 minutes
     
     # Security settings
@@ -66,9 +78,9 @@ class BaseConfig:
     MAX_LOGIN_ATTEMPTS = 5
     ACCOUNT_LOCKOUT_DURATION = 30  # minutes
     
-    # Rate limiting
-    RATELIMIT_STORAGE_URL = 'memory://'
-    RATELIMIT_DEFAULT = '100 per hour'
+    # Rate limiting (Flask-Limiter; limits are set per view, e.g. on login/register)
+    RATELIMIT_STORAGE_URI = 'memory://'
+    RATELIMIT_HEADERS_ENABLED = True
     
     @staticmethod
     def init_app(app):
@@ -122,6 +134,7 @@ class TestingConfig(BaseConfig):
     
     # Fast password hashing for tests
     BCRYPT_LOG_ROUNDS = 4
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
     
     # Disable rate limiting in tests
     RATELIMIT_ENABLED = False
@@ -159,9 +172,19 @@ class ProductionConfig(BaseConfig):
     PREFERRED_URL_SCHEME = 'https'
     
     # Cache settings for production
-    CACHE_TYPE = 'redis'
+    CACHE_TYPE = 'RedisCache'
     CACHE_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
     
+    # Opt-in process pool for password checks; each gunicorn worker starts its own pool
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0))
+    
+    # Share rate limit counters across workers when redis is configured
+    RATELIMIT_STORAGE_URI = os.environ.get('REDIS_URL', 'memory://')
+    
+    # Server-side sessions in redis (only a session id travels in the cookie)
+    SESSION_TYPE = os.environ.get('SESSION_TYPE', 'redis')
+    SESSION_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    
     # Email settings for production notifications
     MAIL_SUBJECT_PREFIX = '[MOH Dashboard] '
     MAIL_SENDER = f"{BaseConfig.APP_NAME} <noreply@health.go.ug>"
@@ -173,6 +196,7 @@ class ProductionConfig(BaseConfig):
     
     # Performance settings
     SQLALCHEMY_ENGINE_OPTIONS = {
+        **BaseConfig.SQLALCHEMY_ENGINE_OPTIONS,
         'pool_size': 20,
         'pool_recycle': 3600,
         'pool_pre_ping': True
@@ -201,6 +225,8 @@ class DockerConfig(ProductionConfig):
     
     # Redis for caching in Docker
     CACHE_REDIS_URL = os.environ.get('REDIS_URL', 'redis://redis:6379/0')
+    SESSION_REDIS_URL = os.environ.get('REDIS_URL', 'redis://redis:6379/0')
+    RATELIMIT_STORAGE_URI = os.environ.get('REDIS_URL', 'redis://redis:6379/0')
     
     # File paths for Docker volumes
     UPLOAD_FOLDER = '/app/uploads'
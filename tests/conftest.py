@@ -0,0 +1,72 @@
+"""
+Shared pytest fixtures for the MOH MNCAH Dashboard tests
+"""
+
+from contextlib import nullcontext
+from datetime import datetime
+
+import pytest
+from flask import has_app_context
+
+from app import create_app, db
+from app.models.base import PeriodType
+from app.models.upload import DataUpload, UploadStatus
+from app.models.user import User, auth_cache
+
+
+@pytest.fixture
+def app():
+    """Application on a fresh in-memory database, with the default users created"""
+    app = create_app('testing')
+    yield app
+    auth_cache.clear()
+
+
+@pytest.fixture
+def app_ctx(app):
+    """Push an application context for tests that use the session directly"""
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    """Log the test client in through the JSON login endpoint"""
+    def login(username='isaac', password='isaac'):
+        return client.post('/auth/login', json={'username': username, 'password': password})
+    return login
+
+
+@pytest.fixture
+def make_upload(app):
+    """Create an upload row directly and return its id (in the test's app context, if any)"""
+    def make_upload(facility_name, uploaded_at=None, status=UploadStatus.COMPLETED,
+                    total_indicators=10, valid_indicators=8, **fields):
+        with nullcontext() if has_app_context() else app.app_context():
+            admin = db.session.query(User).filter_by(username='isaac').one()
+            upload = DataUpload(
+                filename=f'{facility_name}.csv',
+                original_filename=f'{facility_name}.csv',
+                file_size=1,
+                facility_name=facility_name,
+                total_population=1000,
+                period_type=PeriodType.ANNUAL,
+                reporting_period=fields.pop('reporting_period', '2024'),
+                uploaded_by=admin.id,
+                status=status,
+                total_indicators=total_indicators,
+                valid_indicators=valid_indicators,
+                **fields
+            )
+            # DataUpload.__init__ stamps the current time
+            upload.uploaded_at = uploaded_at or datetime.utcnow()
+            db.session.add(upload)
+            db.session.commit()
+            return upload.id
+    return make_upload
@@ -0,0 +1,60 @@
+"""
+Calculation tests for the MOH MNCAH Dashboard
+"""
+
+import json
+
+from app.utils.helpers import calculate_median
+from app.views.reports import UploadScan, analyze_category_performance, generate_category_report
+
+
+def category_scan(values):
+    """Upload scan with one ANC row per value of a single indicator"""
+    scan = UploadScan()
+    scan.category_rows['anc'] = [
+        {'facility': f'HC {i}', 'district': 'Kampala', 'period': '2024',
+         'indicators': {'anc_1_coverage': value}, 'validations': {'anc_1_coverage': 'green'}}
+        for i, value in enumerate(values)
+    ]
+    return scan
+
+
+class TestMedian:
+    """Reports and the API share one median definition"""
+
+    def test_odd_count_takes_middle_value(self):
+        assert calculate_median([70.0, 10.0, 40.0]) == 40.0
+
+    def test_even_count_averages_middle_values(self):
+        assert calculate_median([10.0, 40.0, 70.0, 20.0]) == 30.0
+
+    def test_category_report_matches_api_median(self):
+        values = [10.0, 40.0, 70.0, 20.0]
+
+        report = generate_category_report(category_scan(values), 'anc')
+
+        assert report['statistics']['anc_1_coverage']['median'] == calculate_median(values) == 30.0
+
+
+class TestCategoryPerformance:
+    """Facility rankings keep the input's values and integer counts"""
+
+    def test_missing_district_and_empty_validations(self):
+        analysis = analyze_category_performance([{'facility': 'A', 'district': None, 'validations': {}}])
+
+        assert analysis['facility_rankings'] == [{
+            'facility': 'A', 'district': None, 'score': 0.0,
+            'green_indicators': 0, 'total_indicators': 0
+        }]
+        assert type(analysis['facility_rankings'][0]['total_indicators']) is int
+        json.dumps(analysis, allow_nan=False)
+
+    def test_rankings_sorted_by_score(self):
+        analysis = analyze_category_performance([
+            {'facility': 'A', 'district': 'Gulu', 'validations': {'x': 'green', 'y': 'red'}},
+            {'facility': 'B', 'district': 'Kampala', 'validations': {'x': 'green'}}
+        ])
+
+        assert [(r['facility'], r['score'], r['green_indicators']) for r in analysis['facility_rankings']] == [
+            ('B', 100.0, 1), ('A', 50.0, 1)
+        ]
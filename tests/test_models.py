@@ -0,0 +1,187 @@
+"""
+Model tests for the MOH MNCAH Dashboard
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app import backfill_facility_stats, create_app, db
+from app.models.upload import DataUpload, FacilityStats, UploadStatus
+from app.models.user import User, UserManager, auth_cache
+from app.views.upload import refresh_upload_aggregates
+from config.config import TestingConfig
+
+
+BASE_TIME = datetime(2024, 6, 1, 12, 0, 0)
+
+
+class TestFacilityStats:
+    """facility_stats rows track the completed uploads of each facility"""
+
+    def test_upload_builds_latest_row_per_facility(self, app_ctx, make_upload):
+        older_id = make_upload('Alpha HC', BASE_TIME, valid_indicators=5)
+        latest_id = make_upload('Alpha HC', BASE_TIME + timedelta(days=1), valid_indicators=9)
+        make_upload('Alpha HC', BASE_TIME + timedelta(days=2), status=UploadStatus.PENDING)
+        make_upload('Beta HC', BASE_TIME, valid_indicators=10)
+
+        refresh_upload_aggregates()
+
+        alpha = db.session.get(FacilityStats, 'Alpha HC')
+        assert alpha.total_uploads == 2
+        assert alpha.latest_upload_id == latest_id
+        assert alpha.latest_upload == BASE_TIME + timedelta(days=1)
+        assert alpha.latest_valid_indicators == 9
+        assert alpha.avg_validation_rate == 70.0
+        assert older_id != latest_id
+
+        beta = db.session.get(FacilityStats, 'Beta HC')
+        assert beta.total_uploads == 1
+        assert beta.latest_validation_rate == 100.0
+
+    def test_average_counts_uploads_without_indicators_as_zero(self, app_ctx, make_upload):
+        make_upload('Alpha HC', BASE_TIME, total_indicators=10, valid_indicators=8)
+        make_upload('Alpha HC', BASE_TIME + timedelta(days=1), total_indicators=0, valid_indicators=0)
+
+        refresh_upload_aggregates()
+
+        # Matches the per-upload validation_rate averaged by the reports
+        assert db.session.get(FacilityStats, 'Alpha HC').avg_validation_rate == 40.0
+
+    def test_reprocess_updates_latest_snapshot(self, app_ctx, make_upload):
+        make_upload('Alpha HC', BASE_TIME, valid_indicators=6)
+        latest_id = make_upload('Alpha HC', BASE_TIME + timedelta(days=1), valid_indicators=9)
+        refresh_upload_aggregates(['Alpha HC'])
+
+        upload = db.session.get(DataUpload, latest_id)
+        upload.valid_indicators = 4
+        upload.processed_at = datetime.utcnow()
+        db.session.commit()
+        refresh_upload_aggregates(['Alpha HC'])
+
+        alpha = db.session.get(FacilityStats, 'Alpha HC')
+        assert alpha.latest_upload_id == latest_id
+        assert alpha.latest_valid_indicators == 4
+        assert alpha.avg_validation_rate == 50.0
+
+    def test_failed_reprocess_falls_back_to_previous_upload(self, app_ctx, make_upload):
+        older_id = make_upload('Alpha HC', BASE_TIME)
+        latest_id = make_upload('Alpha HC', BASE_TIME + timedelta(days=1))
+
+        db.session.get(DataUpload, latest_id).status = UploadStatus.FAILED
+        db.session.commit()
+        refresh_upload_aggregates(['Alpha HC'])
+
+        alpha = db.session.get(FacilityStats, 'Alpha HC')
+        assert alpha.total_uploads == 1
+        assert alpha.latest_upload_id == older_id
+
+    def test_delete_removes_uploads_and_empty_facilities(self, app_ctx, make_upload):
+        older_id = make_upload('Alpha HC', BASE_TIME)
+        latest_id = make_upload('Alpha HC', BASE_TIME + timedelta(days=1))
+        beta_id = make_upload('Beta HC', BASE_TIME)
+        refresh_upload_aggregates()
+
+        db.session.delete(db.session.get(DataUpload, latest_id))
+        db.session.delete(db.session.get(DataUpload, beta_id))
+        db.session.commit()
+        refresh_upload_aggregates(['Alpha HC', 'Beta HC'])
+
+        alpha = db.session.get(FacilityStats, 'Alpha HC')
+        assert alpha.total_uploads == 1
+        assert alpha.latest_upload_id == older_id
+        assert db.session.get(FacilityStats, 'Beta HC') is None
+
+    def test_refresh_limited_to_named_facilities(self, app_ctx, make_upload):
+        make_upload('Alpha HC', BASE_TIME)
+        make_upload('Beta HC', BASE_TIME)
+        refresh_upload_aggregates(['Alpha HC'])
+
+        assert db.session.get(FacilityStats, 'Alpha HC') is not None
+        assert db.session.get(FacilityStats, 'Beta HC') is None
+
+    def test_startup_backfill_builds_missing_table(self, app_ctx, make_upload):
+        make_upload('Alpha HC', BASE_TIME)
+        make_upload('Beta HC', BASE_TIME)
+        assert db.session.query(FacilityStats).count() == 0
+
+        backfill_facility_stats()
+
+        assert {row.facility_name for row in db.session.query(FacilityStats)} == {'Alpha HC', 'Beta HC'}
+
+    def test_startup_backfill_keeps_existing_rows(self, app_ctx, make_upload):
+        make_upload('Alpha HC', BASE_TIME)
+        refresh_upload_aggregates()
+        make_upload('Beta HC', BASE_TIME)
+
+        backfill_facility_stats()
+
+        assert db.session.get(FacilityStats, 'Beta HC') is None
+
+
+class TestDatabaseSetup:
+    """Startup table and index creation can run again on an existing database"""
+
+    def test_create_app_twice_on_same_database(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI',
+                            f"sqlite:///{tmp_path / 'dashboard.db'}")
+        create_app('testing')
+
+        app = create_app('testing')
+
+        with app.app_context():
+            assert db.session.query(User).count() > 0
+            db.session.remove()
+        auth_cache.clear()
+
+    def test_startup_drops_obsolete_indexes(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI',
+                            f"sqlite:///{tmp_path / 'dashboard.db'}")
+        app = create_app('testing')
+        with app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(text(
+                    'CREATE INDEX ix_du_status_period ON data_uploads (status, reporting_period)'
+                ))
+
+        app = create_app('testing')
+
+        with app.app_context():
+            names = set(db.session.scalars(text(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'data_uploads'"
+            )))
+            assert 'ix_du_status_fac_upl' in names
+            assert not names & set(DataUpload.OBSOLETE_INDEXES)
+            db.session.remove()
+        auth_cache.clear()
+
+
+class TestAuthenticationCache:
+    """Repeat logins skip the password hash only while the cache entry is fresh"""
+
+    def test_cached_login_expires(self, app_ctx, monkeypatch):
+        checks = []
+        check_password = User.check_password
+        monkeypatch.setattr(User, 'check_password',
+                            lambda user, password: checks.append(password) or check_password(user, password))
+
+        assert UserManager.authenticate_user('stakeholder', 'stakeholder123', db.session)
+        assert UserManager.authenticate_user('stakeholder', 'stakeholder123', db.session)
+        assert len(checks) == 1
+
+        expired = time.monotonic() + auth_cache.ttl + 1
+        monkeypatch.setattr(time, 'monotonic', lambda: expired)
+
+        assert UserManager.authenticate_user('stakeholder', 'stakeholder123', db.session)
+        assert len(checks) == 2
+
+    def test_cached_login_checks_current_password_hash(self, app_ctx):
+        assert UserManager.authenticate_user('stakeholder', 'stakeholder123', db.session)
+
+        # Changed without going through a view, so nothing invalidated the cache
+        user = db.session.query(User).filter_by(username='stakeholder').one()
+        user.set_password('changed-secret')
+        db.session.commit()
+
+        assert UserManager.authenticate_user('stakeholder', 'stakeholder123', db.session) is None
@@ -0,0 +1,448 @@
+"""
+View tests for the MOH MNCAH Dashboard
+"""
+
+import io
+import json
+from datetime import datetime, timedelta
+
+from app import create_app, db, generate_sample_raw_data
+from app.models.upload import DataUpload, FacilityStats, UploadStatus
+from app.models.user import User
+from app.utils.decorators import clear_ttl_caches
+from app.views.api import get_system_data_quality_stats, get_system_performance_summary, stream_indicator_performance
+from app.views.dashboard import get_dashboard_statistics
+from app.views import upload as upload_views
+from config.config import TestingConfig
+
+
+BASE_TIME = datetime(2024, 6, 1, 12, 0, 0)
+
+
+class TestUploadsApiPagination:
+    """/api/uploads keyset cursor and optional total"""
+
+    def make_uploads_with_tied_timestamps(self, make_upload):
+        """Five uploads, three sharing one timestamp; returns ids in listing order"""
+        tied = [make_upload(f'Tied HC {i}', BASE_TIME) for i in range(3)]
+        older = [make_upload(f'Older HC {i}', BASE_TIME - timedelta(days=1)) for i in range(2)]
+        # Newest first, ties broken by id descending
+        return sorted(tied, reverse=True) + sorted(older, reverse=True)
+
+    def test_cursor_pages_cover_every_upload_once(self, client, login, make_upload):
+        expected = self.make_uploads_with_tied_timestamps(make_upload)
+        login()
+
+        seen = []
+        params = {'per_page': 2}
+        while True:
+            body = client.get('/api/uploads', query_string=params).get_json()
+            assert body['success']
+            pagination = body['data']['pagination']
+            seen.extend(upload['id'] for upload in body['data']['uploads'])
+            if not pagination['has_next']:
+                assert pagination['next_cursor'] is None
+                break
+            params = {'per_page': 2, **pagination['next_cursor']}
+
+        assert seen == expected
+
+    def test_cursor_page_starts_after_a_tied_row(self, client, login, make_upload):
+        expected = self.make_uploads_with_tied_timestamps(make_upload)
+        login()
+
+        first = client.get('/api/uploads', query_string={'per_page': 1}).get_json()
+        cursor = first['data']['pagination']['next_cursor']
+        second = client.get('/api/uploads', query_string={'per_page': 1, **cursor}).get_json()
+
+        assert [upload['id'] for upload in first['data']['uploads']] == expected[:1]
+        assert [upload['id'] for upload in second['data']['uploads']] == expected[1:2]
+        assert second['data']['pagination']['page'] is None
+        assert second['data']['pagination']['has_prev'] is True
+
+    def test_total_only_counted_on_request(self, client, login, make_upload):
+        self.make_uploads_with_tied_timestamps(make_upload)
+        login()
+
+        pagination = client.get('/api/uploads', query_string={'per_page': 2}).get_json()['data']['pagination']
+        assert pagination['total'] is None
+        assert pagination['pages'] is None
+
+        pagination = client.get(
+            '/api/uploads', query_string={'per_page': 2, 'include_total': 'true'}
+        ).get_json()['data']['pagination']
+        assert pagination['total'] == 5
+        assert pagination['pages'] == 3
+
+    def test_invalid_cursor_timestamp_rejected(self, client, login):
+        login()
+
+        response = client.get('/api/uploads', query_string={'after_id': 1, 'after_uploaded_at': 'yesterday'})
+
+        assert response.status_code == 400
+
+
+class TestUploadProcessing:
+    """Background upload jobs claim, process and record the outcome on the upload"""
+
+    def upload_row(self, app, upload_id):
+        with app.app_context():
+            upload = db.session.get(DataUpload, upload_id)
+            db.session.expunge(upload)
+            return upload
+
+    def test_pending_upload_processed(self, app, make_upload):
+        upload_id = make_upload('Alpha HC', status=UploadStatus.PENDING, raw_data=generate_sample_raw_data())
+
+        assert upload_views.process_upload_job(app, upload_id) is True
+
+        upload = self.upload_row(app, upload_id)
+        assert upload.status == UploadStatus.COMPLETED
+        assert upload.processed_at is not None
+        with app.app_context():
+            assert db.session.get(FacilityStats, 'Alpha HC') is not None
+
+    def test_failed_processing_recorded(self, app, make_upload):
+        # No raw data, so process_upload() reports a failure
+        upload_id = make_upload('Alpha HC', status=UploadStatus.PENDING)
+
+        assert upload_views.process_upload_job(app, upload_id) is False
+
+        upload = self.upload_row(app, upload_id)
+        assert upload.status == UploadStatus.FAILED
+        assert upload.error_log
+        assert upload.processed_at is None
+
+    def test_exception_marks_upload_failed_and_clears_caches(self, app, make_upload, monkeypatch):
+        upload_id = make_upload('Alpha HC', status=UploadStatus.PENDING, raw_data=generate_sample_raw_data())
+        clear_ttl_caches()
+        with app.app_context():
+            assert get_dashboard_statistics()['pending_uploads'] == 1
+
+        def broken_process_upload(upload):
+            raise RuntimeError('worker crashed')
+        monkeypatch.setattr(DataUpload, 'process_upload', broken_process_upload)
+
+        assert upload_views.process_upload_job(app, upload_id) is False
+
+        upload = self.upload_row(app, upload_id)
+        assert upload.status == UploadStatus.FAILED
+        assert upload.error_log == 'worker crashed'
+        assert upload.processed_at is None
+        with app.app_context():
+            stats = get_dashboard_statistics()
+        assert (stats['pending_uploads'], stats['failed_uploads']) == (0, 1)
+
+    def test_upload_claimed_only_once(self, app, make_upload, monkeypatch):
+        upload_id = make_upload('Alpha HC', status=UploadStatus.PENDING, raw_data=generate_sample_raw_data())
+        assert upload_views.process_upload_job(app, upload_id) is True
+
+        processed = []
+        monkeypatch.setattr(DataUpload, 'process_upload', lambda upload: processed.append(upload.id))
+
+        assert upload_views.process_upload_job(app, upload_id) is False
+        assert processed == []
+        assert self.upload_row(app, upload_id).status == UploadStatus.COMPLETED
+
+    def test_queued_upload_polled_until_completed(self, app, client, login, monkeypatch, tmp_path):
+        app.config['UPLOAD_FOLDER'] = str(tmp_path)
+        queued = []
+        monkeypatch.setattr(upload_views, 'submit_upload_processing', queued.append)
+        csv = 'indicator_code,value\n' + ''.join(
+            f'{code},{value}\n' for code, value in generate_sample_raw_data().items()
+        )
+        login()
+
+        response = client.post('/upload/upload', data={
+            'facility_name': 'Alpha HC', 'district': 'Kampala', 'population': '50000',
+            'period_type': 'annual', 'reporting_period': '2024',
+            'file': (io.BytesIO(csv.encode()), 'alpha.csv')
+        })
+        assert response.status_code == 202
+        status_url = response.get_json()['status_url']
+        assert client.get(status_url).get_json()['status'] == 'pending'
+
+        upload_views.process_upload_job(app, queued[0])
+
+        status = client.get(status_url).get_json()
+        assert status['status'] == 'completed'
+        assert status['redirect']
+
+
+class TestInterruptedUploads:
+    """Uploads left PROCESSING by a dead worker can be processed again"""
+
+    def status_of(self, app, upload_id):
+        with app.app_context():
+            return db.session.get(DataUpload, upload_id).status
+
+    def test_stale_processing_upload_reset_to_pending(self, app, make_upload):
+        stale = make_upload('Stale HC', status=UploadStatus.PROCESSING,
+                            processed_at=datetime.utcnow() - timedelta(hours=1))
+        running = make_upload('Running HC', status=UploadStatus.PROCESSING,
+                              processed_at=datetime.utcnow())
+
+        with app.app_context():
+            assert upload_views.reset_stale_uploads() == 1
+
+        assert self.status_of(app, stale) == UploadStatus.PENDING
+        assert self.status_of(app, running) == UploadStatus.PROCESSING
+
+    def test_reprocess_accepts_only_stale_processing_uploads(self, client, login, make_upload, monkeypatch):
+        queued = []
+        monkeypatch.setattr(upload_views, 'submit_upload_processing', queued.append)
+        stale = make_upload('Stale HC', status=UploadStatus.PROCESSING,
+                            processed_at=datetime.utcnow() - timedelta(hours=1))
+        running = make_upload('Running HC', status=UploadStatus.PROCESSING,
+                              processed_at=datetime.utcnow())
+        login()
+
+        assert client.post(f'/upload/reprocess/{running}').status_code == 400
+        assert client.post(f'/upload/reprocess/{stale}').status_code == 202
+        assert queued == [stale]
+
+    def test_cli_skips_uploads_claimed_elsewhere(self, app, make_upload):
+        pending = make_upload('Pending HC', status=UploadStatus.PENDING)
+        running = make_upload('Running HC', status=UploadStatus.PROCESSING,
+                              processed_at=datetime.utcnow())
+
+        result = app.test_cli_runner().invoke(args=['process-pending-uploads'])
+
+        assert result.exit_code == 0
+        # No raw data, so the claimed upload fails rather than completing
+        assert self.status_of(app, pending) == UploadStatus.FAILED
+        assert self.status_of(app, running) == UploadStatus.PROCESSING
+
+
+class TestIndicatorPerformanceStream:
+    """The streamed indicator document reports whether it is complete"""
+
+    def point(self, value):
+        return {'value': value, 'validation_status': 'green',
+                'facility_name': 'Alpha HC', 'reporting_period': '2024'}
+
+    def stream(self, data_points):
+        return json.loads(b''.join(stream_indicator_performance('anc_1_coverage', data_points)))
+
+    def test_complete_stream_succeeds(self):
+        document = self.stream(iter([self.point(10.0), self.point(30.0)]))
+        assert document['success'] is True
+        assert document['data']['statistics']['mean'] == 20.0
+
+    def test_error_mid_stream_marks_document_truncated(self):
+        def data_points():
+            yield self.point(10.0)
+            raise RuntimeError('connection lost')
+
+        document = self.stream(data_points())
+        assert document['success'] is False
+        assert document['truncated'] is True
+        assert len(document['data']['data_points']) == 1
+        assert 'statistics' not in document['data']
+
+
+class TestSystemStats:
+    """System quality and performance summaries are aggregated in SQL"""
+
+    def test_summaries_match_per_upload_rates(self, app_ctx, make_upload):
+        clear_ttl_caches()
+        make_upload('Alpha HC', total_indicators=10, valid_indicators=9, warning_indicators=1)
+        make_upload('Beta HC', total_indicators=10, valid_indicators=5, error_indicators=5)
+        make_upload('Gamma HC', total_indicators=0, valid_indicators=0)
+        make_upload('Delta HC', status=UploadStatus.FAILED, total_indicators=10, valid_indicators=10)
+
+        quality = get_system_data_quality_stats()
+        assert quality['uploads_analyzed'] == 3
+        assert (quality['total_indicators'], quality['valid_indicators']) == (20, 14)
+        assert (quality['warning_indicators'], quality['error_indicators']) == (1, 5)
+        assert quality['overall_quality_rate'] == 70.0
+
+        performance = get_system_performance_summary()
+        assert performance['total_assessments'] == 3
+        assert performance['average_performance'] == (90.0 + 50.0 + 0.0) / 3
+        assert performance['performance_distribution'] == {
+            'excellent': 1, 'good': 0, 'acceptable': 0, 'poor': 2
+        }
+
+
+class TestDashboardStatistics:
+    """Fallbacks returned after a database error are not kept in the TTL cache"""
+
+    def test_error_fallback_not_cached(self, app_ctx, monkeypatch):
+        clear_ttl_caches()
+
+        def failing_execute(*args, **kwargs):
+            raise RuntimeError('database unavailable')
+        monkeypatch.setattr(db.session, 'execute', failing_execute)
+        assert get_dashboard_statistics() == {}
+
+        monkeypatch.undo()
+        assert get_dashboard_statistics()['total_users'] > 0
+
+
+class TestLoginCache:
+    """A cached login must not outlive the password or status it was checked against"""
+
+    def logout(self, client):
+        return client.post('/auth/logout', json={})
+
+    def test_cached_login_rejected_after_password_change(self, client, login):
+        assert login('stakeholder', 'stakeholder123').status_code == 200
+        self.logout(client)
+        assert login('stakeholder', 'stakeholder123').status_code == 200
+
+        response = client.post('/auth/change-password', data={
+            'current_password': 'stakeholder123',
+            'new_password': 'changed-secret',
+            'confirm_password': 'changed-secret'
+        })
+        assert response.status_code == 302
+        self.logout(client)
+
+        assert login('stakeholder', 'stakeholder123').status_code == 401
+        assert login('stakeholder', 'changed-secret').status_code == 200
+
+    def test_cached_login_rejected_after_deactivation(self, app, client, login):
+        with app.app_context():
+            stakeholder_id = db.session.query(User).filter_by(username='stakeholder').one().id
+
+        assert login('stakeholder', 'stakeholder123').status_code == 200
+        self.logout(client)
+
+        assert login('isaac', 'isaac').status_code == 200
+        response = client.post(f'/auth/admin/users/{stakeholder_id}/toggle-status', json={})
+        assert response.get_json()['user_status'] == 'inactive'
+        self.logout(client)
+
+        assert login('stakeholder', 'stakeholder123').status_code == 401
+
+
+class TestLoginValidation:
+    """Malformed JSON login bodies are rejected with 400"""
+
+    def test_non_string_username_rejected(self, client):
+        response = client.post('/auth/login', json={'username': 123, 'password': 'isaac'})
+        assert response.status_code == 400
+
+    def test_non_string_password_rejected(self, client):
+        response = client.post('/auth/login', json={'username': 'isaac', 'password': ['isaac']})
+        assert response.status_code == 400
+
+    def test_non_object_body_rejected_with_rate_limiting(self, monkeypatch):
+        monkeypatch.setattr(TestingConfig, 'RATELIMIT_ENABLED', True)
+        client = create_app('testing').test_client()
+
+        response = client.post('/auth/login', json=['x'])
+        assert response.status_code == 400
+
+
+class TestLoginRedirect:
+    """Only same-site relative paths are followed after login"""
+
+    def login_redirect(self, client, next_url):
+        response = client.post('/auth/login', query_string={'next': next_url},
+                               json={'username': 'isaac', 'password': 'isaac'})
+        assert response.status_code == 200
+        return response.get_json()['redirect']
+
+    def test_relative_path_followed(self, client):
+        assert self.login_redirect(client, '/reports/?report_type=anc') == '/reports/?report_type=anc'
+
+    def test_scheme_relative_url_rejected(self, client):
+        assert self.login_redirect(client, '//evil.com') == '/dashboard/'
+
+    def test_absolute_url_rejected(self, client):
+        assert self.login_redirect(client, 'https://evil.com/dashboard') == '/dashboard/'
+
+    def test_trailing_newline_rejected(self, client):
+        assert self.login_redirect(client, '/dashboard\n') == '/dashboard/'
+
+
+class TestPollingEtags:
+    """Polling endpoints answer a current If-None-Match with an empty 304"""
+
+    def assert_not_modified(self, client, url, etag):
+        response = client.get(url, headers={'If-None-Match': f'"{etag}"'})
+        assert response.status_code == 304
+        assert response.data == b''
+        assert response.get_etag()[0] == etag
+
+    def get_etag(self, client, url):
+        response = client.get(url)
+        assert response.status_code == 200
+        etag, _ = response.get_etag()
+        assert etag
+        return etag
+
+    def test_auth_check_not_modified(self, client):
+        etag = self.get_etag(client, '/auth/check')
+
+        self.assert_not_modified(client, '/auth/check', etag)
+
+    def test_auth_check_etag_changes_on_login(self, client, login):
+        anonymous = self.get_etag(client, '/auth/check')
+        login()
+
+        assert self.get_etag(client, '/auth/check') != anonymous
+        assert client.get('/auth/check', headers={'If-None-Match': f'"{anonymous}"'}).status_code == 200
+
+    def test_auth_status_not_modified(self, client, login):
+        login()
+        etag = self.get_etag(client, '/auth/status')
+
+        self.assert_not_modified(client, '/auth/status', etag)
+
+    def test_auth_status_etag_changes_on_new_login(self, client, login):
+        login()
+        first = self.get_etag(client, '/auth/status')
+        client.post('/auth/logout', json={})
+        login()
+
+        assert self.get_etag(client, '/auth/status') != first
+
+    def test_auth_status_etag_differs_between_users(self, client, login):
+        login()
+        admin = self.get_etag(client, '/auth/status')
+        client.post('/auth/logout', json={})
+        login('stakeholder', 'stakeholder123')
+
+        assert self.get_etag(client, '/auth/status') != admin
+
+    def test_report_data_not_modified(self, client, login, make_upload):
+        make_upload('Alpha HC', BASE_TIME)
+        login()
+        etag = self.get_etag(client, '/reports/api/report-data')
+
+        self.assert_not_modified(client, '/reports/api/report-data', etag)
+
+    def test_report_data_etag_changes_with_uploads(self, client, login, make_upload):
+        make_upload('Alpha HC', BASE_TIME)
+        login()
+        before = self.get_etag(client, '/reports/api/report-data')
+
+        make_upload('Beta HC', BASE_TIME + timedelta(days=1))
+
+        assert self.get_etag(client, '/reports/api/report-data') != before
+
+    def test_report_data_etag_depends_on_query(self, client, login, make_upload):
+        make_upload('Alpha HC', BASE_TIME)
+        login()
+
+        assert (self.get_etag(client, '/reports/api/report-data?type=summary')
+                != self.get_etag(client, '/reports/api/report-data?type=facilities'))
+
+    def test_validation_summary_not_modified(self, client, login, make_upload):
+        make_upload('Alpha HC', BASE_TIME)
+        login()
+        etag = self.get_etag(client, '/reports/api/validation-summary')
+
+        self.assert_not_modified(client, '/reports/api/validation-summary', etag)
+
+    def test_validation_summary_etag_changes_with_uploads(self, client, login, make_upload):
+        make_upload('Alpha HC', BASE_TIME)
+        login()
+        before = self.get_etag(client, '/reports/api/validation-summary')
+
+        make_upload('Beta HC', BASE_TIME + timedelta(days=1))
+
+        assert self.get_etag(client, '/reports/api/validation-summary') != before